@@ -6,6 +6,8 @@ const FeedbackList = ({ productId }) => {
   const [loading, setLoading] = useState(true);
   const [averageRating, setAverageRating] = useState(0);
   const [totalReviews, setTotalReviews] = useState(0);
+  // Server-side rating aggregate: { count, average, histogram: { "1": n, ... } }
+  const [ratingSummary, setRatingSummary] = useState(null);
   const [sortBy, setSortBy] = useState("recent");
 
   useEffect(() => {
@@ -15,11 +17,13 @@ const FeedbackList = ({ productId }) => {
   const fetchFeedbacks = async () => {
     try {
       setLoading(true);
+      // No limit: every review, so sorting by rating covers all of them
       const res = await getProductFeedback(productId);
       if (res.success) {
         setFeedbacks(res.feedback || []);
         setAverageRating(res.average_rating || 0);
         setTotalReviews(res.total_reviews || 0);
+        setRatingSummary(res.rating || null);
       }
     } catch (err) {
       console.error("Error loading feedbacks:", err);
@@ -109,8 +113,8 @@ const FeedbackList = ({ productId }) => {
               <p className="text-gray-600 dark:text-white/60 text-sm mb-4 transition-colors duration-300">Rating Breakdown</p>
               <div className="space-y-2">
                 {[5, 4, 3, 2, 1].map((stars) => {
-                  const count = feedbacks.filter((f) => f.rating === stars).length;
-                  const percentage = totalReviews ? (count / totalReviews) * 100 : 0;
+                  const count = ratingSummary?.histogram?.[stars] ?? 0;
+                  const percentage = ratingSummary?.count ? (count / ratingSummary.count) * 100 : 0;
                   return (
                     <div key={stars} className="flex items-center gap-3">
                       <span className="text-gray-600 dark:text-white/60 text-sm w-24 text-right transition-colors duration-300">
@@ -150,7 +150,7 @@ const ImageSearch = () => {
               <div className="h-40 w-full overflow-hidden rounded-2xl bg-slate-900">
                 {result.image_url ? (
                   <img
-                    src={result.image_url}
+                    src={`${result.image_url}${result.image_url.includes("?") ? "&" : "?"}size=card`}
                     alt={result.title}
                     className="h-full w-full object-cover"
                   />
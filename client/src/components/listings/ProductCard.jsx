@@ -1,31 +1,11 @@
-import React, { useEffect, useState } from "react";
+import React from "react";
 import { Link } from "react-router-dom";
 import { formatPrice } from "../../utils/formatPrice";
-import { getProductFeedback } from "../../services/api";
-
-const ProductCard = ({ product, onDelete, getImageUrl }) => {
-  const [averageRating, setAverageRating] = useState(0);
-  const [totalReviews, setTotalReviews] = useState(0);
-  const [loadingRating, setLoadingRating] = useState(true);
-
-  useEffect(() => {
-    fetchAverageRating();
-  }, [product.id]);
-
-  const fetchAverageRating = async () => {
-    try {
-      setLoadingRating(true);
-      const res = await getProductFeedback(product.id);
-      if (res.success) {
-        setAverageRating(res.average_rating || 0);
-        setTotalReviews(res.total_reviews || 0);
-      }
-    } catch (err) {
-      console.error("Error loading rating:", err);
-    } finally {
-      setLoadingRating(false);
-    }
-  };
+
+// rating comes from the catalog, which fetches badges for a whole page in one request
+const ProductCard = ({ product, onDelete, getImageUrl, rating, loadingRating = false }) => {
+  const averageRating = rating?.average_rating || 0;
+  const totalReviews = rating?.total_reviews || 0;
 
   const img = getImageUrl(product.image_url);
 
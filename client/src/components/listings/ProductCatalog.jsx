@@ -1,6 +1,6 @@
 import React, { useEffect, useRef, useState } from "react";
 import { Link } from "react-router-dom";
-import { deleteListing, getListings, getProductFeedback } from "../../services/api";
+import { deleteListing, getListingFacets, getListings, getProductRatings } from "../../services/api";
 import { LISTING_CATEGORY_OPTIONS } from "../../utils/constants";
 import ProductCard from "./ProductCard";
 
@@ -12,6 +12,12 @@ const ProductCatalog = () => {
   const [sorting, setSorting] = useState(false);
   const [sortBy, setSortBy] = useState("newest");
   const [productRatings, setProductRatings] = useState({});
+  const [loadingRatings, setLoadingRatings] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalProducts, setTotalProducts] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [categoryCounts, setCategoryCounts] = useState({});
+  const lastParamsRef = useRef({});
   const [filters, setFilters] = useState({
     category: "",
     min_price: "",
@@ -33,41 +39,75 @@ const ProductCatalog = () => {
   const fetchProducts = async (params = {}, { showLoader = true } = {}) => {
     if (showLoader) setLoading(true);
     try {
-      const res = await getListings(params);
+      // Newest first from the server; further pages are fetched on demand
+      const query = { sort: "created_at", order: "desc", ...params };
+      lastParamsRef.current = query;
+      // Facet counts come from server-side counters, not from the listings page
+      getListingFacets(params)
+        .then((facets) => {
+          if (facets.success) {
+            setCategoryCounts(
+              Object.fromEntries(facets.category_counts.map((f) => [f.value, f.count]))
+            );
+          }
+        })
+        .catch(() => setCategoryCounts({}));
+      const res = await getListings(query);
       if (res.success) {
         setProducts(res.products);
+        setNextCursor(res.next_cursor || null);
+        setTotalProducts(res.total ?? res.products.length);
         // Fetch ratings for all products
         await fetchAllProductRatings(res.products);
       }
     } catch {
       setProducts([]);
+      setNextCursor(null);
     } finally {
       if (showLoader) setLoading(false);
       setInitialLoad(false);
     }
   };
 
-  const fetchAllProductRatings = async (productsToRate) => {
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
     try {
-      const ratings = {};
-      await Promise.all(
-        productsToRate.map(async (product) => {
-          try {
-            const res = await getProductFeedback(product.id);
-            if (res.success) {
-              ratings[product.id] = {
-                average_rating: res.average_rating || 0,
-                total_reviews: res.total_reviews || 0,
-              };
-            }
-          } catch (err) {
-            console.error(`Error fetching rating for ${product.id}:`, err);
-          }
-        })
-      );
-      setProductRatings(ratings);
+      const res = await getListings({ ...lastParamsRef.current, cursor: nextCursor });
+      if (res.success) {
+        const merged = [...products, ...res.products];
+        setNextCursor(res.next_cursor || null);
+        await fetchAllProductRatings(res.products, { merge: true });
+        applySort(merged, sortBy);
+      }
+    } catch (err) {
+      console.error("Error loading more products:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Badges for a whole page in one request (pages are within the server's 200-id limit)
+  const fetchAllProductRatings = async (productsToRate, { merge = false } = {}) => {
+    if (!merge) setProductRatings({});
+    if (productsToRate.length === 0) return;
+    setLoadingRatings(true);
+    try {
+      const res = await getProductRatings(productsToRate.map((product) => product.id));
+      if (res.success) {
+        const ratings = {};
+        Object.entries(res.ratings).forEach(([id, rating]) => {
+          ratings[id] = {
+            average_rating: rating.average || 0,
+            total_reviews: rating.count || 0,
+          };
+        });
+        setProductRatings((current) => (merge ? { ...current, ...ratings } : ratings));
+      }
     } catch (err) {
       console.error("Error fetching ratings:", err);
+    } finally {
+      setLoadingRatings(false);
     }
   };
 
@@ -156,7 +196,7 @@ const ProductCatalog = () => {
   const getImageUrl = (url) => {
     if (!url) return null;
     if (url.startsWith("http")) return url;
-    if (url.startsWith("/uploads/")) return `http://localhost:5000${url}`;
+    if (url.startsWith("/uploads/")) return `http://localhost:5000${url}?size=card`;
     return null;
   };
 
@@ -208,6 +248,7 @@ const ProductCatalog = () => {
             {LISTING_CATEGORY_OPTIONS.map((option) => (
               <option key={option.value} value={option.value}>
                 {option.label}
+                {categoryCounts[option.value] !== undefined ? ` (${categoryCounts[option.value]})` : ""}
               </option>
             ))}
           </select>
@@ -257,6 +298,8 @@ const ProductCatalog = () => {
               product={product}
               onDelete={handleDeleteProduct}
               getImageUrl={getImageUrl}
+              rating={productRatings[product.id]}
+              loadingRating={loadingRatings && !productRatings[product.id]}
             />
           ))
         )}
@@ -264,7 +307,7 @@ const ProductCatalog = () => {
 
       {products.length > 0 && (
         <div className="text-center text-white/60">
-          Showing {products.length} item{products.length > 1 ? "s" : ""} • Sorted by{" "}
+          Showing {products.length}{totalProducts > products.length ? ` of ${totalProducts}` : ""} item{products.length > 1 ? "s" : ""} • Sorted by{" "}
           {sortBy === "newest" && "Newest"}
           {sortBy === "price-low" && "Price: Low to High"}
           {sortBy === "price-high" && "Price: High to Low"}
@@ -273,6 +316,14 @@ const ProductCatalog = () => {
           {sortBy === "brand" && "Brand"}
         </div>
       )}
+
+      {nextCursor && (
+        <div className="text-center">
+          <button onClick={loadMore} disabled={loadingMore} className="btn-ghost text-sm">
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -40,10 +40,11 @@ const ProductDetails = () => {
     }
   };
 
-  const getImageUrl = (url) => {
+  // size picks a server-side derivative: thumb, card or full
+  const getImageUrl = (url, size = "full") => {
     if (!url) return null;
     if (url.startsWith("http")) return url;
-    if (url.startsWith("/uploads/")) return `http://localhost:5000${url}`;
+    if (url.startsWith("/uploads/")) return `http://localhost:5000${url}?size=${size}`;
     return null;
   };
 
@@ -146,7 +147,7 @@ const ProductDetails = () => {
           ) : (
             <div className="grid gap-6 sm:grid-cols-2 lg:grid-cols-3">
               {recommendations.map((item) => {
-                const recImage = getImageUrl(item.image_url);
+                const recImage = getImageUrl(item.image_url, "card");
                 return (
                   <div
                     key={item.id}
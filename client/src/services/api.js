@@ -100,6 +100,11 @@ export const getListings = async (filters = {}) => {
   return res.data;
 };
 
+export const getListingFacets = async (filters = {}) => {
+  const res = await api.get("/products/facets", { params: filters });
+  return res.data;
+};
+
 export const getProduct = async (id) => {
   const res = await api.get(`/products/listings/${id}`);
   return res.data;
@@ -134,8 +139,17 @@ export const submitProductFeedback = async (feedbackData) => {
   return res.data;
 };
 
-export const getProductFeedback = async (productId) => {
-  const res = await api.get(`/feedback/product/${productId}`);
+// One page of reviews, newest first; pass { cursor: next_cursor } for the next page
+export const getProductFeedback = async (productId, params = {}) => {
+  const res = await api.get(`/feedback/product/${productId}`, { params });
+  return res.data;
+};
+
+// Rating aggregates (count, average, histogram) for many products in one request
+export const getProductRatings = async (productIds) => {
+  const res = await api.get("/feedback/ratings", {
+    params: { product_ids: productIds.join(",") },
+  });
   return res.data;
 };
 
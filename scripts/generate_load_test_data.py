@@ -0,0 +1,408 @@
+# scripts/generate_load_test_data.py
+"""
+Vectorized synthetic data generator for load testing.
+
+Produces the same product distribution as generate_sample_data.py but builds
+each chunk with NumPy instead of per-row Python calls, and streams chunks to
+disk so millions of rows never sit in memory at once. It can also emit
+products.json, messages_store.json, escrow_store.json and feedback_store.json
+in the server's formats for benchmarking every store at realistic volume.
+
+Examples:
+    python scripts/generate_load_test_data.py --rows 1000000
+    python scripts/generate_load_test_data.py --rows 0 --listings 100000 --threads 20000 \
+        --escrows 20000 --feedback 50000 --output-dir data/load_test
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from generate_sample_data import (
+    CATEGORIES,
+    CONDITION_MULTIPLIERS,
+    CONDITIONS,
+    LOCATIONS,
+    USAGE_CATEGORIES,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+CATEGORY_NAMES = np.array(list(CATEGORIES.keys()))
+MAX_BRANDS = max(len(c['brands']) for c in CATEGORIES.values())
+
+# Brand lookup table padded to a rectangle so brands can be picked with fancy indexing
+BRAND_TABLE = np.array([
+    c['brands'] + [c['brands'][-1]] * (MAX_BRANDS - len(c['brands']))
+    for c in CATEGORIES.values()
+], dtype=object)
+BRAND_COUNTS = np.array([len(c['brands']) for c in CATEGORIES.values()])
+PRICE_MIN = np.array([c['base_price_range'][0] for c in CATEGORIES.values()])
+PRICE_MAX = np.array([c['base_price_range'][1] for c in CATEGORIES.values()])
+HAS_USAGE = np.isin(CATEGORY_NAMES, USAGE_CATEGORIES)
+
+CONDITION_NAMES = np.array(CONDITIONS)
+CONDITION_VALUES = np.array([CONDITION_MULTIPLIERS[c] for c in CONDITIONS])
+LOCATION_NAMES = np.array(LOCATIONS)
+
+# Model categories -> marketplace listing categories used by the client
+LISTING_CATEGORIES = {
+    'Laptop': 'computers',
+    'Mobile': 'mobile_devices',
+    'Furniture': 'furniture',
+    'Bike': 'sports',
+    'Camera': 'cameras',
+}
+
+ESCROW_STATUSES = np.array(['AWAITING_SELLER', 'AWAITING_BUYER_CONFIRMATION', 'COMPLETED', 'UNDER_REVIEW'])
+ESCROW_STATUS_WEIGHTS = np.array([0.35, 0.25, 0.35, 0.05])
+
+MESSAGE_PHRASES = np.array([
+    'hi, is this still available?',
+    'can you do a lower price?',
+    'what is the final price',
+    'is the warranty still valid',
+    'can I see more photos',
+    'when can I pick it up',
+    'bike pickup tomorrow evening works for me',
+    'does it come with the original box',
+    'I can meet near the metro station',
+    'payment through escrow is fine',
+    'shipped today, tracking shared',
+    'received, thanks!',
+])
+
+REVIEW_COMMENTS = np.array([
+    'Exactly as described',
+    'Good condition for the price',
+    'Seller was quick to respond',
+    'Slightly used but works fine',
+    'Not as described, disappointed',
+    'Great deal, would buy again',
+])
+RATING_WEIGHTS = np.array([0.05, 0.07, 0.15, 0.33, 0.40])
+
+
+# ------------------------ TRAINING DATA ------------------------
+
+def generate_product_chunk(rng, start, size, today=None):
+    """Generate `size` training rows numbered from `start`, same distribution as generate_sample_data."""
+    today = today or datetime.now()
+
+    cat_idx = rng.integers(0, len(CATEGORY_NAMES), size)
+    brand_pos = (rng.random(size) * BRAND_COUNTS[cat_idx]).astype(np.int64)
+    original_price = rng.integers(PRICE_MIN[cat_idx], PRICE_MAX[cat_idx] + 1)
+    age_years = np.round(rng.uniform(0, 5, size), 2)
+    cond_idx = rng.integers(0, len(CONDITION_NAMES), size)
+
+    age_depreciation = np.maximum(0.3, 1 - age_years * 0.15)
+    resale_price = (original_price * CONDITION_VALUES[cond_idx] * age_depreciation).astype(np.int64)
+    noise = rng.uniform(-0.1, 0.1, size)
+    resale_price = (resale_price * (1 + noise)).astype(np.int64)
+
+    usage_hours = np.where(
+        HAS_USAGE[cat_idx],
+        (age_years * 365 * rng.uniform(2, 8, size)).astype(np.int64),
+        0,
+    )
+
+    days_ago = rng.integers(1, 366, size)
+    created_at = (np.datetime64(today.date(), 'D') - days_ago).astype(str)
+
+    ids = np.arange(start + 1, start + size + 1).astype(str)
+
+    return pd.DataFrame({
+        'product_id': np.char.add('PROD_', np.char.zfill(ids, 5)),
+        'category': CATEGORY_NAMES[cat_idx],
+        'brand': BRAND_TABLE[cat_idx, brand_pos],
+        'original_price': original_price,
+        'age_years': age_years,
+        'condition': CONDITION_NAMES[cond_idx],
+        'usage_hours': usage_hours,
+        'resale_price': resale_price,
+        'location': LOCATION_NAMES[rng.integers(0, len(LOCATION_NAMES), size)],
+        'has_warranty': rng.random(size) < 0.5,
+        'has_box': rng.random(size) < 0.5,
+        'created_at': created_at,
+    })
+
+
+def write_training_data(rng, n_rows, chunk_size, output_dir, fmt):
+    """Stream generated training rows to CSV or Parquet chunk by chunk."""
+    path = os.path.join(output_dir, f"product_data.{fmt}")
+    if os.path.exists(path):
+        os.remove(path)
+
+    writer = None
+    written = 0
+    try:
+        while written < n_rows:
+            size = min(chunk_size, n_rows - written)
+            df = generate_product_chunk(rng, written, size)
+            if fmt == 'parquet':
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                df.to_csv(path, mode='a', header=written == 0, index=False)
+            written += size
+            print(f"   {written:,}/{n_rows:,} rows")
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+# ------------------------ STORE DATA ------------------------
+
+class JsonArrayWriter:
+    """Writes a JSON array one element at a time."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.count = 0
+
+    def __enter__(self):
+        self.handle.write('[')
+        return self
+
+    def write_many(self, items):
+        for item in items:
+            self.handle.write(',\n' if self.count else '\n')
+            self.handle.write(json.dumps(item))
+            self.count += 1
+
+    def __exit__(self, *exc):
+        self.handle.write('\n]')
+        return False
+
+
+def random_uuids(rng, size):
+    """Vectorized uuid4 strings."""
+    raw = rng.integers(0, 256, (size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return [str(uuid.UUID(bytes=row.tobytes())) for row in raw]
+
+
+def random_timestamps(rng, size, now, max_days=365):
+    """ISO timestamps spread over the last `max_days` days."""
+    seconds = rng.integers(0, max_days * 86400, size)
+    base = np.datetime64(now.replace(microsecond=0), 's')
+    return (base - seconds.astype('timedelta64[s]')).astype(str)
+
+
+def generate_listing_chunk(rng, size, n_users, now):
+    """Generate listings in products.json format, returning (listings, id/user/price arrays)."""
+    df = generate_product_chunk(rng, 0, size, now)
+    ids = random_uuids(rng, size)
+    users = np.char.add('user_', rng.integers(0, n_users, size).astype(str))
+    year = now.year - np.floor(df['age_years'].to_numpy()).astype(np.int64)
+    created = random_timestamps(rng, size, now)
+
+    listings = []
+    for i, row in enumerate(df.itertuples(index=False)):
+        listings.append({
+            'id': ids[i],
+            'title': f"{row.brand} {row.category}",
+            'price': float(row.resale_price),
+            'category': LISTING_CATEGORIES[row.category],
+            'description': f"{row.condition} condition {row.brand} {row.category.lower()}, {row.age_years} years old",
+            'brand': row.brand,
+            'condition': row.condition.lower(),
+            'year': int(year[i]),
+            'image_url': '',
+            'created_at': created[i],
+            'user_id': users[i],
+            'original_price': float(row.original_price),
+            'location': row.location,
+        })
+    return listings, np.array(ids), users, df['resale_price'].to_numpy()
+
+
+def write_store_data(rng, args):
+    """Emit products.json, messages_store.json, escrow_store.json and feedback_store.json."""
+    now = datetime.utcnow()
+    n_users = max(2, args.listings // 20)
+    product_ids, sellers, prices = [], [], []
+
+    with open(os.path.join(args.output_dir, 'products.json'), 'w') as f, JsonArrayWriter(f) as out:
+        remaining = args.listings
+        while remaining > 0:
+            size = min(args.chunk_size, remaining)
+            listings, ids, users, chunk_prices = generate_listing_chunk(rng, size, n_users, now)
+            out.write_many(listings)
+            product_ids.append(ids)
+            sellers.append(users)
+            prices.append(chunk_prices)
+            remaining -= size
+    print(f"✅ products.json: {args.listings:,} listings")
+
+    if args.listings == 0:
+        return
+    product_ids = np.concatenate(product_ids)
+    sellers = np.concatenate(sellers)
+    prices = np.concatenate(prices)
+
+    def pick(size):
+        idx = rng.integers(0, len(product_ids), size)
+        buyers = np.char.add('user_', rng.integers(0, n_users, size).astype(str))
+        # A buyer never negotiates with themselves
+        buyers = np.where(buyers == sellers[idx], np.char.add(buyers, '_b'), buyers)
+        return idx, buyers
+
+    with open(os.path.join(args.output_dir, 'messages_store.json'), 'w') as f, JsonArrayWriter(f) as out:
+        remaining = args.threads
+        while remaining > 0:
+            size = min(args.chunk_size, remaining)
+            idx, buyers = pick(size)
+            counts = rng.poisson(args.messages_per_thread, size)
+            started = random_timestamps(rng, size, now - timedelta(days=1))
+            threads = []
+            for i in range(size):
+                product_id, seller, buyer = product_ids[idx[i]], sellers[idx[i]], buyers[i]
+                n = int(counts[i])
+                phrases = MESSAGE_PHRASES[rng.integers(0, len(MESSAGE_PHRASES), n)]
+                senders = np.where(rng.random(n) < 0.5, buyer, seller)
+                start = datetime.fromisoformat(started[i])
+                offsets = np.cumsum(rng.integers(30, 3600, n))
+                message_ids = random_uuids(rng, n)
+                messages = [
+                    {
+                        'id': message_ids[j],
+                        'sender_id': str(senders[j]),
+                        'content': str(phrases[j]),
+                        'timestamp': (start + timedelta(seconds=int(offsets[j]))).isoformat(),
+                        'read': bool(j < n - 2),
+                    }
+                    for j in range(n)
+                ]
+                threads.append({
+                    'thread_id': f"{product_id}_{buyer}_{seller}",
+                    'product_id': str(product_id),
+                    'buyer_id': str(buyer),
+                    'seller_id': str(seller),
+                    'created_at': start.isoformat(),
+                    'updated_at': messages[-1]['timestamp'] if messages else start.isoformat(),
+                    'messages': messages,
+                    'status': 'active',
+                    'escrow_id': None,
+                })
+            out.write_many(threads)
+            remaining -= size
+    print(f"✅ messages_store.json: {args.threads:,} threads")
+
+    with open(os.path.join(args.output_dir, 'escrow_store.json'), 'w') as f, JsonArrayWriter(f) as out:
+        remaining = args.escrows
+        while remaining > 0:
+            size = min(args.chunk_size, remaining)
+            idx, buyers = pick(size)
+            statuses = rng.choice(ESCROW_STATUSES, size, p=ESCROW_STATUS_WEIGHTS)
+            created = random_timestamps(rng, size, now)
+            ids = random_uuids(rng, size)
+            entries = []
+            for i in range(size):
+                seller, buyer, status = str(sellers[idx[i]]), str(buyers[i]), str(statuses[i])
+                actions = [('ESCROW_CREATED', 'system')]
+                if status != 'AWAITING_SELLER':
+                    actions.append(('SELLER_CONFIRMED_SHIPMENT', seller))
+                if status == 'COMPLETED':
+                    actions.append(('BUYER_RELEASED_FUNDS', buyer))
+                if status == 'UNDER_REVIEW':
+                    actions.append(('BUYER_RAISED_DISPUTE::Item not as described', 'buyer'))
+                entries.append({
+                    'id': ids[i],
+                    'product_id': str(product_ids[idx[i]]),
+                    'product_title': 'Load test item',
+                    'buyer_id': buyer,
+                    'seller_id': seller,
+                    'amount': float(prices[idx[i]]),
+                    'currency': 'INR',
+                    'status': status,
+                    'buyer_token': uuid.UUID(bytes=rng.bytes(16)).hex,
+                    'seller_token': uuid.UUID(bytes=rng.bytes(16)).hex,
+                    'created_at': created[i],
+                    'updated_at': created[i],
+                    'timeline': [
+                        {'id': str(uuid.UUID(bytes=rng.bytes(16))), 'action': action,
+                         'actor': actor, 'timestamp': created[i]}
+                        for action, actor in actions
+                    ],
+                })
+            out.write_many(entries)
+            remaining -= size
+    print(f"✅ escrow_store.json: {args.escrows:,} sessions")
+
+    with open(os.path.join(args.output_dir, 'feedback_store.json'), 'w') as f:
+        f.write('{"product_feedback": ')
+        with JsonArrayWriter(f) as out:
+            remaining = args.feedback
+            while remaining > 0:
+                size = min(args.chunk_size, remaining)
+                idx = rng.integers(0, len(product_ids), size)
+                ratings = rng.choice(np.arange(1, 6), size, p=RATING_WEIGHTS)
+                comments = REVIEW_COMMENTS[rng.integers(0, len(REVIEW_COMMENTS), size)]
+                stamps = random_timestamps(rng, size, now)
+                ids = random_uuids(rng, size)
+                out.write_many(
+                    {
+                        'id': ids[i],
+                        'product_id': str(product_ids[idx[i]]),
+                        'rating': int(ratings[i]),
+                        'comment': str(comments[i]),
+                        'user_name': f"user_{int(rng.integers(0, n_users))}",
+                        'timestamp': stamps[i],
+                    }
+                    for i in range(size)
+                )
+                remaining -= size
+        f.write(', "general_feedback": []}')
+    print(f"✅ feedback_store.json: {args.feedback:,} reviews")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large synthetic datasets for load testing.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='training rows for product_data')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--output-dir', default='data/load_test')
+    parser.add_argument('--listings', type=int, default=0, help='listings for products.json')
+    parser.add_argument('--threads', type=int, default=0, help='message threads for messages_store.json')
+    parser.add_argument('--messages-per-thread', type=float, default=5.0)
+    parser.add_argument('--escrows', type=int, default=0, help='sessions for escrow_store.json')
+    parser.add_argument('--feedback', type=int, default=0, help='reviews for feedback_store.json')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.format == 'parquet' and pq is None:
+        parser.error("Parquet output requires pyarrow (pip install pyarrow)")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+
+    if args.rows:
+        started = time.perf_counter()
+        path = write_training_data(rng, args.rows, args.chunk_size, args.output_dir, args.format)
+        elapsed = time.perf_counter() - started
+        print(f"✅ {args.rows:,} rows saved to {path} in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+    if any([args.listings, args.threads, args.escrows, args.feedback]):
+        if args.listings == 0 and (args.threads or args.escrows or args.feedback):
+            parser.error("--threads/--escrows/--feedback need --listings to reference")
+        write_store_data(rng, args)
+
+
+if __name__ == "__main__":
+    main()
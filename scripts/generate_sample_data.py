@@ -5,39 +5,49 @@ import random
 from datetime import datetime, timedelta
 import os
 
+CATEGORIES = {
+    'Laptop': {
+        'brands': ['Dell', 'HP', 'Lenovo', 'Apple', 'Asus', 'Acer'],
+        'base_price_range': (30000, 150000)
+    },
+    'Mobile': {
+        'brands': ['Apple', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo'],
+        'base_price_range': (8000, 100000)
+    },
+    'Furniture': {
+        'brands': ['IKEA', 'Godrej', 'Durian', 'Urban Ladder', 'Pepperfry', 'Generic'],
+        'base_price_range': (3000, 50000)
+    },
+    'Bike': {
+        'brands': ['Hero', 'Honda', 'Bajaj', 'TVS', 'Royal Enfield', 'Yamaha'],
+        'base_price_range': (30000, 200000)
+    },
+    'Camera': {
+        'brands': ['Canon', 'Nikon', 'Sony', 'Fujifilm', 'Panasonic'],
+        'base_price_range': (15000, 150000)
+    }
+}
+
+CONDITIONS = ['Excellent', 'Good', 'Fair', 'Poor']
+CONDITION_MULTIPLIERS = {
+    'Excellent': 0.85,
+    'Good': 0.65,
+    'Fair': 0.45,
+    'Poor': 0.25
+}
+
+# Categories whose items accumulate usage hours
+USAGE_CATEGORIES = ['Laptop', 'Mobile', 'Camera']
+
+LOCATIONS = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Pune']
+
+
 def generate_sample_data(n_samples=1000):
     """Generate realistic sample product data"""
     
-    categories = {
-        'Laptop': {
-            'brands': ['Dell', 'HP', 'Lenovo', 'Apple', 'Asus', 'Acer'],
-            'base_price_range': (30000, 150000)
-        },
-        'Mobile': {
-            'brands': ['Apple', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo'],
-            'base_price_range': (8000, 100000)
-        },
-        'Furniture': {
-            'brands': ['IKEA', 'Godrej', 'Durian', 'Urban Ladder', 'Pepperfry', 'Generic'],
-            'base_price_range': (3000, 50000)
-        },
-        'Bike': {
-            'brands': ['Hero', 'Honda', 'Bajaj', 'TVS', 'Royal Enfield', 'Yamaha'],
-            'base_price_range': (30000, 200000)
-        },
-        'Camera': {
-            'brands': ['Canon', 'Nikon', 'Sony', 'Fujifilm', 'Panasonic'],
-            'base_price_range': (15000, 150000)
-        }
-    }
-    
-    conditions = ['Excellent', 'Good', 'Fair', 'Poor']
-    condition_multipliers = {
-        'Excellent': 0.85,
-        'Good': 0.65,
-        'Fair': 0.45,
-        'Poor': 0.25
-    }
+    categories = CATEGORIES
+    conditions = CONDITIONS
+    condition_multipliers = CONDITION_MULTIPLIERS
     
     products = []
     
@@ -58,7 +68,7 @@ def generate_sample_data(n_samples=1000):
         noise = random.uniform(-0.1, 0.1)
         resale_price = int(resale_price * (1 + noise))
         
-        if category in ['Laptop', 'Mobile', 'Camera']:
+        if category in USAGE_CATEGORIES:
             usage_hours = int(age_years * 365 * random.uniform(2, 8))
         else:
             usage_hours = 0
@@ -72,7 +82,7 @@ def generate_sample_data(n_samples=1000):
             'condition': condition,
             'usage_hours': usage_hours,
             'resale_price': resale_price,
-            'location': random.choice(['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Pune']),
+            'location': random.choice(LOCATIONS),
             'has_warranty': random.choice([True, False]),
             'has_box': random.choice([True, False]),
             'created_at': (datetime.now() - timedelta(days=random.randint(1, 365))).strftime('%Y-%m-%d')
@@ -1,13 +1,20 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 import os
 
 # Importing route blueprints
 from routes.ai_routes import ai_bp
-from routes.image_routes import image_bp
+from routes.image_routes import image_bp, send_image
 from routes.product_routes import product_bp
 from routes.logo_routes import logo_bp
 from routes.feedback_routes import feedback_bp
+from routes.messaging_routes import messaging_bp
+from routes.escrow_routes import escrow_bp
+from catalog import ingestion
+from escrow import start_scheduler
+import http_cache
+from storage import media
+from werkzeug.utils import secure_filename
 
 
 def create_app():
@@ -30,11 +37,16 @@ def create_app():
     app.register_blueprint(product_bp)
     app.register_blueprint(logo_bp)
     app.register_blueprint(feedback_bp)
+    app.register_blueprint(messaging_bp)
+    app.register_blueprint(escrow_bp)
 
     # Route to serve uploaded files
     @app.route('/uploads/<filename>')
     def serve_uploaded_file(filename):
-        return send_from_directory('uploads', filename)
+        path = os.path.join(media.MEDIA_ROOT, secure_filename(filename))
+        if not filename or not os.path.isfile(path):
+            return jsonify({'success': False, 'error': 'File not found'}), 404
+        return send_image(path, immutable=media.is_content_addressed(filename))
 
     # Basic home route for quick testing
     @app.route('/')
@@ -58,6 +70,20 @@ def create_app():
             ]
         })
 
+    # Response cache hit rates per endpoint
+    @app.route('/api/cache/stats')
+    def cache_stats():
+        return jsonify({'success': True, 'cache': http_cache.stats()})
+
+    # Re-queue listings whose background ingestion had not finished
+    ingestion.resume_pending()
+
+    # Drop image embeddings of deleted listings
+    ingestion.watch_deletes()
+
+    # Enforce escrow deadlines (auto-cancel / auto-release)
+    start_scheduler()
+
     return app
 
 
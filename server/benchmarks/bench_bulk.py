@@ -0,0 +1,126 @@
+# server/benchmarks/bench_bulk.py
+"""
+Bulk import/export throughput benchmark.
+
+Writes N synthetic listings to an NDJSON file, streams it through
+POST /api/products/import into an empty store, then streams
+GET /api/products/export back out, reporting rows per second for both and
+the peak Python memory allocated while exporting.
+
+The JSON backend rewrites its whole file on every batch, so large runs
+should use the default SQLite backend.
+
+Run from the server directory:
+    python -m benchmarks.bench_bulk [--size 1000000] [--backend sqlite]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from flask import Flask
+
+import storage
+from benchmarks.bench_storage import synthetic_products
+from benchmarks.common import compare_results, write_results
+
+GENERATE_CHUNK = 100000
+
+
+def write_ndjson(path, size, rng):
+    with open(path, 'w') as f:
+        for start in range(0, size, GENERATE_CHUNK):
+            for product in synthetic_products(min(GENERATE_CHUNK, size - start), rng):
+                del product['id'], product['created_at']
+                f.write(json.dumps(product) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk listing import and export.")
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--backend', choices=('sqlite', 'json'), default='sqlite')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    from routes.product_routes import product_bp
+
+    rng = np.random.default_rng(args.seed)
+    data_dir = tempfile.mkdtemp(prefix="bench-bulk-")
+    try:
+        source = os.path.join(data_dir, 'import.ndjson')
+        write_ndjson(source, args.size, rng)
+        file_bytes = os.path.getsize(source)
+        storage.configure(backend=args.backend, data_dir=data_dir, sqlite_path='bench.db')
+
+        app = Flask(__name__)
+        app.register_blueprint(product_bp)
+        client = app.test_client()
+
+        with open(source, 'rb') as f:
+            started = time.perf_counter()
+            response = client.post(
+                f"/api/products/import?ingest=false&batch_size={args.batch_size}",
+                input_stream=f, content_type='application/x-ndjson', content_length=file_bytes,
+            )
+            import_seconds = time.perf_counter() - started
+        summary = response.get_json()
+        assert summary['imported'] == args.size, summary
+        print(f"📥 Imported {summary['imported']:,} rows ({file_bytes / 2**20:.0f} MB) in "
+              f"{import_seconds:.1f}s — {args.size / import_seconds:,.0f} rows/s")
+
+        # First export also pays for loading the catalog
+        started = time.perf_counter()
+        response = client.get('/api/products/export')
+        exported = sum(chunk.count(b'\n') for chunk in response.response)
+        cold_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.get('/api/products/export')
+        exported_bytes = sum(len(chunk) for chunk in response.response)
+        export_seconds = time.perf_counter() - started
+
+        # Separate pass, since tracing slows allocation down
+        tracemalloc.start()
+        response = client.get('/api/products/export')
+        for _ in response.response:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert exported == args.size, exported
+        print(f"📤 Exported {exported:,} rows in {export_seconds:.1f}s — "
+              f"{exported / export_seconds:,.0f} rows/s (first export incl. catalog load {cold_seconds:.1f}s), "
+              f"peak traced memory {peak / 2**20:.1f} MB")
+
+        results = {
+            'size': args.size,
+            'backend': args.backend,
+            'batch_size': args.batch_size,
+            'import_seconds': round(import_seconds, 3),
+            'import_rows_per_second': round(args.size / import_seconds),
+            'import_batches': summary['batches'],
+            'export_cold_seconds': round(cold_seconds, 3),
+            'export_seconds': round(export_seconds, 3),
+            'export_rows_per_second': round(exported / export_seconds),
+            'export_bytes': exported_bytes,
+            'export_peak_traced_mb': round(peak / 2**20, 2),
+        }
+    finally:
+        storage.configure(backend=os.environ.get('STORAGE_BACKEND', 'json'), data_dir='')
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    path = write_results('bulk', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# server/benchmarks/bench_escrow_queries.py
+"""
+Escrow listing benchmark.
+
+Fills an EscrowIndex with N escrows spread over many buyers and sellers,
+then times dashboard queries (a buyer's escrows, a seller's escrows in
+one status, a week of escrows, per-status counts) through the index and
+through a scan of every entry, as a dashboard reading the whole store
+would do.
+
+Run from the server directory:
+    python -m benchmarks.bench_escrow_queries [--escrows 200000] [--users 20000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import compare_results, latency_summary, time_calls, write_results
+from escrow.index import EscrowIndex
+
+STATUSES = ["AWAITING_SELLER", "AWAITING_BUYER_CONFIRMATION", "COMPLETED", "CANCELLED", "UNDER_REVIEW"]
+
+
+def build(count, users, rng):
+    start = datetime(2026, 1, 1)
+    entries = [{
+        'id': f"e{i:08d}",
+        'buyer_id': f"u{rng.randrange(users)}",
+        'seller_id': f"u{rng.randrange(users)}",
+        'status': rng.choice(STATUSES),
+        'created_at': (start + timedelta(seconds=i * 60)).isoformat(),
+    } for i in range(count)]
+    index = EscrowIndex()
+    started = time.perf_counter()
+    for entry in entries:
+        index.update(entry)
+    return entries, index, time.perf_counter() - started
+
+
+def scan(entries, limit, buyer_id=None, seller_id=None, status=None, created_from=None, created_to=None):
+    rows = sorted(
+        (e['created_at'], e['id']) for e in entries
+        if (buyer_id is None or e['buyer_id'] == buyer_id)
+        and (seller_id is None or e['seller_id'] == seller_id)
+        and (status is None or e['status'] == status)
+        and (created_from is None or e['created_at'] >= created_from)
+        and (created_to is None or e['created_at'] < created_to)
+    )
+    return [escrow_id for _, escrow_id in rows[::-1][:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed escrow queries.")
+    parser.add_argument('--escrows', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries, index, build_seconds = build(args.escrows, args.users, rng)
+    print(f"📇 Indexed {len(entries):,} escrows in {build_seconds:.2f}s")
+
+    middle = entries[len(entries) // 2]['created_at']
+    week_end = (datetime.fromisoformat(middle) + timedelta(days=7)).isoformat()
+    queries = {
+        'buyer': {'buyer_id': 'u7'},
+        'seller_status': {'seller_id': 'u11', 'status': 'COMPLETED'},
+        'week': {'created_from': middle, 'created_to': week_end},
+        'status_week': {'status': 'UNDER_REVIEW', 'created_from': middle, 'created_to': week_end},
+    }
+
+    results = {'escrows': args.escrows, 'build_seconds': round(build_seconds, 3), 'queries': {}}
+    for name, query in queries.items():
+        params = dict(query)
+        status = params.pop('status', None)
+        indexed, _, _ = index.page(statuses={status} if status else None, limit=50, **params)
+        scanned = scan(entries, 50, status=status, **params)
+        assert indexed == scanned, name
+        index_ms = time_calls(lambda: index.page(statuses={status} if status else None, limit=50, **params),
+                              args.iterations)
+        scan_ms = time_calls(lambda: scan(entries, 50, status=status, **params), max(5, args.iterations // 20))
+        results['queries'][name] = {'index': latency_summary(index_ms), 'scan': latency_summary(scan_ms)}
+        print(f"🔎 {name:14s} index p50 {results['queries'][name]['index']['p50_ms']:.3f} ms, "
+              f"scan p50 {results['queries'][name]['scan']['p50_ms']:.1f} ms")
+
+    counts_ms = time_calls(lambda: index.status_counts(buyer_id='u7'), args.iterations)
+    results['status_counts'] = latency_summary(counts_ms)
+    print(f"🧮 status counts p50 {results['status_counts']['p50_ms']:.4f} ms")
+
+    path = write_results('escrow_queries', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
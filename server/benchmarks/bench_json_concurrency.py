@@ -0,0 +1,121 @@
+# server/benchmarks/bench_json_concurrency.py
+"""
+Concurrency stress test for the JSON file stores.
+
+Many threads (optionally in several processes) insert listings and
+increment a shared counter record at the same time. Afterwards every insert
+must be present exactly once and the counter must equal the number of
+increments, i.e. no update was lost. Also reports how many file rewrites
+group commit needed for the mutations performed.
+
+Run from the server directory:
+    python -m benchmarks.bench_json_concurrency [--threads 16] [--ops 50] [--processes 2]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import storage
+from benchmarks.common import write_results
+
+COUNTER_ID = "counter"
+
+
+def worker_process(data_dir, threads, ops, queue):
+    """Run `threads` writer threads against the store in data_dir."""
+    storage.configure(backend="json", data_dir=data_dir)
+    products = storage.get_collection("products")
+
+    def increment(record):
+        record["price"] = record["price"] + 1
+
+    def writer(n):
+        for i in range(ops):
+            products.insert({"id": str(uuid.uuid4()), "title": f"t{n}-{i}", "price": 1.0,
+                             "category": "bench", "user_id": f"pid{os.getpid()}"})
+            products.modify(COUNTER_ID, increment)
+
+    committer = products.document.committer
+    # Counters may be inherited from the parent when processes fork
+    base_mutations, base_batches = committer.mutations, committer.batches
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    queue.put({
+        "seconds": time.perf_counter() - started,
+        "mutations": committer.mutations - base_mutations,
+        "file_writes": committer.batches - base_batches,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the JSON stores with concurrent writers.")
+    parser.add_argument("--threads", type=int, default=16, help="writer threads per process")
+    parser.add_argument("--ops", type=int, default=50, help="insert+increment pairs per thread")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench-json-concurrency-")
+    try:
+        storage.configure(backend="json", data_dir=data_dir)
+        storage.get_collection("products").insert({"id": COUNTER_ID, "title": "counter", "price": 0.0})
+
+        queue = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=worker_process, args=(data_dir, args.threads, args.ops, queue))
+            for _ in range(args.processes)
+        ]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        reports = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        storage.configure(backend="json", data_dir=data_dir)
+        records = storage.get_collection("products").all()
+        expected = args.processes * args.threads * args.ops
+        inserted = [r for r in records if r["id"] != COUNTER_ID]
+        counter = next(r for r in records if r["id"] == COUNTER_ID)
+        mutations = sum(r["mutations"] for r in reports)
+        writes = sum(r["file_writes"] for r in reports)
+
+        results = {
+            "processes": args.processes,
+            "threads_per_process": args.threads,
+            "expected_inserts": expected,
+            "inserted": len(inserted),
+            "unique_ids": len({r["id"] for r in inserted}),
+            "counter": int(counter["price"]),
+            "mutations": mutations,
+            "file_writes": writes,
+            "mutations_per_write": round(mutations / writes, 2) if writes else 0,
+            "seconds": round(elapsed, 3),
+            "mutations_per_second": round(mutations / elapsed, 1),
+        }
+        ok = len(inserted) == results["unique_ids"] == expected and results["counter"] == expected
+        results["consistent"] = ok
+        for key, value in results.items():
+            print(f"   {key:<22} {value}")
+        path = write_results("json_concurrency", results, args.output)
+        print(f"{'✅' if ok else '❌'} Results saved to {path}")
+        if not ok:
+            raise SystemExit(1)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
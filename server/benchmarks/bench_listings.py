@@ -0,0 +1,95 @@
+# server/benchmarks/bench_listings.py
+"""
+Listing query benchmark.
+
+Loads N synthetic listings into a JSON product store, warms the catalog
+and measures GET /api/products/listings latency for the first page and a
+follow-up cursor page of typical queries.
+
+Run from the server directory:
+    python -m benchmarks.bench_listings [--size 1000000] [--iterations 200]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from flask import Flask
+
+import storage
+from benchmarks.bench_storage import synthetic_products
+from benchmarks.common import compare_results, latency_summary, time_calls, write_results
+
+QUERIES = {
+    'newest_first': 'sort=created_at&order=desc',
+    'category_price_range': 'category=electronics&min_price=10000&max_price=20000&sort=price',
+    'category_price_range_desc': 'category=furniture&min_price=5000&max_price=150000&sort=price&order=desc',
+    'narrow_range_by_date': 'category=sports&min_price=1000&max_price=1200&sort=created_at&order=desc',
+    'wide_range_by_date': 'min_price=1000&max_price=150000&sort=created_at',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark paginated listing queries.")
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    from catalog import get_catalog
+    from routes.product_routes import product_bp
+
+    rng = np.random.default_rng(args.seed)
+    data_dir = tempfile.mkdtemp(prefix="bench-listings-")
+    try:
+        products = synthetic_products(args.size, rng)
+        days = rng.integers(0, 365, args.size)
+        for product, day in zip(products, days):
+            product['created_at'] = f"2025-{1 + day // 31 % 12:02d}-{1 + day % 28:02d}T00:00:00"
+        with open(os.path.join(data_dir, 'products.json'), 'w') as f:
+            json.dump(products, f)
+        del products
+        storage.configure(backend='json', data_dir=data_dir)
+
+        started = time.perf_counter()
+        catalog_size = get_catalog().count()
+        load_seconds = time.perf_counter() - started
+        print(f"📦 Catalog of {catalog_size:,} listings loaded in {load_seconds:.2f}s")
+
+        app = Flask(__name__)
+        app.register_blueprint(product_bp)
+        client = app.test_client()
+
+        results = {'size': args.size, 'catalog_load_seconds': round(load_seconds, 3), 'queries': {}}
+        for name, query in QUERIES.items():
+            url = f"/api/products/listings?{query}&limit={args.limit}"
+            first = client.get(url).get_json()
+            cursor = first['next_cursor']
+
+            first_page = latency_summary(time_calls(lambda: client.get(url), args.iterations))
+            entry = {'total': first['total'], 'first_page': first_page}
+            if cursor:
+                next_url = f"{url}&cursor={cursor}"
+                entry['next_page'] = latency_summary(time_calls(lambda: client.get(next_url), args.iterations))
+            results['queries'][name] = entry
+            print(f"   {name:<28} total={first['total']:>9,}  p50={first_page['p50_ms']:.2f}ms  "
+                  f"p99={first_page['p99_ms']:.2f}ms")
+    finally:
+        storage.configure(backend=os.environ.get('STORAGE_BACKEND', 'json'), data_dir='')
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    path = write_results('listings', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# server/benchmarks/bench_price_predictor.py
+"""
+Price prediction benchmarks.
+
+Measures:
+  - cold start: loading model.pkl / scaler.pkl / label_encoders.pkl in a fresh interpreter
+  - single-call latency percentiles of predict_price
+  - batch throughput of predict_prices at several batch sizes
+  - end-to-end /api/ai/predict-price latency through the Flask test client
+
+Run from the server directory:
+    python -m benchmarks.bench_price_predictor [--iterations N] [--compare results/<file>.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+from flask import Flask
+
+from benchmarks.common import compare_results, latency_summary, time_calls, write_results
+from ml_services.price_predictor import predictor
+
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+COLD_START_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+import joblib
+import numpy
+imported = time.perf_counter()
+base = os.path.join('ml_services', 'price_predictor')
+timings = {'import_ms': (imported - started) * 1000}
+for name in ('model.pkl', 'scaler.pkl', 'label_encoders.pkl'):
+    t = time.perf_counter()
+    joblib.load(os.path.join(base, name))
+    timings[name] = (time.perf_counter() - t) * 1000
+t = time.perf_counter()
+import ml_services.price_predictor.predictor
+timings['predictor_module_ms'] = (time.perf_counter() - t) * 1000
+print(json.dumps(timings))
+"""
+
+
+def sample_requests(n, seed=0):
+    """Random but valid predictor inputs drawn from the encoders' known labels."""
+    rng = np.random.default_rng(seed)
+    lookups = predictor.encoder_lookups
+    mean = float(predictor.scaler.mean_[2])
+    std = float(predictor.scaler.var_[2]) ** 0.5
+
+    def choice(field, size):
+        labels = list(lookups[field].keys())
+        return [labels[i] for i in rng.integers(0, len(labels), size)]
+
+    categories, brands = choice('category', n), choice('brand', n)
+    conditions, locations = choice('condition', n), choice('location', n)
+    prices = np.clip(rng.normal(mean, std, n), max(1.0, mean - 2 * std), mean + 2 * std)
+    ages = np.round(rng.uniform(0, 5, n), 2)
+    return [
+        {
+            'category': categories[i],
+            'brand': brands[i],
+            'condition': conditions[i],
+            'location': locations[i],
+            'original_price': float(prices[i]),
+            'age_years': float(ages[i]),
+            'has_warranty': bool(rng.random() < 0.5),
+            'has_box': bool(rng.random() < 0.5),
+            'usage_hours': int(rng.integers(0, 5000)),
+        }
+        for i in range(n)
+    ]
+
+
+def bench_cold_start(runs):
+    """Load the model artifacts in fresh interpreters and summarise each step."""
+    samples = {}
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', COLD_START_SCRIPT], text=True)
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(key, []).append(value)
+    return {key: latency_summary(values) for key, values in samples.items()}
+
+
+def bench_single(payloads, iterations):
+    """Latency of one predict_price call at a time."""
+    cursor = iter(payloads * (iterations // len(payloads) + 2))
+    return latency_summary(time_calls(lambda: predictor.predict_price(next(cursor)), iterations))
+
+
+def bench_batches(batch_sizes, rounds):
+    """Throughput of predict_prices for each batch size."""
+    results = {}
+    for size in batch_sizes:
+        rows = sample_requests(size, seed=size)
+        predictor.predict_prices(rows)  # warm up
+        samples = time_calls(lambda: predictor.predict_prices(rows), rounds, warmup=0)
+        summary = latency_summary(samples)
+        summary['rows_per_second'] = round(size / (summary['mean_ms'] / 1000), 1)
+        results[str(size)] = summary
+    return results
+
+
+def bench_endpoint(payloads, iterations):
+    """End-to-end /api/ai/predict-price latency through the Flask test client."""
+    from routes.ai_routes import ai_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(ai_bp)
+    client = app.test_client()
+    cursor = iter(payloads * (iterations // len(payloads) + 2))
+    statuses = {}
+
+    def call():
+        response = client.post('/api/ai/predict-price', json=next(cursor))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    summary = latency_summary(time_calls(call, iterations))
+    summary['status_codes'] = {str(k): v for k, v in statuses.items()}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price prediction.")
+    parser.add_argument('--iterations', type=int, default=500, help='single-call and endpoint samples')
+    parser.add_argument('--batch-rounds', type=int, default=20)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument('--cold-runs', type=int, default=3)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<name>-<time>.json)')
+    parser.add_argument('--compare', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    payloads = sample_requests(200)
+    results = {}
+
+    started = time.perf_counter()
+    print("⏱  Cold start...")
+    results['cold_start'] = bench_cold_start(args.cold_runs)
+    print("⏱  Single-call latency...")
+    results['single_call'] = bench_single(payloads, args.iterations)
+    print("⏱  Batch throughput...")
+    results['batch'] = bench_batches(args.batch_sizes, args.batch_rounds)
+    print("⏱  Endpoint latency...")
+    results['endpoint'] = bench_endpoint(payloads, args.iterations)
+    results['model_version'] = predictor.model_version()
+    results['wall_time_s'] = round(time.perf_counter() - started, 2)
+
+    print(json.dumps(results, indent=2))
+    path = write_results('price_predictor', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# server/benchmarks/bench_ratings.py
+"""
+Product rating benchmark.
+
+Writes N synthetic product reviews into a JSON feedback store and measures
+the rating badges for one page of listing cards: one bulk request to
+GET /api/feedback/ratings against the previous approach of filtering the
+store and averaging once per product. Also times a review page and the
+incremental update after a new review.
+
+Run from the server directory:
+    python -m benchmarks.bench_ratings [--reviews 200000] [--products 20000] [--page 50]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from flask import Flask
+
+import storage
+from benchmarks.common import compare_results, latency_summary, time_calls, write_results
+
+
+def old_badges(product_ids):
+    """Rating badges the way get_product_feedback computed them: one filtered read per product."""
+    badges = {}
+    for product_id in product_ids:
+        feedback = storage.get_collection("product_feedback").find({"product_id": product_id})
+        badges[product_id] = sum(f["rating"] for f in feedback) / len(feedback) if feedback else 0
+    return badges
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product rating aggregates.")
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--page', type=int, default=50, help="listing cards per page")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    from catalog.ratings import get_ratings
+    from routes.feedback_routes import feedback_bp
+
+    rng = np.random.default_rng(args.seed)
+    data_dir = tempfile.mkdtemp(prefix="bench-ratings-")
+    try:
+        products = rng.integers(0, args.products, args.reviews)
+        ratings = rng.integers(1, 6, args.reviews)
+        feedback = [{
+            'id': f"r{i}", 'product_id': f"p{product}", 'rating': int(rating),
+            'comment': "synthetic review", 'user_name': "bench",
+            'timestamp': f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:{i % 60:02d}",
+        } for i, (product, rating) in enumerate(zip(products, ratings))]
+        with open(os.path.join(data_dir, 'feedback_store.json'), 'w') as f:
+            json.dump({'product_feedback': feedback, 'general_feedback': []}, f)
+        del feedback
+        storage.configure(backend='json', data_dir=data_dir)
+
+        app = Flask(__name__)
+        app.register_blueprint(feedback_bp)
+        client = app.test_client()
+
+        started = time.perf_counter()
+        get_ratings().aggregates([])
+        load_seconds = time.perf_counter() - started
+        print(f"⭐ Indexed {args.reviews:,} reviews of {args.products:,} products in {load_seconds:.2f}s")
+
+        page = [f"p{i}" for i in range(args.page)]
+        url = '/api/feedback/ratings?product_ids=' + ','.join(page)
+        bulk = client.get(url).get_json()['ratings']
+        expected = old_badges(page)
+        assert all(abs(bulk[p]['average'] - round(expected[p], 1)) < 1e-9 for p in page)
+
+        # Index lookups without the response cache, then the endpoint as clients see it
+        index_ms = time_calls(lambda: get_ratings().aggregates(page), args.iterations)
+        endpoint_ms = time_calls(lambda: client.get(url), args.iterations)
+        old_ms = time_calls(lambda: old_badges(page), 3, warmup=1)
+        reviews_ms = time_calls(lambda: client.get('/api/feedback/product/p1?limit=20'), args.iterations)
+
+        def submit():
+            client.post('/api/feedback/product', json={'product_id': 'p1', 'rating': 4, 'comment': 'new'})
+            client.get(url)
+        submit_ms = time_calls(submit, 20, warmup=1)
+        assert get_ratings().reloads == 1, get_ratings().reloads
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    results = {
+        'reviews': args.reviews,
+        'products': args.products,
+        'page': args.page,
+        'load_seconds': round(load_seconds, 3),
+        'page_badges_index': latency_summary(index_ms),
+        'page_badges_endpoint': latency_summary(endpoint_ms),
+        'page_badges_per_product_scan': latency_summary(old_ms),
+        'review_page': latency_summary(reviews_ms),
+        'submit_then_badges': latency_summary(submit_ms),
+    }
+    print(f"🏷️  {args.page} badges: index p50 {results['page_badges_index']['p50_ms']:.3f} ms, "
+          f"endpoint p50 {results['page_badges_endpoint']['p50_ms']:.3f} ms, "
+          f"per-product scan p50 {results['page_badges_per_product_scan']['p50_ms']:.0f} ms")
+    print(f"📄 review page p50 {results['review_page']['p50_ms']:.3f} ms; "
+          f"submit + badges p50 {results['submit_then_badges']['p50_ms']:.1f} ms (no reload)")
+
+    path = write_results('ratings', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
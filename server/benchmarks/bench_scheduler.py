@@ -0,0 +1,134 @@
+# server/benchmarks/bench_scheduler.py
+"""
+Escrow deadline scheduler benchmark.
+
+Schedules N deadlines in a DeadlineHeap, reschedules a share of them (as
+escrow transitions do), then drains the heap in due order, reporting the
+cost per operation and the memory held per pending deadline. A second
+part runs the real scheduler over a temporary ledger: it creates escrows,
+moves the clock past their deadlines and times the automatic
+cancellations, then restarts from the ledger to time rebuilding the
+schedule.
+
+Run from the server directory:
+    python -m benchmarks.bench_scheduler [--deadlines 500000] [--escrows 5000]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from benchmarks.common import compare_results, write_results
+from escrow import ledger as ledger_module
+from escrow.ledger import EscrowLedger
+from escrow.scheduler import DeadlineHeap, EscrowScheduler, to_epoch
+
+
+def bench_heap(count, reschedule, rng):
+    heap = DeadlineHeap()
+    now = time.time()
+    keys = [f"e{i}" for i in range(count)]
+    dues = [now + rng.uniform(0, 7 * 86400) for _ in range(count)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for key, due in zip(keys, dues):
+        heap.schedule(key, due, 1)
+    schedule_seconds = time.perf_counter() - started
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    moved = rng.sample(keys, int(count * reschedule))
+    started = time.perf_counter()
+    for key in moved:
+        heap.schedule(key, now + rng.uniform(0, 7 * 86400), 2)
+    reschedule_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    drained = heap.pop_due(now + 8 * 86400)
+    drain_seconds = time.perf_counter() - started
+    assert len(drained) == count, len(drained)
+
+    print(f"⏱️  {count:,} deadlines: schedule {schedule_seconds / count * 1e6:.2f} µs, "
+          f"reschedule {reschedule_seconds / max(1, len(moved)) * 1e6:.2f} µs, "
+          f"pop {drain_seconds / count * 1e6:.2f} µs each; "
+          f"{traced / 2**20:.1f} MB ({traced / count:.0f} bytes per deadline)")
+    return {
+        'deadlines': count,
+        'schedule_us': round(schedule_seconds / count * 1e6, 3),
+        'reschedule_us': round(reschedule_seconds / max(1, len(moved)) * 1e6, 3),
+        'pop_us': round(drain_seconds / count * 1e6, 3),
+        'traced_mb': round(traced / 2**20, 2),
+        'bytes_per_deadline': round(traced / count),
+    }
+
+
+def bench_ledger(count):
+    root = tempfile.mkdtemp(prefix="bench-scheduler-")
+    fsync = ledger_module.FSYNC
+    ledger_module.FSYNC = False
+    try:
+        ledger = EscrowLedger(root)
+        scheduler = EscrowScheduler(ledger)
+        started = time.perf_counter()
+        for i in range(count):
+            ledger.create({
+                'id': str(uuid.uuid4()), 'product_id': 'p', 'buyer_id': f'b{i}', 'seller_id': f's{i}',
+                'amount': 1.0, 'status': 'AWAITING_SELLER', 'buyer_token': 'x', 'seller_token': 'y',
+            })
+        create_seconds = time.perf_counter() - started
+        assert scheduler.stats()['pending'] == count
+
+        latest = max(to_epoch(entry['deadline_at']) for entry in ledger.state().values())
+        started = time.perf_counter()
+        fired = scheduler.run_due(now=latest + 1)
+        fire_seconds = time.perf_counter() - started
+        assert fired == count, fired
+
+        started = time.perf_counter()
+        restarted = EscrowScheduler(EscrowLedger(root))
+        restarted.run_due(now=0)
+        rebuild_seconds = time.perf_counter() - started
+    finally:
+        ledger_module.FSYNC = fsync
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"🤖 {count:,} escrows: created in {create_seconds:.2f}s, "
+          f"{fired:,} auto-cancelled in {fire_seconds:.2f}s ({fired / fire_seconds:,.0f}/s), "
+          f"schedule rebuilt from the ledger in {rebuild_seconds:.2f}s")
+    return {
+        'escrows': count,
+        'fired': fired,
+        'fire_seconds': round(fire_seconds, 3),
+        'fired_per_second': round(fired / fire_seconds),
+        'rebuild_seconds': round(rebuild_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the escrow deadline scheduler.")
+    parser.add_argument('--deadlines', type=int, default=500000)
+    parser.add_argument('--reschedule', type=float, default=0.2, help="share of deadlines moved")
+    parser.add_argument('--escrows', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {
+        'heap': bench_heap(args.deadlines, args.reschedule, rng),
+        'ledger': bench_ledger(args.escrows),
+    }
+    path = write_results('scheduler', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
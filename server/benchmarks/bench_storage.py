@@ -0,0 +1,185 @@
+# server/benchmarks/bench_storage.py
+"""
+Storage backend benchmark.
+
+Populates the product and escrow stores with N synthetic records for each
+backend and measures request throughput through the Flask test client for
+the routes that hit storage: single listing lookup, filtered listing query,
+listing creation, listing deletion and an escrow status transition.
+
+Run from the server directory:
+    python -m benchmarks.bench_storage [--sizes 1000 100000 1000000] [--backends json sqlite]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from flask import Flask
+
+import storage
+from benchmarks.common import compare_results, latency_summary, write_results
+
+CATEGORIES = ['electronics', 'computers', 'mobile_devices', 'furniture', 'sports']
+BRANDS = ['Dell', 'HP', 'Apple', 'Samsung', 'IKEA', 'Hero', 'Canon']
+
+
+def synthetic_products(n, rng):
+    ids = [str(uuid.UUID(int=int(x), version=4)) for x in rng.integers(0, 2**62, n)]
+    categories = rng.integers(0, len(CATEGORIES), n)
+    brands = rng.integers(0, len(BRANDS), n)
+    prices = np.round(rng.uniform(500, 200000, n), 2)
+    return [
+        {
+            'id': ids[i],
+            'title': f"{BRANDS[brands[i]]} item {i}",
+            'price': float(prices[i]),
+            'category': CATEGORIES[categories[i]],
+            'description': 'Synthetic benchmark listing',
+            'brand': BRANDS[brands[i]],
+            'condition': 'good',
+            'year': 2022,
+            'image_url': '',
+            'created_at': '2025-01-01T00:00:00',
+            'user_id': f"user_{i % 1000}",
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_escrows(products, n, rng):
+    picks = rng.integers(0, len(products), n)
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'product_id': products[p]['id'],
+            'product_title': products[p]['title'],
+            'buyer_id': f"buyer_{p % 500}",
+            'seller_id': products[p]['user_id'],
+            'amount': products[p]['price'],
+            'currency': 'INR',
+            'status': 'AWAITING_SELLER',
+            'buyer_token': 'b',
+            'seller_token': 's',
+            'created_at': '2025-01-01T00:00:00',
+            'updated_at': '2025-01-01T00:00:00',
+            'timeline': [],
+        }
+        for p in picks
+    ]
+
+
+def populate(backend, products, escrows, data_dir):
+    """Write the dataset in the backend's native layout."""
+    if backend == 'json':
+        with open(os.path.join(data_dir, 'products.json'), 'w') as f:
+            json.dump(products, f, indent=2)
+        with open(os.path.join(data_dir, 'escrow_store.json'), 'w') as f:
+            json.dump(escrows, f, indent=2)
+        return
+    for name, records in (('products', products), ('escrows', escrows)):
+        collection = storage.get_collection(name)
+        for offset in range(0, len(records), 50000):
+            collection.insert_many(records[offset:offset + 50000])
+
+
+def run_op(fn, max_ops, max_seconds):
+    """Run fn until max_ops calls or max_seconds elapse; return latency summary + throughput."""
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < max_ops and time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn(len(samples))
+        samples.append((time.perf_counter() - started) * 1000)
+    summary = latency_summary(samples)
+    summary['requests_per_second'] = round(1000 / summary['mean_ms'], 2) if samples else 0
+    return summary
+
+
+def bench_backend(backend, size, args, rng):
+    from routes.escrow_routes import escrow_bp
+    from routes.product_routes import product_bp
+
+    data_dir = tempfile.mkdtemp(prefix=f"bench-{backend}-")
+    try:
+        storage.configure(backend=backend, data_dir=data_dir, sqlite_path='bench.db')
+        products = synthetic_products(size, rng)
+        escrows = synthetic_escrows(products, max(1, size // 10), rng)
+
+        started = time.perf_counter()
+        populate(backend, products, escrows, data_dir)
+        load_seconds = time.perf_counter() - started
+
+        app = Flask(__name__)
+        app.register_blueprint(product_bp)
+        app.register_blueprint(escrow_bp)
+        client = app.test_client()
+
+        lookup_ids = [products[i]['id'] for i in rng.integers(0, size, args.max_ops)]
+        delete_ids = [products[i]['id'] for i in rng.permutation(size)[:args.max_ops]]
+        escrow_ids = [escrows[i]['id'] for i in rng.permutation(len(escrows))[:args.max_ops]]
+        low_prices = rng.uniform(500, 199000, args.max_ops)
+
+        def get_one(i):
+            assert client.get(f"/api/products/listings/{lookup_ids[i]}").status_code == 200
+
+        def filtered(i):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            low = low_prices[i]
+            client.get(f"/api/products/listings?category={category}&min_price={low}&max_price={low + 200}")
+
+        def create(i):
+            client.post('/api/products/listings', json={
+                'title': f"bench {i}", 'price': 1000 + i, 'category': 'electronics',
+                'description': 'bench', 'brand': 'Dell',
+            })
+
+        def delete(i):
+            client.delete(f"/api/products/listings/{delete_ids[i]}")
+
+        def ship(i):
+            client.post(f"/api/escrow/session/{escrow_ids[i]}/ship", json={'token': 's'})
+
+        ops = {}
+        for name, fn in (('get_listing', get_one), ('filtered_listings', filtered),
+                         ('create_listing', create), ('delete_listing', delete),
+                         ('escrow_transition', ship)):
+            ops[name] = run_op(fn, args.max_ops, args.max_seconds)
+            print(f"   {backend:<6} {size:>9,} {name:<18} {ops[name]['requests_per_second']:>10.1f} req/s")
+
+        return {'load_seconds': round(load_seconds, 3), 'operations': ops}
+    finally:
+        storage.configure(backend=os.environ.get('STORAGE_BACKEND', 'json'), data_dir='')
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark storage backends through the routes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--backends', nargs='+', choices=['json', 'sqlite'], default=['json', 'sqlite'])
+    parser.add_argument('--max-ops', type=int, default=200, help='requests per operation')
+    parser.add_argument('--max-seconds', type=float, default=20.0, help='time budget per operation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    for size in args.sizes:
+        for backend in args.backends:
+            results.setdefault(backend, {})[str(size)] = bench_backend(backend, size, args, rng)
+
+    path = write_results('storage', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
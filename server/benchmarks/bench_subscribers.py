@@ -0,0 +1,180 @@
+# server/benchmarks/bench_subscribers.py
+"""
+Idle event-stream subscriber capacity benchmark.
+
+The development server and threaded WSGI servers hold one thread per open
+SSE response, so each simulated subscriber is a thread driving the
+/api/messaging/events body generator (minus the socket write) on its own
+user topic, with two subscribers per conversation thread. For each
+subscriber count it reports the resident memory per subscriber, idle CPU
+(heartbeat wake-ups only), and the latency from publishing a message to
+both participants receiving it. Counts stop at the first one the process
+cannot start threads for.
+
+It also measures the memory of bare subscriptions without threads, the
+cost per subscriber under an event-loop server.
+
+Run from the server directory:
+    python -m benchmarks.bench_subscribers [--subscribers 1000,5000,10000]
+"""
+
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+
+from benchmarks.common import compare_results, latency_summary, write_results
+from messaging.events import bus, publish_thread_event, user_topic
+from routes.messaging_routes import event_stream
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux), or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Subscriber(threading.Thread):
+    def __init__(self, user_id, received, ready):
+        super().__init__(daemon=True)
+        self.user_id = user_id
+        self.received = received
+        self.ready = ready
+
+    def run(self):
+        stream = event_stream(bus.subscribe([user_topic(self.user_id)]), None)
+        next(stream)                                # retry line
+        self.ready.release()
+        try:
+            for chunk in stream:
+                if 'event: stop' in chunk:
+                    break
+                if 'event: message' in chunk:
+                    self.received.append((chunk.split('\n', 1)[0], time.perf_counter()))
+        finally:
+            stream.close()
+
+
+def run_level(count, idle_seconds, messages, rng):
+    received = []
+    ready = threading.Semaphore(0)
+    base_rss = rss_mb()
+    subscribers = []
+    started = time.perf_counter()
+    try:
+        for i in range(count):
+            subscriber = Subscriber(f"u{i}", received, ready)
+            subscriber.start()
+            subscribers.append(subscriber)
+    except RuntimeError as e:
+        print(f"   ⚠️  could only start {len(subscribers):,} subscriber threads: {e}")
+    for _ in subscribers:
+        ready.acquire()
+    connect_seconds = time.perf_counter() - started
+    held = len(subscribers)
+    held_rss = rss_mb()
+
+    # Idle: only heartbeat wake-ups
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_started) / (time.perf_counter() - wall_started) * 100
+
+    # Messages between the two participants of random conversations
+    publish_ms, sent = [], {}
+    for _ in range(messages):
+        pair = rng.randrange(max(1, held // 2))
+        thread = {"thread_id": f"t{pair}", "buyer_id": f"u{2 * pair}", "seller_id": f"u{2 * pair + 1}"}
+        started = time.perf_counter()
+        event = publish_thread_event(thread, "message", {"message": {"content": "hi"}})
+        sent[f"id: {event['id']}"] = started
+        publish_ms.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.001)
+    deadline = time.time() + 10
+    while len(received) < 2 * messages and time.time() < deadline and held >= 2:
+        time.sleep(0.01)
+    delivery_ms = [(at - sent[event_id]) * 1000 for event_id, at in received if event_id in sent]
+
+    for i in range(held):
+        bus.publish([user_topic(f"u{i}")], "stop", {})
+    for subscriber in subscribers:
+        subscriber.join()
+    assert bus.stats()['subscribers'] == 0, bus.stats()
+
+    per_subscriber_kb = (held_rss - base_rss) * 1024 / held if held and base_rss is not None else None
+    print(f"👥 {held:>7,} idle subscribers: connected in {connect_seconds:.2f}s, "
+          f"RSS +{(held_rss or 0) - (base_rss or 0):.0f} MB"
+          + (f" ({per_subscriber_kb:.1f} KB each)" if per_subscriber_kb is not None else "")
+          + f", idle CPU {idle_cpu:.1f}%, delivery p99 "
+          f"{latency_summary(delivery_ms).get('p99_ms', 0):.2f} ms")
+    return {
+        'requested': count,
+        'held': held,
+        'connect_seconds': round(connect_seconds, 3),
+        'rss_mb': round(held_rss, 1) if held_rss is not None else None,
+        'rss_per_subscriber_kb': round(per_subscriber_kb, 2) if per_subscriber_kb is not None else None,
+        'idle_cpu_percent': round(idle_cpu, 2),
+        'publish': latency_summary(publish_ms),
+        'delivery': latency_summary(delivery_ms),
+    }
+
+
+def bare_subscriptions(count):
+    tracemalloc.start()
+    subscriptions = [bus.subscribe([user_topic(f"b{i}")]) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription)
+    per_subscriber = current / count
+    print(f"🧵 {count:,} subscriptions without threads: {current / 2**20:.1f} MB "
+          f"({per_subscriber:.0f} bytes each)")
+    return {'count': count, 'traced_mb': round(current / 2**20, 2), 'bytes_per_subscriber': round(per_subscriber)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark idle event-stream subscribers per process.")
+    parser.add_argument('--subscribers', default='1000,5000,10000',
+                        help="comma-separated subscriber counts")
+    parser.add_argument('--idle-seconds', type=float, default=5.0)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--bare', type=int, default=100000,
+                        help="subscriptions to measure without threads")
+    parser.add_argument('--stack-kb', type=int, default=0,
+                        help="thread stack size (0 keeps the platform default)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    if args.stack_kb:
+        threading.stack_size(args.stack_kb * 1024)
+    rng = random.Random(args.seed)
+
+    levels = {}
+    for count in (int(value) for value in args.subscribers.split(',')):
+        level = run_level(count, args.idle_seconds, args.messages, rng)
+        levels[str(count)] = level
+        if level['held'] < count:
+            break
+
+    results = {
+        'stack_kb': args.stack_kb or None,
+        'levels': levels,
+        'max_held': max(level['held'] for level in levels.values()),
+        'bare': bare_subscriptions(args.bare),
+    }
+    path = write_results('subscribers', results, args.output)
+    print(f"✅ Results saved to {path}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# server/benchmarks/common.py
+"""
+Shared helpers for benchmark scripts: timing, percentiles and result files.
+Results are written as JSON under benchmarks/results/ so runs can be compared.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def latency_summary(samples_ms):
+    """Percentile summary of a list of latencies in milliseconds."""
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if arr.size == 0:
+        return {"count": 0}
+    p50, p90, p95, p99 = np.percentile(arr, [50, 90, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p90_ms": round(float(p90), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(arr.max()), 4),
+    }
+
+
+def time_calls(fn, iterations, warmup=5):
+    """Call fn() repeatedly and return per-call latencies in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def git_revision():
+    """Current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def write_results(name, results, output=None):
+    """Write a result document with run metadata and return its path."""
+    document = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, child, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare_results(baseline_path, current):
+    """Print numeric metrics that moved between a saved run and the current results."""
+    with open(baseline_path, "r") as f:
+        baseline = _flatten("", json.load(f)["results"], {})
+    current = _flatten("", current, {})
+    print(f"\n📊 Compared with {os.path.basename(baseline_path)}:")
+    for key in sorted(current):
+        if key not in baseline or not baseline[key]:
+            continue
+        change = (current[key] - baseline[key]) / abs(baseline[key]) * 100
+        print(f"   {key:<55} {baseline[key]:>12.4f} -> {current[key]:>12.4f} ({change:+.1f}%)")
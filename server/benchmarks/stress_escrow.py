@@ -0,0 +1,207 @@
+# server/benchmarks/stress_escrow.py
+"""
+Concurrency stress test for escrow transitions.
+
+Several processes, each with several threads, send ship / release /
+dispute requests for a small set of escrows at random, so most requests
+race with others on the same escrow. Some requests are retried with the
+same Idempotency-Key and some carry the version they read (compare-and-
+swap). Afterwards the ledger is checked:
+  - every successful, non-replayed request added exactly one timeline
+    event, and a retry got the original's event back instead of a new one
+  - no timeline event is duplicated and versions match timeline lengths
+  - every timeline is a legal sequence of transitions
+  - the state equals a full replay of the event log
+
+Exits with status 1 if any check fails.
+
+Run from the server directory:
+    python -m benchmarks.stress_escrow [--processes 4] [--threads 8] [--requests 300]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.common import write_results
+
+ALLOWED_FROM = {
+    "SELLER_CONFIRMED_SHIPMENT": {"AWAITING_SELLER", "AWAITING_SHIPMENT"},
+    "BUYER_RELEASED_FUNDS": {"AWAITING_BUYER_CONFIRMATION"},
+}
+
+
+def make_app(data_dir):
+    import storage
+    from flask import Flask
+
+    storage.configure(backend='json', data_dir=data_dir)
+    from routes.escrow_routes import escrow_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(escrow_bp)
+    return app
+
+
+def setup(data_dir, count):
+    import storage
+
+    client = make_app(data_dir).test_client()
+    storage.get_collection('products').insert({'id': 'stress-product', 'title': 'Stress', 'price': 100})
+    escrows = []
+    for i in range(count):
+        response = client.post('/api/escrow/session', json={
+            'product_id': 'stress-product', 'buyer_id': f'b{i}', 'seller_id': f's{i}', 'amount': 100,
+        })
+        escrows.append(response.get_json()['escrow'])
+    return escrows
+
+
+def worker(args):
+    data_dir, escrows, threads, requests, retry_rate, cas_rate, seed = args
+    app = make_app(data_dir)
+    outcomes = []
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        client = app.test_client()
+        for _ in range(requests):
+            escrow = rng.choice(escrows)
+            op = rng.choice(('ship', 'ship', 'release', 'release', 'dispute'))
+            if op == 'ship':
+                body = {'token': escrow['seller_token']}
+            elif op == 'release':
+                body = {'token': escrow['buyer_token']}
+            else:
+                body = {'actor': 'buyer', 'token': escrow['buyer_token'], 'reason': 'stress'}
+            if rng.random() < cas_rate:
+                current = client.get(f"/api/escrow/session/{escrow['id']}").get_json()['escrow']
+                body['version'] = current['version']
+            key = uuid.uuid4().hex
+            attempts = 2 if rng.random() < retry_rate else 1
+            for attempt in range(attempts):
+                response = client.post(f"/api/escrow/session/{escrow['id']}/{op}", json=body,
+                                       headers={'Idempotency-Key': key})
+                payload = response.get_json()
+                event_id = payload['escrow']['timeline'][-1]['id'] if response.status_code == 200 else None
+                with lock:
+                    outcomes.append({
+                        'escrow_id': escrow['id'], 'key': key, 'attempt': attempt,
+                        'status': response.status_code, 'event_id': event_id,
+                        'replayed': response.headers.get('Idempotent-Replayed') == 'true',
+                    })
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return outcomes
+
+
+def verify(data_dir, escrows, outcomes):
+    from escrow.ledger import LEDGER_DIR, EscrowLedger
+
+    ledger = EscrowLedger(os.path.join(data_dir, LEDGER_DIR))
+    state = ledger.state()
+    failures = []
+
+    applied = {}
+    by_key = {}
+    for outcome in outcomes:
+        if outcome['status'] != 200:
+            continue
+        by_key.setdefault(outcome['key'], []).append(outcome)
+        if not outcome['replayed']:
+            applied.setdefault(outcome['escrow_id'], []).append(outcome['event_id'])
+    for key, results in by_key.items():
+        if len({r['event_id'] for r in results}) != 1:
+            failures.append(f"retries of {key} got different events")
+        if sum(not r['replayed'] for r in results) != 1:
+            failures.append(f"{key} applied {sum(not r['replayed'] for r in results)} times")
+
+    for escrow in escrows:
+        entry = state[escrow['id']]
+        timeline = entry['timeline']
+        ids = [event['id'] for event in timeline]
+        if len(ids) != len(set(ids)):
+            failures.append(f"{escrow['id']}: duplicated timeline events")
+        if entry['version'] != len(timeline):
+            failures.append(f"{escrow['id']}: version {entry['version']} for {len(timeline)} events")
+        expected = applied.get(escrow['id'], [])
+        if sorted(expected) != sorted(ids[1:]):
+            failures.append(f"{escrow['id']}: {len(expected)} successful requests, {len(ids) - 1} events")
+        status = 'AWAITING_SELLER'
+        for event in timeline[1:]:
+            action = event['action'].split('::')[0]
+            if action in ALLOWED_FROM and status not in ALLOWED_FROM[action]:
+                failures.append(f"{escrow['id']}: {action} applied in {status}")
+            status = {'SELLER_CONFIRMED_SHIPMENT': 'AWAITING_BUYER_CONFIRMATION',
+                      'BUYER_RELEASED_FUNDS': 'COMPLETED'}.get(action, 'UNDER_REVIEW')
+        if status != entry['status']:
+            failures.append(f"{escrow['id']}: timeline ends in {status}, state is {entry['status']}")
+
+    if ledger.replay() != state:
+        failures.append("state differs from a full replay of the event log")
+    return failures, sum(len(entry['timeline']) - 1 for entry in state.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent escrow transitions.")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300, help="requests per thread")
+    parser.add_argument('--escrows', type=int, default=20)
+    parser.add_argument('--retry-rate', type=float, default=0.3)
+    parser.add_argument('--cas-rate', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="stress-escrow-")
+    try:
+        escrows = setup(data_dir, args.escrows)
+        jobs = [(data_dir, escrows, args.threads, args.requests, args.retry_rate, args.cas_rate, args.seed + p)
+                for p in range(args.processes)]
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            outcomes = [outcome for result in pool.map(worker, jobs) for outcome in result]
+        seconds = time.perf_counter() - started
+        failures, events = verify(data_dir, escrows, outcomes)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    counts = {}
+    for outcome in outcomes:
+        label = 'replayed' if outcome['replayed'] else str(outcome['status'])
+        counts[label] = counts.get(label, 0) + 1
+    print(f"🔀 {len(outcomes):,} requests from {args.processes} processes x {args.threads} threads "
+          f"in {seconds:.1f}s ({len(outcomes) / seconds:,.0f}/s): {counts}, {events:,} timeline events")
+    for failure in failures[:20]:
+        print(f"   ❌ {failure}")
+    print("✅ No lost or duplicated transitions" if not failures else f"❌ {len(failures)} checks failed")
+
+    path = write_results('escrow_stress', {
+        'processes': args.processes,
+        'threads': args.threads,
+        'requests': len(outcomes),
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(outcomes) / seconds),
+        'responses': counts,
+        'timeline_events': events,
+        'failures': len(failures),
+    }, args.output)
+    print(f"Results saved to {path}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
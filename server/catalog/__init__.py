@@ -0,0 +1,8 @@
+"""
+In-process views over the product store that routes can query without
+re-reading or scanning every listing.
+"""
+
+from .cache import ProductCatalog, get_catalog
+
+__all__ = ["ProductCatalog", "get_catalog"]
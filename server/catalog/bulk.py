@@ -0,0 +1,196 @@
+# server/catalog/bulk.py
+"""
+Bulk listing export and import.
+
+Export walks the catalog's created_at ordering one keyset page at a time
+and yields NDJSON, so memory stays flat however large the catalog is.
+
+Import reads an NDJSON or CSV stream row by row, validates each row with
+the same rules as POST /listings and inserts valid rows in batches.
+Batches are committed as they fill, so a failing row never discards the
+rows around it; it is reported with its line number instead.
+"""
+
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime
+
+from storage import get_collection
+
+from . import ingestion
+from .cache import get_catalog
+
+REQUIRED_FIELDS = ("title", "price", "category", "description")
+
+# Fields stored as given, so they must already be text
+TEXT_FIELDS = ("title", "category", "description", "brand", "condition", "image_url", "user_id")
+
+EXPORT_PAGE_SIZE = 1000
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("ndjson", "csv")
+
+
+def build_listing(data, with_ingestion=True):
+    """New listing record from request data; raises ValueError when it is invalid."""
+    if not isinstance(data, dict):
+        raise ValueError("Listing must be an object")
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            raise ValueError(f"Missing field: {field}")
+    for field in TEXT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f"{field} must be a string")
+    try:
+        price = float(data["price"])
+    except (TypeError, ValueError):
+        raise ValueError("price must be a number")
+    if not price >= 0:
+        raise ValueError("price must not be negative")
+    year = data.get("year") or 2024
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        raise ValueError("year must be an integer")
+
+    listing = {
+        "id": str(uuid.uuid4()),
+        "title": data["title"],
+        "price": price,
+        "category": data["category"],
+        "description": data["description"],
+        "brand": data.get("brand") or "",
+        "condition": data.get("condition") or "good",
+        "year": year,
+        "image_url": data.get("image_url") or "",
+        "created_at": datetime.now().isoformat(),
+        "user_id": data.get("user_id") or "demo_user",
+    }
+    if with_ingestion:
+        listing["ingestion"] = ingestion.initial_state()
+    return listing
+
+
+# ------------------------ EXPORT ------------------------
+
+def export_ndjson(category=None, min_price=None, max_price=None, page_size=EXPORT_PAGE_SIZE):
+    """Yield matching listings as NDJSON, one chunk of lines per page, oldest first."""
+    catalog = get_catalog()
+    cursor = None
+    while True:
+        records, _, cursor = catalog.page(category=category, min_price=min_price, max_price=max_price,
+                                          sort="created_at", cursor=cursor, limit=page_size)
+        if records:
+            yield "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        if cursor is None:
+            return
+
+
+# ------------------------ IMPORT ------------------------
+
+def _ndjson_rows(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Row must be a JSON object"
+            continue
+        yield number, row, None
+
+
+def _csv_rows(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, None, "Row has more columns than the header"
+            continue
+        yield reader.line_num, row, None
+
+
+def _chunks(stream, size=1 << 16):
+    return iter(lambda: stream.read(size), b"")
+
+
+def _split_lines(chunks):
+    """Text lines (with their newline) from decoded chunks of any size."""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def iter_rows(stream, fmt):
+    """(line number, row dict or None, parse error or None) for each row of a binary stream."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    # Read in fixed-size chunks: request streams have no efficient readline
+    lines = _split_lines(codecs.iterdecode(_chunks(stream), "utf-8-sig"))
+    return _csv_rows(lines) if fmt == "csv" else _ndjson_rows(lines)
+
+
+def import_listings(stream, fmt, batch_size=IMPORT_BATCH_SIZE, ingest=True):
+    """
+    Validate and insert every row of stream. Returns a summary with the
+    imported and failed counts, the first MAX_REPORTED_ERRORS errors and,
+    if the stream was not valid UTF-8 or CSV, why reading stopped early.
+    """
+    store = get_collection("products")
+    batch, batch_ids = [], []
+    imported = failed = batches = 0
+    errors = []
+
+    def flush():
+        nonlocal imported, batches
+        store.insert_many(batch)
+        imported += len(batch)
+        batches += 1
+        if ingest:
+            for listing_id in batch_ids:
+                ingestion.enqueue(listing_id)
+        batch.clear()
+        batch_ids.clear()
+
+    aborted = None
+    try:
+        for line, row, error in iter_rows(stream, fmt):
+            if error is None:
+                try:
+                    listing = build_listing(row, with_ingestion=ingest)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "error": error})
+                continue
+            batch.append(listing)
+            batch_ids.append(listing["id"])
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows after this point cannot be located reliably; keep what was read
+        aborted = f"Stopped reading: {e}"
+    if batch:
+        flush()
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "batches": batches,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+        "aborted": aborted,
+    }
@@ -0,0 +1,278 @@
+# server/catalog/cache.py
+"""
+Process-wide product catalog.
+
+Listings are loaded once from the product collection and kept in memory
+with a hash index by id plus the ordering, search, facet and
+recommendation views kept in step with it. Writes made through this
+process arrive as change notifications and are applied incrementally;
+writes from other processes are detected through the collection's
+version token and trigger a full reload.
+
+Records handed out are the cached dicts themselves and must be treated as
+read-only; write through the product collection instead.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Dict, List, Optional
+
+from storage import get_collection
+from storage.base import DELETE, INSERT, RESET, UPDATE
+
+from .facets import FacetIndex
+from .ordering import SORT_FIELDS, SortedListingIndex, decode_cursor, encode_cursor
+from .recommendations import RecommendationIndex
+from .search_index import SearchIndex
+
+# Writes touching more listings than this (bulk imports) trigger a lazy
+# reload instead of one sorted-index insertion per listing
+BULK_RELOAD_CHANGES = 500
+
+
+def _category(record):
+    value = record.get("category")
+    return str(value).lower() if value not in (None, "") else None
+
+
+def _price(record):
+    try:
+        return float(record.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProductCatalog:
+    """In-memory, index-backed view of one product collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict] = {}
+        self._token = None
+        self._loaded = False
+        self._views: List = []
+        self.reloads = 0
+        self.ordering = SortedListingIndex()
+        self.add_view(self.ordering)
+        self.search_index: Optional[SearchIndex] = None
+        self.recommendations: Optional[RecommendationIndex] = None
+        self.facet_index: Optional[FacetIndex] = None
+        collection.subscribe(self._on_change)
+
+    def add_view(self, view) -> None:
+        """
+        Keep an extra index in step with the catalog. view must provide
+        rebuild(records), add(record) and remove(record); it is called under
+        the catalog lock and rebuilt on the next access.
+        """
+        with self._lock:
+            self._views.append(view)
+            if self._loaded:
+                view.rebuild(self._by_id.values())
+
+    # Loading -------------------------------------------------------------
+    def _reload(self) -> None:
+        records, token = self.collection.snapshot()
+        self._by_id = {}
+        for record in records:
+            self._index(record)
+        for view in self._views:
+            view.rebuild(self._by_id.values())
+        self._token = token
+        self._loaded = True
+        self.reloads += 1
+
+    def _ensure_fresh(self) -> None:
+        """Reload if never loaded or if another process changed the store."""
+        token = self.collection.version_token()
+        if not self._loaded or token != self._token:
+            self._reload()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+    # Index maintenance ---------------------------------------------------
+    def _index(self, record: Dict) -> bool:
+        key = record.get("id")
+        if key is None:
+            return False
+        self._by_id[key] = record
+        return True
+
+    def _add(self, record: Dict) -> None:
+        if self._index(record):
+            for view in self._views:
+                view.add(record)
+
+    def _remove(self, key: str) -> None:
+        record = self._by_id.pop(key, None)
+        if record is None:
+            return
+        for view in self._views:
+            view.remove(record)
+
+    def _replace(self, key: str, record: Dict) -> None:
+        old = self._by_id.get(key)
+        if old is None:
+            self._add(record)
+            return
+        # Updating in place keeps the record's position in listing order
+        self._by_id[key] = record
+        for view in self._views:
+            view.remove(old)
+            view.add(record)
+
+    def _on_change(self, changes, before, after) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            if after == self._token:
+                return          # a read already reloaded past this write
+            if before != self._token:
+                # Missed a write (another process, or notifications out of order)
+                self._loaded = False
+                return
+            if len(changes) > BULK_RELOAD_CHANGES:
+                self._loaded = False
+                return
+            for change in changes:
+                if change.op == INSERT:
+                    self._add(change.record)
+                elif change.op == UPDATE:
+                    self._replace(change.key, change.record)
+                elif change.op == DELETE:
+                    self._remove(change.key)
+                elif change.op == RESET:
+                    self._loaded = False
+                    return
+            self._token = after
+
+    # Reads ---------------------------------------------------------------
+    def get(self, product_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_fresh()
+            return self._by_id.get(product_id)
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._by_id.values())
+
+    def count(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._by_id)
+
+    def page(self, category=None, min_price=None, max_price=None, sort="created_at",
+             descending=False, cursor=None, limit=50):
+        """
+        One page of listings in (sort, id) order. Returns (records, total,
+        next_cursor); raises ValueError for an unknown sort or a bad cursor.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort: {sort}")
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+        with self._lock:
+            self._ensure_fresh()
+            ids, total, last = self.ordering.page(category, min_price, max_price,
+                                                  sort, descending, after, limit)
+            records = [self._by_id[key] for key in ids]
+        next_cursor = encode_cursor(sort, descending, *last) if last else None
+        return records, total, next_cursor
+
+    def _text_index(self) -> SearchIndex:
+        # Built on first use so processes that never search skip the cost
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            self.add_view(self.search_index)
+        return self.search_index
+
+    def search(self, query: str, category=None, min_price=None, max_price=None,
+               limit=20, offset=0):
+        """
+        Listings matching every query word, best BM25 score first. Returns
+        ([(record, score)], total).
+        """
+        category = str(category).lower() if category else None
+        with self._lock:
+            self._ensure_fresh()
+            scores = self._text_index().score(query)
+            matches = []
+            for key, score in scores.items():
+                record = self._by_id.get(key)
+                if record is None:
+                    continue
+                if category is not None and _category(record) != category:
+                    continue
+                if min_price is not None or max_price is not None:
+                    price = _price(record)
+                    if price is None:
+                        continue
+                    if min_price is not None and price < min_price:
+                        continue
+                    if max_price is not None and price > max_price:
+                        continue
+                matches.append((score, key))
+            top = heapq.nlargest(offset + limit, matches)[offset:]
+            return [(self._by_id[key], score) for score, key in top], len(matches)
+
+    def suggest(self, query: str, limit=8) -> List[str]:
+        with self._lock:
+            self._ensure_fresh()
+            return self._text_index().suggest(query, limit)
+
+    def recommend(self, product_id: str, limit=6, visual_weight=None):
+        """
+        (base listing, similar listings best first, whether image embeddings
+        were blended in), or (None, [], False) if product_id is unknown.
+        visual_weight in (0, 1] mixes in stored image similarity.
+        """
+        store = None
+        if visual_weight:
+            from ml_services.image_search.embedding_store import get_embedding_store
+            store = get_embedding_store()
+        with self._lock:
+            self._ensure_fresh()
+            base = self._by_id.get(product_id)
+            if base is None:
+                return None, [], False
+            if self.recommendations is None:
+                self.recommendations = RecommendationIndex()
+                self.add_view(self.recommendations)
+            if store is None:
+                ranked, visual = self.recommendations.recommend(base, limit), False
+            else:
+                neighbours = self.recommendations.recommend(base, self.recommendations.k)
+                ranked, visual = self.recommendations.blend_visual(base, neighbours, store, limit, visual_weight)
+            return base, [self._by_id[key] for _, key in ranked], visual
+
+    def facets(self, category=None, brand=None, condition=None, min_price=None, max_price=None):
+        """Facet counts and price histogram of available listings (see FacetIndex.facets)."""
+        with self._lock:
+            self._ensure_fresh()
+            if self.facet_index is None:
+                self.facet_index = FacetIndex()
+                self.add_view(self.facet_index)
+            return self.facet_index.facets(category, brand, condition, min_price, max_price)
+
+
+_catalog: Optional[ProductCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ProductCatalog:
+    """Shared catalog bound to the current product collection."""
+    global _catalog
+    collection = get_collection("products")
+    catalog = _catalog
+    if catalog is None or catalog.collection is not collection:
+        with _catalog_lock:
+            if _catalog is None or _catalog.collection is not collection:
+                # storage.configure() swapped the backend; bind a fresh catalog
+                _catalog = ProductCatalog(collection)
+            catalog = _catalog
+    return catalog
@@ -0,0 +1,208 @@
+# server/catalog/facets.py
+"""
+Facet counts and price histogram for the browse filters.
+
+Available (not sold) listings are counted per cell of a small cube keyed
+by (category, brand, condition, price bucket). The catalog keeps the cube
+in step with creates, deletes and status changes, and a facet query sums
+matching cells, so its cost depends on how many distinct cells exist
+rather than on how many listings there are.
+
+Price filters are exact. Buckets inside the requested range are summed
+from the cube. Every bucket also keeps its listings sorted by price, and
+for the at most two buckets the range cuts through, either the listings
+inside the range are counted or the bucket's cube cells are taken minus
+the listings outside it, whichever walks fewer listings.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended
+PRICE_EDGES = (0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+
+DIMENSIONS = ("category", "brand", "condition")
+
+
+# Sorts above the last id when prices tie
+_MAX_ID = "\U0010ffff"
+
+
+def _price(record) -> Optional[float]:
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        return None
+    return price if price >= 0 else None
+
+
+def _bucket_bounds(bucket):
+    upper = PRICE_EDGES[bucket + 1] if bucket + 1 < len(PRICE_EDGES) else None
+    return PRICE_EDGES[bucket], upper
+
+
+def _overlaps(bucket, min_price, max_price) -> bool:
+    lower, upper = _bucket_bounds(bucket)
+    if min_price is not None and upper is not None and upper <= min_price:
+        return False
+    return max_price is None or lower <= max_price
+
+
+def _covers(bucket, min_price, max_price) -> bool:
+    """Whether every price in bucket lies in [min_price, max_price]."""
+    lower, upper = _bucket_bounds(bucket)
+    if min_price is not None and lower < min_price:
+        return False
+    return max_price is None or (upper is not None and upper <= max_price)
+
+
+def _value(record, dimension) -> str:
+    return str(record.get(dimension) or "").strip().lower()
+
+
+class FacetIndex:
+    """Catalog view counting available listings per (category, brand, condition, price bucket)."""
+
+    def __init__(self):
+        self._cells: Dict[Tuple[str, str, str, Optional[int]], int] = {}
+        # price bucket -> sorted [(price, id, cell)]
+        self._priced: Dict[int, List[Tuple[float, str, Tuple]]] = {}
+        self._bulk = False
+        # (dimension, value) -> [display label, listing count]
+        self._labels: Dict[Tuple[str, str], list] = {}
+
+    # Catalog view protocol ------------------------------------------------
+    def rebuild(self, records) -> None:
+        self._cells, self._priced, self._labels = {}, {}, {}
+        self._bulk = True
+        try:
+            for record in records:
+                self.add(record)
+        finally:
+            self._bulk = False
+        for entries in self._priced.values():
+            entries.sort()
+
+    def add(self, record: Dict) -> None:
+        self._count(record, 1)
+
+    def remove(self, record: Dict) -> None:
+        self._count(record, -1)
+
+    def _count(self, record, delta) -> None:
+        if record.get("id") is None or record.get("status") == "sold":
+            return
+        price = _price(record)
+        bucket = None if price is None else bisect_right(PRICE_EDGES, price) - 1
+        cell = tuple(_value(record, d) for d in DIMENSIONS) + (bucket,)
+        count = self._cells.get(cell, 0) + delta
+        if count > 0:
+            self._cells[cell] = count
+        else:
+            self._cells.pop(cell, None)
+        if bucket is not None:
+            entry = (price, str(record["id"]), cell)
+            if delta > 0 and self._bulk:
+                self._priced.setdefault(bucket, []).append(entry)
+            elif delta > 0:
+                insort(self._priced.setdefault(bucket, []), entry)
+            else:
+                entries = self._priced.get(bucket, [])
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+                if not entries:
+                    self._priced.pop(bucket, None)
+        for dimension, value in zip(DIMENSIONS, cell):
+            label = self._labels.get((dimension, value))
+            if label is None:
+                label = self._labels[(dimension, value)] = [str(record.get(dimension) or "").strip(), 0]
+            label[1] += delta
+            if label[1] <= 0:
+                del self._labels[(dimension, value)]
+
+    # Queries --------------------------------------------------------------
+    def facets(self, category=None, brand=None, condition=None,
+               min_price=None, max_price=None) -> Dict:
+        """
+        Counts per category, brand and condition plus a price histogram. Each
+        facet applies every filter except its own, so the counts show what
+        choosing another value would return; total applies them all. The
+        histogram ignores the price filter, for drawing the price slider.
+        """
+        wanted = {
+            i: str(value).strip().lower()
+            for i, value in enumerate((category, brand, condition)) if value
+        }
+        price_filtered = min_price is not None or max_price is not None
+        # Buckets the price range cuts through are counted listing by listing below
+        partial = {
+            bucket for bucket in range(len(PRICE_EDGES))
+            if price_filtered and _overlaps(bucket, min_price, max_price)
+            and not _covers(bucket, min_price, max_price)
+        }
+
+        counts = {dimension: {} for dimension in DIMENSIONS}
+        histogram = [0] * len(PRICE_EDGES)
+        total = 0
+
+        def tally(cell, count, in_price):
+            nonlocal total
+            misses = [i for i, value in wanted.items() if cell[i] != value]
+            if len(misses) > 1 or not in_price:
+                return
+            if not misses:
+                total += count
+                for i, dimension in enumerate(DIMENSIONS):
+                    counts[dimension][cell[i]] = counts[dimension].get(cell[i], 0) + count
+            else:
+                # Matches every filter but one, so it counts toward that filter's facet only
+                dimension = DIMENSIONS[misses[0]]
+                counts[dimension][cell[misses[0]]] = counts[dimension].get(cell[misses[0]], 0) + count
+
+        low = (float(min_price), "") if min_price is not None else None
+        high = (float(max_price), _MAX_ID) if max_price is not None else None
+        # Partial buckets counted whole from the cube, less their listings outside the range
+        subtract = set()
+        for bucket in partial:
+            entries = self._priced.get(bucket, [])
+            start = bisect_left(entries, low) if low is not None else 0
+            end = bisect_right(entries, high) if high is not None else len(entries)
+            if end - start <= len(entries) - (end - start):
+                sign, walked = 1, entries[start:end]
+            else:
+                subtract.add(bucket)
+                sign, walked = -1, entries[:start] + entries[end:]
+            for cell, count in Counter(entry[2] for entry in walked).items():
+                tally(cell, sign * count, True)
+
+        for cell, count in self._cells.items():
+            if cell[3] is not None and all(cell[i] == value for i, value in wanted.items()):
+                histogram[cell[3]] += count
+            if cell[3] in partial and cell[3] not in subtract:
+                continue
+            tally(cell, count, not price_filtered or (
+                cell[3] is not None and _overlaps(cell[3], min_price, max_price)))
+
+        return {
+            "total": total,
+            **{
+                f"{dimension}_counts": self._ranked(dimension, counts[dimension])
+                for dimension in DIMENSIONS
+            },
+            "price_histogram": [
+                {"min": lower, "max": upper, "count": histogram[bucket]}
+                for bucket in range(len(PRICE_EDGES))
+                for lower, upper in (_bucket_bounds(bucket),)
+            ],
+        }
+
+    def _ranked(self, dimension, counts):
+        return [
+            {"value": value, "label": self._labels.get((dimension, value), [value])[0] or value, "count": count}
+            for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            if value
+        ]
@@ -0,0 +1,410 @@
+# server/catalog/ingestion.py
+"""
+Listing ingestion pipeline.
+
+create_listing stores a listing with ingestion.status = "pending" and
+enqueues it here. Background workers then run each stage once and write
+the results onto the listing:
+  - embedding: ResNet50 image vector saved to the embedding store
+  - price:     model price suggestion (same fields as the re-pricing job)
+  - logo:      logo authenticity check for brands with reference logos
+
+A stage that raises is retried with exponential backoff up to
+MAX_ATTEMPTS; a stage whose ML dependency is not installed is marked
+"unavailable" and not retried. Unfinished listings are re-queued on
+startup from their stored status, so no separate queue file is needed.
+
+New embeddings are written to disk in batches: every
+EMBEDDING_SAVE_BATCH of them, once the queue has been idle for
+EMBEDDING_SAVE_SECONDS, and at exit.
+
+Deleting a listing drops its stored embedding through a change listener
+on the product collection, and embeddings of listings deleted while the
+server was down are pruned on startup.
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from storage import get_collection
+from storage.base import DELETE
+
+from .cache import get_catalog
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 2.0
+DEFAULT_WORKERS = int(os.environ.get("INGESTION_WORKERS", "2"))
+
+# Rewriting the embedding file costs time in the size of the whole store,
+# so changes are saved after this many or after this long idle
+EMBEDDING_SAVE_BATCH = 50
+EMBEDDING_SAVE_SECONDS = 5.0
+
+# Stage outcomes that need no further work
+FINAL_OUTCOMES = {"done", "skipped", "unavailable"}
+
+
+class StageUnavailable(Exception):
+    """The stage's ML dependency or model artifacts are not installed."""
+
+
+def _image_path(listing):
+    url = listing.get("image_url") or ""
+    if not url.startswith("/uploads/"):
+        return None
+    path = os.path.join(SERVER_DIR, url.lstrip("/"))
+    return path if os.path.exists(path) else None
+
+
+# ------------------------ STAGES ------------------------
+
+def compute_embedding(listing):
+    path = _image_path(listing)
+    if path is None:
+        return "skipped", {}
+    try:
+        from ml_services.image_search.search_engine import enhanced_search
+    except (ImportError, OSError) as e:
+        raise StageUnavailable(str(e))
+    from ml_services.image_search.embedding_store import get_embedding_store
+
+    features = enhanced_search.extract_features(path)
+    if features is None:
+        raise RuntimeError("Could not extract image features")
+    get_embedding_store().put(listing["id"], features, listing.get("category", ""), listing.get("image_url", ""))
+    return "done", {}
+
+
+def suggest_price(listing):
+    try:
+        from ml_services.price_predictor import predictor, repricing
+    except (ImportError, OSError) as e:
+        raise StageUnavailable(str(e))
+    fields = repricing.price_batch([listing], predictor.model_version())[listing["id"]]
+    return "done", fields
+
+
+def check_logo(listing):
+    brand = (listing.get("brand") or "").strip().lower()
+    path = _image_path(listing)
+    if not brand or path is None:
+        return "skipped", {}
+    try:
+        from ml_services.logo_verifier import get_available_brands, verify_logo
+    except (ImportError, OSError) as e:
+        raise StageUnavailable(str(e))
+    if brand not in {b.lower() for b in get_available_brands()}:
+        return "skipped", {}
+
+    result = verify_logo(path, brand)
+    check = {"checked_at": datetime.now().isoformat()}
+    if result.get("success"):
+        check.update({
+            "is_genuine": result["is_genuine"],
+            "confidence": result["confidence"],
+            "best_brand_match": result["best_brand_match"],
+        })
+    else:
+        check["error"] = result.get("error")
+    return "done", {"logo_check": check}
+
+
+STAGES = {
+    "embedding": compute_embedding,
+    "price": suggest_price,
+    "logo": check_logo,
+}
+
+
+def initial_state():
+    """Ingestion field stored on a new listing."""
+    return {
+        "status": "pending",
+        "stages": {name: "pending" for name in STAGES},
+        "attempts": 0,
+        "errors": {},
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+# ------------------------ PIPELINE ------------------------
+
+class IngestionPipeline:
+    """Work queue plus daemon workers that run pending stages for one listing at a time."""
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.worker_count = max(1, workers)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._workers = []
+        self._retry_timers = set()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self._unsaved_embeddings = 0
+        self._last_embedding_save = time.monotonic()
+        self.embedding_saves = 0
+
+    def start(self):
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.worker_count:
+                worker = threading.Thread(target=self._work, name=f"ingestion-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def enqueue(self, listing_id):
+        with self._lock:
+            if listing_id in self._queued:
+                return
+            self._queued.add(listing_id)
+        self._queue.put(listing_id)
+        self.start()
+
+    def resume_pending(self):
+        """Queue every listing whose ingestion has not finished. Returns how many."""
+        unfinished = [
+            p["id"] for p in get_catalog().all()
+            if (p.get("ingestion") or {}).get("status") in ("pending", "retrying")
+        ]
+        for listing_id in unfinished:
+            self.enqueue(listing_id)
+        return len(unfinished)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backlog": self._queue.qsize(),
+                "in_flight": self.in_flight,
+                "retry_scheduled": len(self._retry_timers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "unsaved_embeddings": self._unsaved_embeddings,
+                "embedding_saves": self.embedding_saves,
+                "workers": sum(1 for w in self._workers if w.is_alive()),
+            }
+
+    def embeddings_changed(self, count=1):
+        """Note unsaved embedding-store changes; a worker saves them in a batch."""
+        with self._lock:
+            self._unsaved_embeddings += count
+        self.start()
+
+    def save_embeddings(self):
+        """Write pending embedding-store changes to disk now."""
+        with self._lock:
+            pending, self._unsaved_embeddings = self._unsaved_embeddings, 0
+            self._last_embedding_save = time.monotonic()
+        if not pending:
+            return
+        from ml_services.image_search.embedding_store import get_embedding_store
+        try:
+            get_embedding_store().save_if_dirty()
+        except Exception:
+            with self._lock:
+                self._unsaved_embeddings += pending
+            raise
+        with self._lock:
+            self.embedding_saves += 1
+
+    def _maybe_save_embeddings(self, idle):
+        with self._lock:
+            due = self._unsaved_embeddings and (
+                idle or self._unsaved_embeddings >= EMBEDDING_SAVE_BATCH
+                or time.monotonic() - self._last_embedding_save >= EMBEDDING_SAVE_SECONDS)
+        if due:
+            try:
+                self.save_embeddings()
+            except Exception:
+                # Still counted as unsaved, so the next check retries
+                pass
+
+    def _work(self):
+        while True:
+            try:
+                listing_id = self._queue.get(timeout=EMBEDDING_SAVE_SECONDS)
+            except queue.Empty:
+                self._maybe_save_embeddings(idle=True)
+                continue
+            with self._lock:
+                self._queued.discard(listing_id)
+                self.in_flight += 1
+            try:
+                self.process(listing_id)
+            except Exception:
+                # The listing keeps its stored status and is picked up on the next resume
+                pass
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                self._queue.task_done()
+            self._maybe_save_embeddings(idle=False)
+
+    def _schedule_retry(self, listing_id, attempts):
+        delay = RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+
+        def fire():
+            self.enqueue(listing_id)
+            with self._lock:
+                self._retry_timers.discard(timer)
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        with self._lock:
+            self._retry_timers.add(timer)
+            self.retried += 1
+        timer.start()
+
+    def process(self, listing_id):
+        """Run the unfinished stages for one listing and store the outcome."""
+        listing = get_catalog().get(listing_id)
+        if listing is None:
+            return None
+        state = listing.get("ingestion") or initial_state()
+        stages = dict(state.get("stages") or {})
+        fields = {}
+        # Keep the reason a stage was unavailable; failures are re-run below
+        errors = {name: message for name, message in (state.get("errors") or {}).items()
+                  if stages.get(name) == "unavailable"}
+
+        for name, handler in STAGES.items():
+            if stages.get(name) in FINAL_OUTCOMES:
+                continue
+            try:
+                outcome, stage_fields = handler(listing)
+                stages[name] = outcome
+                fields.update(stage_fields)
+                if name == "embedding" and outcome == "done":
+                    self.embeddings_changed()
+            except StageUnavailable as e:
+                stages[name] = "unavailable"
+                errors[name] = str(e)
+            except Exception as e:
+                stages[name] = "failed"
+                errors[name] = str(e)
+
+        attempts = state.get("attempts", 0) + 1
+        retryable = [name for name, outcome in stages.items() if outcome == "failed"]
+        if not retryable:
+            status = "done"
+        elif attempts >= MAX_ATTEMPTS:
+            status = "failed"
+        else:
+            status = "retrying"
+
+        new_state = {
+            "status": status,
+            "stages": stages,
+            "attempts": attempts,
+            "errors": errors,
+            "updated_at": datetime.now().isoformat(),
+        }
+
+        def apply(product):
+            price_fields = {k: v for k, v in fields.items() if k != "logo_check"}
+            if "pricing_fingerprint" in price_fields:
+                from ml_services.price_predictor.repricing import pricing_fingerprint
+                if pricing_fingerprint(product) != price_fields["pricing_fingerprint"]:
+                    # Edited while we were pricing it; the re-pricing job will catch up
+                    price_fields = {}
+            product.update(price_fields)
+            if "logo_check" in fields:
+                product["logo_check"] = fields["logo_check"]
+            product["ingestion"] = new_state
+
+        if get_collection("products").modify(listing_id, apply) is None:
+            if stages.get("embedding") == "done":
+                # Deleted while its image was being embedded
+                _forget_embeddings([listing_id])
+            return None
+
+        with self._lock:
+            if status == "done":
+                self.completed += 1
+            elif status == "failed":
+                self.failed += 1
+        if status == "retrying":
+            self._schedule_retry(listing_id, attempts)
+        return new_state
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until the queue is empty, nothing is running and no retry is
+        pending, then save pending embeddings.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                idle = not self._queued and not self.in_flight and not self._retry_timers
+            if idle and self._queue.unfinished_tasks == 0:
+                self.save_embeddings()
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+
+
+pipeline = IngestionPipeline()
+
+
+def enqueue(listing_id):
+    pipeline.enqueue(listing_id)
+
+
+def resume_pending():
+    return pipeline.resume_pending()
+
+
+def stats():
+    return pipeline.stats()
+
+
+# ------------------------ DELETES ------------------------
+
+_watched = []
+_watched_lock = threading.Lock()
+
+
+def _forget_embeddings(listing_ids):
+    from ml_services.image_search.embedding_store import get_embedding_store
+
+    store = get_embedding_store()
+    for listing_id in listing_ids:
+        store.remove(listing_id)
+    pipeline.embeddings_changed(len(listing_ids))
+
+
+def _on_product_change(changes, before, after):
+    deleted = [change.key for change in changes if change.op == DELETE]
+    if deleted:
+        _forget_embeddings(deleted)
+
+
+def watch_deletes():
+    """
+    Drop the embeddings of listings deleted from now on, and of listings
+    already gone from the catalog. Returns how many were pruned.
+    """
+    collection = get_collection("products")
+    with _watched_lock:
+        if any(watched is collection for watched in _watched):
+            return 0
+        _watched.append(collection)
+    collection.subscribe(_on_product_change)
+
+    from ml_services.image_search.embedding_store import get_embedding_store
+
+    live = {listing["id"] for listing in get_catalog().all()}
+    stale = [listing_id for listing_id in get_embedding_store().ids() if listing_id not in live]
+    if stale:
+        _forget_embeddings(stale)
+        pipeline.save_embeddings()
+    return len(stale)
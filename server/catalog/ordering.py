@@ -0,0 +1,215 @@
+# server/catalog/ordering.py
+"""
+Sorted listing indexes and cursor pagination.
+
+For every sort field the catalog keeps one sorted list of (value, id)
+pairs over all listings plus one per category. Price ranges become two
+binary searches, and a page is a slice that starts right after the
+cursor's (value, id) pair, so pages stay stable while listings are added
+or removed elsewhere in the order.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+# Sorts above the last id when values tie
+_MAX_ID = "\U0010ffff"
+
+# When a price range matches at most this fraction of a category, a
+# created_at page is built from the price slice instead of walking by date
+_PRICE_SLICE_RATIO = 0.125
+
+
+def _price(record):
+    try:
+        return float(record.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _created_at(record):
+    return str(record.get("created_at") or "")
+
+
+SORT_FIELDS = {"price": _price, "created_at": _created_at}
+
+
+def encode_cursor(sort: str, descending: bool, value, key: str) -> str:
+    raw = json.dumps([sort, int(descending), value, key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple:
+    """(value, id) stored in cursor. Raises ValueError if it is malformed or for another ordering."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_desc, value, key = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or bool(cursor_desc) != descending or not isinstance(key, str):
+        raise ValueError("Cursor does not match the requested sort order")
+    if sort == "price":
+        # NaN never compares equal to itself and would break the bisects
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+            raise ValueError("Invalid cursor")
+        value = float(value)
+    elif sort == "created_at" and not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return value, key
+
+
+def decode_text_cursor(cursor: str, sort: str, descending: bool) -> Tuple[str, str]:
+    """decode_cursor for orderings by a text value (timestamps). Raises ValueError otherwise."""
+    value, key = decode_cursor(cursor, sort, descending)
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return value, key
+
+
+class SortedListingIndex:
+    """Catalog view keeping (value, id) lists sorted per field and per category."""
+
+    def __init__(self):
+        # (field, lowercased category or None for all) -> sorted [(value, id)]
+        self._lists: Dict[Tuple[str, Optional[str]], List[Tuple]] = {}
+        self._created: Dict[str, str] = {}
+        self._prices: Dict[str, float] = {}
+
+    @staticmethod
+    def _category(record):
+        category = record.get("category")
+        return str(category).lower() if category else None
+
+    def _entries(self, record):
+        key = record.get("id")
+        if key is None:
+            return
+        category = self._category(record)
+        for field, extract in SORT_FIELDS.items():
+            value = extract(record)
+            if value is None:
+                continue
+            yield (field, None), (value, key)
+            if category is not None:
+                yield (field, category), (value, key)
+
+    # Catalog view protocol ------------------------------------------------
+    def rebuild(self, records) -> None:
+        self._lists = {}
+        self._created = {}
+        self._prices = {}
+        for record in records:
+            self._track(record)
+            for list_key, entry in self._entries(record):
+                self._lists.setdefault(list_key, []).append(entry)
+        for entries in self._lists.values():
+            entries.sort()
+
+    def _track(self, record):
+        key = record.get("id")
+        self._created[key] = _created_at(record)
+        price = _price(record)
+        if price is not None:
+            self._prices[key] = price
+
+    def add(self, record: Dict) -> None:
+        if record.get("id") is not None:
+            self._track(record)
+        for list_key, entry in self._entries(record):
+            insort(self._lists.setdefault(list_key, []), entry)
+
+    def remove(self, record: Dict) -> None:
+        self._created.pop(record.get("id"), None)
+        self._prices.pop(record.get("id"), None)
+        for list_key, entry in self._entries(record):
+            entries = self._lists.get(list_key)
+            if not entries:
+                continue
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+            if not entries:
+                del self._lists[list_key]
+
+    # Queries --------------------------------------------------------------
+    def _list(self, field, category):
+        return self._lists.get((field, str(category).lower() if category else None), [])
+
+    def _price_bounds(self, entries, min_price, max_price):
+        start = bisect_left(entries, (float(min_price), "")) if min_price is not None else 0
+        end = bisect_right(entries, (float(max_price), _MAX_ID)) if max_price is not None else len(entries)
+        return start, max(start, end)
+
+    def page(self, category=None, min_price=None, max_price=None, sort="created_at",
+             descending=False, after: Optional[Tuple] = None, limit=50):
+        """
+        One page of listing ids. Returns (ids, total, last) where total counts
+        every match and last is the (value, id) pair to resume after, or None
+        when this is the final page.
+        """
+        prices = self._list("price", category)
+        has_range = min_price is not None or max_price is not None
+        low, high = self._price_bounds(prices, min_price, max_price)
+
+        if sort == "price":
+            total = high - low
+            start, end = low, high
+            if after is not None:
+                if descending:
+                    end = min(end, bisect_left(prices, after))
+                else:
+                    start = max(start, bisect_right(prices, after))
+            window = prices[max(start, end - limit - 1):end][::-1] if descending \
+                else prices[start:min(end, start + limit + 1)]
+            return self._finish(window, total, limit)
+
+        dated = self._list("created_at", category)
+        if not has_range:
+            return self._finish(self._walk(dated, descending, after, limit + 1), len(dated), limit)
+
+        total = high - low
+        if total <= len(dated) * _PRICE_SLICE_RATIO:
+            # Narrow price range: sort its few matches by date
+            ids = [key for _, key in prices[low:high]]
+            candidates = sorted(((self._created[key], key) for key in ids), reverse=descending)
+            if after is not None:
+                candidates = [c for c in candidates if (c < after if descending else c > after)]
+            return self._finish(candidates[:limit + 1], total, limit)
+
+        low_price = float(min_price) if min_price is not None else float("-inf")
+        high_price = float(max_price) if max_price is not None else float("inf")
+        window = []
+        for entry in self._iter(dated, descending, after):
+            price = self._prices.get(entry[1])
+            if price is not None and low_price <= price <= high_price:
+                window.append(entry)
+                if len(window) > limit:
+                    break
+        return self._finish(window, total, limit)
+
+    @staticmethod
+    def _iter(entries, descending, after):
+        if descending:
+            end = bisect_left(entries, after) if after is not None else len(entries)
+            return (entries[i] for i in range(end - 1, -1, -1))
+        start = bisect_right(entries, after) if after is not None else 0
+        return (entries[i] for i in range(start, len(entries)))
+
+    def _walk(self, entries, descending, after, count):
+        window = []
+        for entry in self._iter(entries, descending, after):
+            window.append(entry)
+            if len(window) >= count:
+                break
+        return window
+
+    @staticmethod
+    def _finish(window, total, limit):
+        has_more = len(window) > limit
+        window = window[:limit]
+        last = window[-1] if has_more and window else None
+        return [key for _, key in window], total, last
@@ -0,0 +1,179 @@
+# server/catalog/ratings.py
+"""
+Per-product rating aggregates and review pages.
+
+For every product the index keeps the number of ratings, their sum and a
+histogram of 1-5 star ratings, plus the product's reviews as (timestamp,
+id) pairs sorted by time, so a rating badge is one dict lookup and a page
+of reviews is a slice. Feedback submitted through this process arrives
+as change notifications and is applied incrementally; writes from other
+processes are detected through the collection's version token and
+trigger a full reload, like the product catalog.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage import get_collection
+from storage.base import DELETE, INSERT, RESET, UPDATE
+
+from .ordering import decode_text_cursor, encode_cursor
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+_ORDER = "timestamp"
+
+
+def rating_of(record) -> Optional[int]:
+    """Star rating of a feedback record, or None if it has no valid one."""
+    rating = record.get("rating")
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or rating != int(rating):
+        return None
+    return int(rating) if MIN_RATING <= rating <= MAX_RATING else None
+
+
+def summarize(count: int, total: int, histogram: List[int]) -> Dict:
+    return {
+        "count": count,
+        "sum": total,
+        "average": round(total / count, 1) if count else 0,
+        "histogram": {str(stars): histogram[stars - MIN_RATING] for stars in range(MIN_RATING, MAX_RATING + 1)},
+    }
+
+
+class RatingIndex:
+    """Rating aggregates and time-ordered reviews per product for one feedback collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict] = {}
+        # product_id -> [count, sum, ratings of 1 .. MAX_RATING]
+        self._aggregates: Dict[str, List[int]] = {}
+        # product_id -> sorted [(timestamp, id)]
+        self._reviews: Dict[str, List[Tuple[str, str]]] = {}
+        self._token = None
+        self._loaded = False
+        self.reloads = 0
+        collection.subscribe(self._on_change)
+
+    # Loading -------------------------------------------------------------
+    def _reload(self) -> None:
+        records, token = self.collection.snapshot()
+        self._by_id, self._aggregates, self._reviews = {}, {}, {}
+        for record in records:
+            self._add(record)
+        self._token = token
+        self._loaded = True
+        self.reloads += 1
+
+    def _ensure_fresh(self) -> None:
+        """Reload if never loaded or if another process changed the store."""
+        token = self.collection.version_token()
+        if not self._loaded or token != self._token:
+            self._reload()
+
+    # Maintenance ---------------------------------------------------------
+    def _count(self, record: Dict, sign: int) -> None:
+        rating = rating_of(record)
+        if rating is None:
+            return
+        aggregate = self._aggregates.setdefault(record.get("product_id"), [0] * (2 + MAX_RATING))
+        aggregate[0] += sign
+        aggregate[1] += sign * rating
+        aggregate[1 + rating] += sign
+
+    def _add(self, record: Dict) -> None:
+        key = record.get("id")
+        # Records without a usable product are not indexed, so _remove skips them too
+        if key is None or not isinstance(record.get("product_id"), str):
+            return
+        self._by_id[key] = record
+        self._count(record, 1)
+        insort(self._reviews.setdefault(record.get("product_id"), []),
+               (str(record.get("timestamp") or ""), key))
+
+    def _remove(self, key: str) -> None:
+        record = self._by_id.pop(key, None)
+        if record is None:
+            return
+        self._count(record, -1)
+        product_id = record.get("product_id")
+        reviews = self._reviews[product_id]
+        del reviews[bisect_left(reviews, (str(record.get("timestamp") or ""), key))]
+        if not reviews:
+            del self._reviews[product_id]
+            self._aggregates.pop(product_id, None)
+
+    def _on_change(self, changes, before, after) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            if before != self._token:
+                self._loaded = False        # missed a write from another process
+                return
+            for change in changes:
+                if change.op == INSERT:
+                    self._add(change.record)
+                elif change.op == UPDATE:
+                    self._remove(change.key)
+                    self._add(change.record)
+                elif change.op == DELETE:
+                    self._remove(change.key)
+                elif change.op == RESET:
+                    self._loaded = False
+                    return
+            self._token = after
+
+    # Reads ---------------------------------------------------------------
+    def aggregate(self, product_id: str) -> Dict:
+        """count, sum, average and histogram of product_id's ratings."""
+        return self.aggregates([product_id])[product_id]
+
+    def aggregates(self, product_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Aggregates for each of product_ids (zeros for products without ratings)."""
+        empty = [0] * (2 + MAX_RATING)
+        with self._lock:
+            self._ensure_fresh()
+            found = {product_id: self._aggregates.get(product_id, empty) for product_id in product_ids}
+        return {product_id: summarize(values[0], values[1], values[2:]) for product_id, values in found.items()}
+
+    def reviews(self, product_id: str, limit: Optional[int] = 20, cursor: Optional[str] = None):
+        """
+        One page of product_id's feedback, newest first (all of it without
+        limit). Returns (records, total, next_cursor); raises ValueError for
+        a bad cursor.
+        """
+        after = decode_text_cursor(cursor, _ORDER, True) if cursor else None
+        with self._lock:
+            self._ensure_fresh()
+            reviews = self._reviews.get(product_id, [])
+            total = len(reviews)
+            end = bisect_left(reviews, after) if after is not None else total
+            if limit is None:
+                limit = end
+            window = reviews[max(0, end - limit):end][::-1]
+            records = [self._by_id[key] for _, key in window]
+        next_cursor = encode_cursor(_ORDER, True, *window[-1]) if end > limit else None
+        return records, total, next_cursor
+
+
+_ratings: Optional[RatingIndex] = None
+_ratings_lock = threading.Lock()
+
+
+def get_ratings() -> RatingIndex:
+    """Shared rating index bound to the current product feedback collection."""
+    global _ratings
+    collection = get_collection("product_feedback")
+    ratings = _ratings
+    if ratings is None or ratings.collection is not collection:
+        with _ratings_lock:
+            if _ratings is None or _ratings.collection is not collection:
+                _ratings = RatingIndex(collection)
+            ratings = _ratings
+    return ratings
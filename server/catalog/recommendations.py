@@ -0,0 +1,325 @@
+# server/catalog/recommendations.py
+"""
+Precomputed "similar listings" lists.
+
+compute_similarity_score only rewards a shared category, a shared brand
+or a price within 20%, so every listing worth recommending is in the
+base listing's category bucket, brand bucket or a neighbouring price
+band. Candidates are drawn from those buckets only.
+
+Top-k neighbour lists are computed with a heap on first request, scoring
+the buckets from most to least promising and stopping once no remaining
+candidate can enter the top k. They are then kept up to date as listings
+are added, changed, sold or deleted, so warm lookups are a dict access.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+# Neighbours kept per listing; more than are served so removals rarely force a recompute
+NEIGHBOURS_KEPT = 12
+
+# Highest possible compute_similarity_score, used to put it on the same 0-1 scale as cosine similarity
+MAX_ATTRIBUTE_SCORE = 10.0
+
+# Visually closest listings considered per hybrid request, on top of the attribute neighbours
+VISUAL_CANDIDATES = 50
+
+# Price bands are powers of 1.25, so prices within 20% of each other are at most one band apart
+PRICE_BAND_BASE = math.log(1.25)
+
+CONDITION_RANK = {"excellent": 3, "good": 2, "fair": 1, "poor": 0}
+
+
+def _text(record, field) -> str:
+    return str(record.get(field) or "").lower()
+
+
+def _price(record) -> float:
+    try:
+        price = float(record.get("price", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return price if math.isfinite(price) else 0.0
+
+
+def compute_similarity_score(base, candidate):
+    """Heuristic similarity score for recommendations."""
+    score = 0.0
+
+    if base["id"] == candidate["id"]:
+        return -1
+
+    if _text(base, "category") == _text(candidate, "category"):
+        score += 5
+
+    brand = _text(base, "brand")
+    if brand and brand == _text(candidate, "brand"):
+        score += 3
+
+    price_a = _price(base)
+    price_b = _price(candidate)
+    if price_a > 0 and price_b > 0:
+        diff_ratio = abs(price_a - price_b) / max(price_a, price_b)
+        score += max(0, 2 - diff_ratio * 10)
+
+    cond_a = CONDITION_RANK.get(_text(base, "condition"), 1)
+    cond_b = CONDITION_RANK.get(_text(candidate, "condition"), 1)
+    score -= abs(cond_a - cond_b) * 0.5
+
+    return score
+
+
+def _price_band(record) -> Optional[int]:
+    price = _price(record)
+    return math.floor(math.log(price) / PRICE_BAND_BASE) if price > 0 else None
+
+
+def _bucket_keys(record) -> List[Tuple[str, object]]:
+    keys = [("category", _text(record, "category"))]
+    if _text(record, "brand"):
+        keys.append(("brand", _text(record, "brand")))
+    band = _price_band(record)
+    if band is not None:
+        keys.append(("band", band))
+    return keys
+
+
+def _recommendable(record) -> bool:
+    return record.get("id") is not None and record.get("status") != "sold"
+
+
+class _Neighbours:
+    __slots__ = ("entries", "exhaustive")
+
+    def __init__(self, entries: List[Tuple[float, str]], exhaustive: bool):
+        self.entries = entries          # (score, id), best first
+        self.exhaustive = exhaustive    # every positive-scoring candidate is listed
+
+
+class RecommendationIndex:
+    """Catalog view with candidate buckets and cached top-k neighbour lists."""
+
+    def __init__(self, k: int = NEIGHBOURS_KEPT):
+        self.k = k
+        self._records: Dict[str, Dict] = {}
+        self._buckets: Dict[Tuple[str, object], Set[str]] = {}
+        self._neighbours: Dict[str, _Neighbours] = {}
+        # neighbour id -> ids whose cached list contains it
+        self._listed_by: Dict[str, Set[str]] = {}
+        self.cold_builds = 0
+
+    # Catalog view protocol ------------------------------------------------
+    def rebuild(self, records) -> None:
+        self._records, self._buckets = {}, {}
+        self._neighbours, self._listed_by = {}, {}
+        for record in records:
+            self._track(record)
+
+    def add(self, record: Dict) -> None:
+        if not self._track(record):
+            return
+        key = record["id"]
+        for owner in self._cached_owners_near(record):
+            if owner != key:
+                self._offer(owner, key)
+
+    def remove(self, record: Dict) -> None:
+        key = record.get("id")
+        if key is None:
+            return
+        self._drop_cache(key)
+        if self._records.pop(key, None) is not None:
+            for bucket_key in _bucket_keys(record):
+                bucket = self._buckets.get(bucket_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[bucket_key]
+        for owner in self._listed_by.pop(key, ()):
+            cached = self._neighbours.get(owner)
+            if cached is None:
+                continue
+            cached.entries = [entry for entry in cached.entries if entry[1] != key]
+            if not cached.exhaustive and len(cached.entries) < self.k // 2:
+                # Too few known-best neighbours left to serve; rebuild on next request
+                self._drop_cache(owner)
+
+    def _track(self, record) -> bool:
+        if not _recommendable(record):
+            return False
+        key = record["id"]
+        self._records[key] = record
+        for bucket_key in _bucket_keys(record):
+            self._buckets.setdefault(bucket_key, set()).add(key)
+        return True
+
+    # Neighbour lists ------------------------------------------------------
+    def _bucket(self, kind, value) -> Set[str]:
+        return self._buckets.get((kind, value), set())
+
+    def _band_ids(self, record) -> Set[str]:
+        band = _price_band(record)
+        if band is None:
+            return set()
+        return self._bucket("band", band - 1) | self._bucket("band", band) | self._bucket("band", band + 1)
+
+    def _candidate_ids(self, record) -> Set[str]:
+        candidates = set(self._bucket("category", _text(record, "category")))
+        if _text(record, "brand"):
+            candidates |= self._bucket("brand", _text(record, "brand"))
+        candidates |= self._band_ids(record)
+        candidates.discard(record.get("id"))
+        return candidates
+
+    def _tiers(self, record):
+        """
+        Candidate groups in decreasing order of the best score they can
+        reach: (ids, upper bound). Shared category is worth 5, brand 3 and
+        price closeness at most 2.
+        """
+        category = self._bucket("category", _text(record, "category"))
+        brand = self._bucket("brand", _text(record, "brand")) if _text(record, "brand") else set()
+        small, large = sorted((category, brand), key=len)
+        both = {key for key in small if key in large}
+        yield both, 10
+        yield (key for key in category if key not in both), 7
+        yield (key for key in brand if key not in both), 5
+        yield (key for key in self._band_ids(record) if key not in category and key not in brand), 2
+
+    def _cached_owners_near(self, record) -> List[str]:
+        """Cached listings that could rank record among their neighbours."""
+        category = _text(record, "category")
+        brand = _text(record, "brand")
+        band = _price_band(record)
+        bucket_sizes = len(self._bucket("category", category)) + len(self._bucket("brand", brand))
+        if band is not None:
+            bucket_sizes += sum(len(self._bucket("band", b)) for b in (band - 1, band, band + 1))
+        if bucket_sizes < len(self._neighbours):
+            near = self._candidate_ids(record)
+            return [owner for owner in near if owner in self._neighbours]
+
+        def shares_bucket(other):
+            if _text(other, "category") == category:
+                return True
+            if brand and _text(other, "brand") == brand:
+                return True
+            other_band = _price_band(other)
+            return band is not None and other_band is not None and abs(other_band - band) <= 1
+
+        return [owner for owner in self._neighbours if shares_bucket(self._records[owner])]
+
+    def _build(self, base) -> _Neighbours:
+        heap: List[Tuple[float, str]] = []     # min-heap of the best k so far
+        positive = 0
+        exhaustive = True
+        for ids, upper_bound in self._tiers(base):
+            if len(heap) == self.k and heap[0][0] >= upper_bound:
+                # Nothing in this or any later tier can displace the current top k
+                exhaustive = False
+                break
+            for key in ids:
+                if key == base["id"]:
+                    continue
+                score = compute_similarity_score(base, self._records[key])
+                if score <= 0:
+                    continue
+                positive += 1
+                if len(heap) < self.k:
+                    heapq.heappush(heap, (score, key))
+                elif (score, key) > heap[0]:
+                    heapq.heapreplace(heap, (score, key))
+        self.cold_builds += 1
+        return _Neighbours(sorted(heap, reverse=True), exhaustive=exhaustive and positive <= self.k)
+
+    def _offer(self, owner: str, key: str) -> None:
+        cached = self._neighbours[owner]
+        base = self._records.get(owner)
+        if base is None:
+            return
+        score = compute_similarity_score(base, self._records[key])
+        if score <= 0:
+            return
+        entries = cached.entries
+        if not cached.exhaustive and (not entries or score < entries[-1][0]):
+            # Unlisted candidates may outrank it
+            return
+        entries.append((score, key))
+        entries.sort(reverse=True)
+        self._listed_by.setdefault(key, set()).add(owner)
+        if len(entries) > self.k:
+            _, dropped = entries.pop()
+            self._unlist(dropped, owner)
+            cached.exhaustive = False
+
+    def _unlist(self, key, owner) -> None:
+        owners = self._listed_by.get(key)
+        if owners is not None:
+            owners.discard(owner)
+            if not owners:
+                del self._listed_by[key]
+
+    def _drop_cache(self, owner) -> None:
+        cached = self._neighbours.pop(owner, None)
+        if cached is not None:
+            for _, key in cached.entries:
+                self._unlist(key, owner)
+
+    def recommend(self, base: Dict, limit: int) -> List[Tuple[float, str]]:
+        """Up to limit (score, id) pairs for base, best first."""
+        key = base["id"]
+        cached = self._neighbours.get(key)
+        if cached is None:
+            if key not in self._records:
+                # Sold listings are not tracked; score them without caching
+                return self._build(base).entries[:limit]
+            cached = self._neighbours[key] = self._build(base)
+            for _, neighbour in cached.entries:
+                self._listed_by.setdefault(neighbour, set()).add(key)
+        return cached.entries[:limit]
+
+    def blend_visual(self, base: Dict, attribute_ranked: List[Tuple[float, str]], store,
+                     limit: int, visual_weight: float):
+        """
+        Re-rank by (1 - w) * attribute score + w * cosine similarity of stored
+        image embeddings. Candidates are the attribute neighbours plus the
+        visually closest listings in base's category, scored with one matrix
+        product. Returns (ranked pairs, whether embeddings were used).
+        """
+        from ml_services.image_search.embedding_store import cosine_top_k
+
+        query = store.get(base["id"], base.get("image_url", ""))
+        if query is None:
+            return attribute_ranked[:limit], False
+
+        category = _text(base, "category")
+        ids, matrix = store.category_matrix(category)
+        rows, similarities = cosine_top_k(query, matrix, VISUAL_CANDIDATES + 1)
+        visual = {ids[row]: float(sim) for row, sim in zip(rows, similarities)}
+
+        attribute = {key: score for score, key in attribute_ranked}
+        blended = []
+        for key in set(visual) | set(attribute):
+            record = self._records.get(key)
+            if key == base["id"] or record is None:
+                continue
+            if key in visual and _text(record, "category") != category:
+                continue
+            vector = store.get(key, record.get("image_url", ""))
+            if vector is None:
+                similarity = 0.0
+            else:
+                similarity = visual.get(key)
+                if similarity is None:
+                    similarity = float(vector @ query)
+            score = attribute.get(key)
+            if score is None:
+                score = compute_similarity_score(base, record)
+            value = ((1 - visual_weight) * max(score, 0.0) / MAX_ATTRIBUTE_SCORE
+                     + visual_weight * max(similarity, 0.0))
+            if value > 0:
+                blended.append((value, key))
+        return heapq.nlargest(limit, blended), True
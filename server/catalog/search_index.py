@@ -0,0 +1,268 @@
+# server/catalog/search_index.py
+"""
+Full-text search over listing titles, descriptions and brands.
+
+An inverted index (term -> {product_id: weighted term frequency}) kept in
+step with the catalog and ranked with BM25. A sorted term list answers
+prefix lookups for autocomplete.
+
+The postings are saved to a gzipped JSON file together with a fingerprint
+of each listing's text. On startup the file is loaded and only listings
+whose text changed since it was written are re-tokenized.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import zlib
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional
+
+from storage import data_path
+from storage.locking import atomic_write
+
+INDEX_FILE = "search_index.json.gz"
+FORMAT_VERSION = 1
+
+# Matches in the title count double, the brand one and a half times
+FIELD_WEIGHTS = {"title": 2.0, "brand": 1.5, "description": 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# How many completions of a trailing prefix token are scored
+MAX_PREFIX_EXPANSIONS = 50
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords."""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def text_fingerprint(record) -> int:
+    """Cheap checksum of the indexed fields, used to skip unchanged listings on load."""
+    text = "\x1f".join(str(record.get(field) or "") for field in FIELD_WEIGHTS)
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def weighted_terms(record) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(record.get(field)):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class SearchIndex:
+    """Catalog view holding BM25 postings for every listing."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path(INDEX_FILE)
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []             # sorted, for prefix lookups
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._total_length = 0.0
+        self._dirty = False
+        atexit.register(self.save_if_dirty)
+
+    # Catalog view protocol ------------------------------------------------
+    def rebuild(self, records) -> None:
+        stored = self._read_file()
+        self._postings, self._doc_terms, self._doc_lengths = {}, {}, {}
+        self._fingerprints, self._total_length = {}, 0.0
+
+        reused = 0
+        for record in records:
+            key = record.get("id")
+            if key is None:
+                continue
+            fingerprint = text_fingerprint(record)
+            previous = stored.get(key)
+            if previous is not None and previous[0] == fingerprint:
+                terms = previous[1]
+                reused += 1
+            else:
+                terms = weighted_terms(record)
+            self._store(key, fingerprint, terms)
+
+        self._terms = sorted(self._postings)
+        # Rewrite the file when any listing was added, changed or removed
+        self._dirty = reused != len(stored) or reused != len(self._doc_terms)
+        self.save_if_dirty()
+
+    def add(self, record: Dict) -> None:
+        key = record.get("id")
+        if key is None:
+            return
+        for term in self._store(key, text_fingerprint(record), weighted_terms(record)):
+            insort(self._terms, term)
+        self._dirty = True
+
+    def remove(self, record: Dict) -> None:
+        terms = self._doc_terms.pop(record.get("id"), None)
+        if terms is None:
+            return
+        key = record["id"]
+        self._fingerprints.pop(key, None)
+        self._total_length -= self._doc_lengths.pop(key, 0.0)
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(key, None)
+            if not docs:
+                del self._postings[term]
+                i = bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+        self._dirty = True
+
+    def _store(self, key, fingerprint, terms) -> List[str]:
+        """Add one listing's postings; returns terms that were new to the index."""
+        new_terms = []
+        self._doc_terms[key] = terms
+        self._fingerprints[key] = fingerprint
+        length = sum(terms.values())
+        self._doc_lengths[key] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            docs = self._postings.get(term)
+            if docs is None:
+                docs = self._postings[term] = {}
+                new_terms.append(term)
+            docs[key] = tf
+        return new_terms
+
+    # Queries --------------------------------------------------------------
+    def expand_prefix(self, prefix: str, limit: int = MAX_PREFIX_EXPANSIONS) -> List[str]:
+        """Indexed terms starting with prefix, most common first."""
+        start = bisect_left(self._terms, prefix)
+        matches = []
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > limit:
+            matches = heapq.nlargest(limit, matches, key=lambda t: len(self._postings[t]))
+        else:
+            matches.sort(key=lambda t: len(self._postings[t]), reverse=True)
+        return matches
+
+    def _idf(self, term) -> float:
+        n, df = len(self._doc_terms), len(self._postings[term])
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, prefix: bool = True) -> Dict[str, float]:
+        """
+        BM25 score of every listing matching all query tokens. With prefix,
+        the last token also matches longer terms (search-as-you-type), and a
+        listing scores with its best matching completion.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        groups = []
+        for i, token in enumerate(tokens):
+            if prefix and i == len(tokens) - 1:
+                terms = self.expand_prefix(token)
+            else:
+                terms = [token] if token in self._postings else []
+            if not terms:
+                return {}
+            groups.append([(self._postings[t], self._idf(t)) for t in terms])
+
+        # Intersect starting from the rarest token so common words only filter
+        groups.sort(key=lambda group: sum(len(docs) for docs, _ in group))
+        candidates = set()
+        for docs, _ in groups[0]:
+            candidates.update(docs)
+        for group in groups[1:]:
+            candidates = {key for key in candidates if any(key in docs for docs, _ in group)}
+            if not candidates:
+                return {}
+
+        average = self._total_length / len(self._doc_terms)
+        scores = {}
+        for key in candidates:
+            norm = K1 * (1 - B + B * self._doc_lengths[key] / average)
+            total = 0.0
+            for group in groups:
+                best = 0.0
+                for docs, idf in group:
+                    tf = docs.get(key)
+                    if tf:
+                        best = max(best, idf * tf * (K1 + 1) / (tf + norm))
+                total += best
+            scores[key] = total
+        return scores
+
+    def suggest(self, query: str, limit: int = 8) -> List[str]:
+        """Completions of the query's last token, each prefixed with the preceding words."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        head = " ".join(tokens[:-1])
+        return [f"{head} {term}".strip() for term in self.expand_prefix(tokens[-1], limit)]
+
+    # Persistence ----------------------------------------------------------
+    def _read_file(self) -> Dict[str, tuple]:
+        """product_id -> (fingerprint, terms) from the saved index, or {} if unusable."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("format") != FORMAT_VERSION:
+                return {}
+            ids, vocabulary = saved["ids"], saved["terms"]
+            docs = {}
+            for key, fingerprint, flat in zip(ids, saved["fingerprints"], saved["docs"]):
+                # flat is [term_index, tf, term_index, tf, ...]
+                docs[key] = (fingerprint, {vocabulary[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)})
+            return docs
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            return {}
+
+    def save(self) -> None:
+        vocabulary = sorted(self._postings)
+        positions = {term: i for i, term in enumerate(vocabulary)}
+        ids = list(self._doc_terms)
+        payload = {
+            "format": FORMAT_VERSION,
+            "terms": vocabulary,
+            "ids": ids,
+            "fingerprints": [self._fingerprints[key] for key in ids],
+            "docs": [
+                [value for term, tf in self._doc_terms[key].items() for value in (positions[term], tf)]
+                for key in ids
+            ],
+        }
+
+        encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        atomic_write(self.path, lambda f: f.write(gzip.compress(encoded, 6)), mode="wb")
+        self._dirty = False
+
+    def save_if_dirty(self) -> None:
+        if self._dirty:
+            try:
+                self.save()
+            except OSError:
+                pass
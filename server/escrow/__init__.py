@@ -0,0 +1,13 @@
+"""
+Escrow state: an append-only event ledger with the current state of every
+escrow materialized in memory, so transitions are appends and lookups never
+load the whole escrow store, and the scheduler that enforces deadlines.
+"""
+
+from .ledger import EscrowLedger, IdempotencyMismatch, LedgerError, VersionConflict, get_ledger
+from .scheduler import EscrowScheduler, get_scheduler, start_scheduler
+
+__all__ = [
+    "EscrowLedger", "EscrowScheduler", "IdempotencyMismatch", "LedgerError", "VersionConflict",
+    "get_ledger", "get_scheduler", "start_scheduler",
+]
@@ -0,0 +1,37 @@
+# server/escrow/deadlines.py
+"""
+How long an escrow may wait in a status before the scheduler acts on it.
+
+The deadline is computed when an event puts the escrow in the status and is
+stored on the event (deadline_at), so replaying the ledger gives the same
+deadlines even after the policy changes.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+SELLER_HOURS = float(os.environ.get("ESCROW_SELLER_DEADLINE_HOURS", "72"))
+BUYER_HOURS = float(os.environ.get("ESCROW_BUYER_DEADLINE_HOURS", "168"))
+
+# status -> (time allowed in the status, status after the deadline, timeline action)
+POLICY = {
+    "AWAITING_SELLER": (timedelta(hours=SELLER_HOURS), "CANCELLED", "AUTO_CANCELLED_SELLER_TIMEOUT"),
+    "AWAITING_SHIPMENT": (timedelta(hours=SELLER_HOURS), "CANCELLED", "AUTO_CANCELLED_SELLER_TIMEOUT"),
+    "AWAITING_BUYER_CONFIRMATION": (timedelta(hours=BUYER_HOURS), "COMPLETED", "AUTO_RELEASED_FUNDS"),
+}
+
+
+def deadline_for(status: str, since: str) -> Optional[str]:
+    """ISO time at which an escrow that entered status at since is acted on, or None."""
+    policy = POLICY.get(status)
+    if policy is None or not since:
+        return None
+    return (datetime.fromisoformat(since) + policy[0]).isoformat()
+
+
+def entry_deadline(entry) -> Optional[str]:
+    """Deadline of entry; computed for escrows recorded before deadlines were stored."""
+    if "deadline_at" in entry:
+        return entry["deadline_at"]
+    return deadline_for(entry.get("status"), entry.get("updated_at"))
@@ -0,0 +1,160 @@
+# server/escrow/index.py
+"""
+Secondary indexes over the materialized escrow state.
+
+Escrow ids are kept in sets per buyer, per seller and per status, and in
+one list of (created_at, id) pairs sorted by creation time. A query
+intersects the sets of its filters (smallest first) and orders the
+survivors by creation time, or walks the date slice of the sorted list
+when that slice is the smaller side, so its cost follows the size of the
+answer rather than the number of escrows. Per-status counts for every
+buyer and seller are kept as counters updated with each change.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog.ordering import decode_text_cursor, encode_cursor
+
+_ORDER = "created_at"
+
+
+class EscrowIndex:
+    """Escrow ids by buyer, seller, status and creation time, with status counters."""
+
+    def __init__(self):
+        self._by_buyer: Dict[str, Set[str]] = {}
+        self._by_seller: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._created: List[Tuple[str, str]] = []
+        # id -> (buyer_id, seller_id, status, created_at) as indexed
+        self._keys: Dict[str, Tuple] = {}
+        # ("buyer" | "seller", user id) -> status -> escrows
+        self._counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # Maintenance ---------------------------------------------------------
+    def update(self, entry: Dict) -> None:
+        """Index entry, moving it if its participants, status or creation time changed."""
+        escrow_id = entry["id"]
+        keys = (entry.get("buyer_id"), entry.get("seller_id"), entry.get("status") or "",
+                str(entry.get("created_at") or ""))
+        indexed = self._keys.get(escrow_id)
+        if indexed == keys:
+            return
+        # Status changes leave the creation order alone
+        moved = indexed is None or indexed[3] != keys[3]
+        if indexed is not None:
+            self._remove(escrow_id, indexed, moved)
+        self._keys[escrow_id] = keys
+        buyer_id, seller_id, status, created_at = keys
+        self._by_buyer.setdefault(buyer_id, set()).add(escrow_id)
+        self._by_seller.setdefault(seller_id, set()).add(escrow_id)
+        self._by_status.setdefault(status, set()).add(escrow_id)
+        if moved:
+            insort(self._created, (created_at, escrow_id))
+        for role, user_id in (("buyer", buyer_id), ("seller", seller_id)):
+            counts = self._counts.setdefault((role, user_id), {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def _remove(self, escrow_id: str, keys: Tuple, moved: bool) -> None:
+        buyer_id, seller_id, status, created_at = keys
+        for sets, value in ((self._by_buyer, buyer_id), (self._by_seller, seller_id),
+                            (self._by_status, status)):
+            sets[value].discard(escrow_id)
+            if not sets[value]:
+                del sets[value]
+        if moved:
+            del self._created[bisect_left(self._created, (created_at, escrow_id))]
+        for role, user_id in (("buyer", buyer_id), ("seller", seller_id)):
+            counts = self._counts[(role, user_id)]
+            counts[status] -= 1
+            if not counts[status]:
+                del counts[status]
+            if not counts:
+                del self._counts[(role, user_id)]
+
+    # Queries -------------------------------------------------------------
+    def ids_for(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None) -> Set[str]:
+        """Ids of the escrows of a buyer or a seller (both: escrows between them)."""
+        ids = None
+        if buyer_id is not None:
+            ids = set(self._by_buyer.get(buyer_id, ()))
+        if seller_id is not None:
+            sellers = self._by_seller.get(seller_id, set())
+            ids = set(sellers) if ids is None else ids & sellers
+        return ids if ids is not None else set(self._keys)
+
+    def _filters(self, buyer_id, seller_id, statuses) -> List[Set[str]]:
+        """Id sets of the participant and status filters, smallest first."""
+        sets = []
+        if buyer_id is not None:
+            sets.append(self._by_buyer.get(buyer_id, set()))
+        if seller_id is not None:
+            sets.append(self._by_seller.get(seller_id, set()))
+        if statuses is not None:
+            matching = [self._by_status[status] for status in statuses if status in self._by_status]
+            sets.append(matching[0] if len(matching) == 1 else set().union(*matching))
+        sets.sort(key=len)
+        return sets
+
+    def page(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None,
+             statuses: Optional[Iterable[str]] = None, created_from: Optional[str] = None,
+             created_to: Optional[str] = None, descending: bool = True,
+             cursor: Optional[str] = None, limit: int = 50):
+        """
+        One page of escrow ids matching every filter given, in creation
+        order; created_from is inclusive, created_to exclusive. Returns
+        (ids, total, next_cursor); raises ValueError for a bad cursor.
+        """
+        after = decode_text_cursor(cursor, _ORDER, descending) if cursor else None
+        start = bisect_left(self._created, (created_from,)) if created_from else 0
+        end = bisect_left(self._created, (created_to,)) if created_to else len(self._created)
+        end = max(start, end)
+
+        sets = self._filters(buyer_id, seller_id, set(statuses) if statuses is not None else None)
+        if not sets:
+            rows = self._created[start:end]
+        elif len(sets[0]) < end - start:
+            ids = sets[0].intersection(*sets[1:])
+            low = created_from or ""
+            rows = sorted(
+                (self._keys[escrow_id][3], escrow_id) for escrow_id in ids
+                if self._keys[escrow_id][3] >= low and (not created_to or self._keys[escrow_id][3] < created_to)
+            )
+        else:
+            rows = self._created[start:end]
+            for ids in sets:
+                rows = [row for row in rows if row[1] in ids]
+
+        total = len(rows)
+        if descending:
+            if after is not None:
+                rows = rows[:bisect_left(rows, after)]
+            window = rows[-limit:][::-1]
+            more = len(rows) > limit
+        else:
+            if after is not None:
+                rows = rows[bisect_right(rows, after):]
+            window = rows[:limit]
+            more = len(rows) > limit
+        next_cursor = encode_cursor(_ORDER, descending, *window[-1]) if more and window else None
+        return [escrow_id for _, escrow_id in window], total, next_cursor
+
+    def status_counts(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None) -> Dict[str, int]:
+        """Escrows per status, of a buyer, a seller, both (between them) or everyone."""
+        if buyer_id is not None and seller_id is not None:
+            counts: Dict[str, int] = {}
+            for escrow_id in self.ids_for(buyer_id, seller_id):
+                status = self._keys[escrow_id][2]
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+        if buyer_id is not None:
+            return dict(self._counts.get(("buyer", buyer_id), {}))
+        if seller_id is not None:
+            return dict(self._counts.get(("seller", seller_id), {}))
+        return {status: len(ids) for status, ids in self._by_status.items()}
@@ -0,0 +1,530 @@
+# server/escrow/ledger.py
+"""
+Event-sourced escrow ledger.
+
+Every escrow change is one record appended to a single log (checksummed
+lines, see storage.logfile); the records are the escrow timeline events:
+  {"seq", "escrow_id", "id", "action", "actor", "timestamp", "status", "deadline_at"}
+ESCROW_CREATED also carries the new entry, and ESCROW_IMPORTED carries an
+entry copied from the old escrow store together with its timeline.
+
+The current state of every escrow is materialized in memory by applying
+the log in order, with indexes by buyer, seller, status and creation
+time (see escrow.index), so a transition is one append, a lookup is a
+dict access and listing a user's escrows touches only theirs. Each
+process follows the log from the last offset it applied, so appends from
+other processes show up on its next read. Snapshots of the state (with
+the log offset they cover) are written every SNAPSHOT_EVERY events, so a
+restart only replays the log tail.
+
+Transitions are validated and appended inside one short critical section
+against the fully caught-up state, so concurrent requests cannot both act
+on a stale read. Concurrent appends are group-committed (one write and one
+fsync per batch). Each escrow carries a version, the number of events
+applied to it, for compare-and-swap by clients. Events may carry an
+idempotency key; a retried request with the same key gets the escrow as it
+was after the original event instead of a second event.
+
+The log is never rewritten: it is the audit history.
+    python -m escrow.ledger replay [--escrow ID] [--until-seq N]
+    python -m escrow.ledger snapshot
+    python -m escrow.ledger verify
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from storage import data_path
+from storage.locking import FileLock, GroupCommitter, atomic_write
+from storage.logfile import decode_record, encode_record
+
+from .deadlines import deadline_for
+from .index import EscrowIndex
+
+LEDGER_DIR = "escrow_ledger"
+EVENTS_FILE = "events.log"
+SNAPSHOT_FILE = "snapshot.json"
+
+# fsync every append; set ESCROW_LEDGER_FSYNC=0 to trade durability for latency
+FSYNC = os.environ.get("ESCROW_LEDGER_FSYNC", "1") != "0"
+
+# Events between automatic snapshots
+SNAPSHOT_EVERY = 5000
+
+# How long an idempotency key is remembered after its request
+IDEMPOTENCY_TTL = timedelta(hours=24)
+
+CREATED = "ESCROW_CREATED"
+IMPORTED = "ESCROW_IMPORTED"
+
+_EVENT_FIELDS = ("id", "action", "actor", "timestamp")
+
+
+class LedgerError(Exception):
+    """A transition that was not applied; status_code is the HTTP status to answer with."""
+
+    status_code = 400
+
+    def __init__(self, message: str, status_code: Optional[int] = None, **details):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+        self.details = details
+
+
+class VersionConflict(LedgerError):
+    status_code = 409
+
+
+class IdempotencyMismatch(LedgerError):
+    status_code = 422
+
+
+def new_event(escrow_id: str, action: str, actor: str, status: str, entry: Optional[Dict] = None,
+              idempotency: Optional[Tuple[str, str]] = None) -> Dict:
+    event = {
+        "escrow_id": escrow_id,
+        "id": str(uuid.uuid4()),
+        "action": action,
+        "actor": actor,
+        "timestamp": datetime.utcnow().isoformat(),
+        "status": status,
+    }
+    event["deadline_at"] = deadline_for(status, event["timestamp"])
+    if entry is not None:
+        event["entry"] = entry
+    if idempotency is not None:
+        event["idempotency"] = {"key": idempotency[0], "request": idempotency[1]}
+    return event
+
+
+def _set_deadline(entry: Dict, event: Dict) -> None:
+    if "deadline_at" in event:
+        entry["deadline_at"] = event["deadline_at"]
+    else:
+        entry.pop("deadline_at", None)      # logged before deadlines; derived from the status
+
+
+def apply_event(state: Dict[str, Dict], event: Dict) -> Optional[Dict]:
+    """Apply one ledger event to state (escrow id -> entry). Returns the entry it changed."""
+    escrow_id = event["escrow_id"]
+    if "entry" in event:
+        entry = dict(event["entry"])
+        entry["timeline"] = list(entry.get("timeline") or [])
+        state[escrow_id] = entry
+        if event["action"] == IMPORTED:
+            entry["version"] = entry.get("version") or max(1, len(entry["timeline"]))
+            _set_deadline(entry, event)
+            return entry
+    else:
+        entry = state.get(escrow_id)
+        if entry is None:
+            return None
+    entry["version"] = entry.get("version", 0) + 1
+    entry["status"] = event["status"]
+    entry["updated_at"] = event["timestamp"]
+    _set_deadline(entry, event)
+    entry["timeline"].append({key: event[key] for key in _EVENT_FIELDS})
+    return entry
+
+
+def copy_entry(entry: Dict) -> Dict:
+    return {**entry, "timeline": list(entry.get("timeline") or [])}
+
+
+class EscrowLedger:
+    """Escrow event log under root with the current state of every escrow in memory."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or data_path(LEDGER_DIR)
+        self.path = os.path.join(self.root, EVENTS_FILE)
+        self.snapshot_path = os.path.join(self.root, SNAPSHOT_FILE)
+        self._lock = threading.RLock()
+        self._state: Dict[str, Dict] = {}
+        self._indexes = EscrowIndex()
+        self._offset = 0                # log bytes applied
+        self._inode = None
+        self._seq = 0                   # last event applied
+        self._loaded = False
+        self._snapshot_seq = 0
+        # idempotency key -> {"request", "timestamp", "escrow" as after its event}
+        self._idempotent: "OrderedDict[str, Dict]" = OrderedDict()
+        self._committer = GroupCommitter(self._commit_batch)
+        self._listeners = []
+        self.damaged = 0                # lines skipped for a bad checksum
+
+    # Loading -------------------------------------------------------------
+    def _reset(self) -> None:
+        self._state, self._indexes = {}, EscrowIndex()
+        self._idempotent = OrderedDict()
+        self._offset = self._seq = self._snapshot_seq = 0
+        self.damaged = 0
+
+    def _load_snapshot(self) -> None:
+        self._reset()
+        for listener in self._listeners:
+            listener(None)
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if snapshot.get("offset", 0) > size:
+            return                      # snapshot of another log; replay from the start
+        for entry in snapshot.get("escrows", []):
+            self._state[entry["id"]] = entry
+            self._indexes.update(entry)
+        for key, cached in snapshot.get("idempotency", []):
+            self._idempotent[key] = cached
+        self._offset = snapshot["offset"]
+        self._seq = self._snapshot_seq = snapshot["seq"]
+
+    def _refresh(self, handle=None) -> None:
+        """Apply events appended to the log since the last read."""
+        with self._lock:
+            if handle is not None:
+                self._sync(handle)
+                return
+            try:
+                with open(self.path, "rb") as handle:
+                    self._sync(handle)
+            except FileNotFoundError:
+                if not self._loaded:
+                    self._reset()
+                    self._loaded = True
+
+    def _sync(self, handle) -> None:
+        st = os.fstat(handle.fileno())
+        if not self._loaded or st.st_ino != self._inode or st.st_size < self._offset:
+            self._load_snapshot()
+            self._inode = st.st_ino
+            self._loaded = True
+        if st.st_size > self._offset:
+            handle.seek(self._offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break               # torn final line, cut off on the next append
+                event = decode_record(line)
+                if event is None:
+                    self.damaged += 1
+                elif event.get("seq", 0) > self._seq:
+                    self._apply(event)
+                self._offset += len(line)
+
+    def _apply(self, event: Dict) -> Optional[Dict]:
+        entry = apply_event(self._state, event)
+        self._seq = event["seq"]
+        if entry is not None:
+            self._indexes.update(entry)
+        if entry is not None and "idempotency" in event:
+            self._remember(event, entry)
+        if entry is not None:
+            for listener in self._listeners:
+                listener(entry)
+        return entry
+
+    def subscribe(self, listener) -> None:
+        """
+        Call listener(entry) with each escrow an applied event changed, and
+        listener(None) when the whole state is reloaded. Listeners run under
+        the ledger lock and must not modify entry.
+        """
+        self._listeners.append(listener)
+
+    def _remember(self, event: Dict, entry: Dict) -> None:
+        key = event["idempotency"]["key"]
+        self._idempotent.pop(key, None)
+        self._idempotent[key] = {
+            "request": event["idempotency"]["request"],
+            "timestamp": event["timestamp"],
+            "escrow": copy_entry(entry),
+        }
+        expired = (datetime.fromisoformat(event["timestamp"]) - IDEMPOTENCY_TTL).isoformat()
+        while self._idempotent:
+            oldest = next(iter(self._idempotent.values()))
+            if oldest["timestamp"] >= expired:
+                break
+            self._idempotent.popitem(last=False)
+
+    def _replayed(self, idempotency: Optional[Tuple[str, str]]) -> Optional[Dict]:
+        """Escrow recorded for an idempotency key already used by the same request, else None."""
+        if idempotency is None:
+            return None
+        key, fingerprint = idempotency
+        cached = self._idempotent.get(key)
+        if cached is None:
+            return None
+        if cached["request"] != fingerprint:
+            raise IdempotencyMismatch("Idempotency-Key was already used for a different request")
+        return copy_entry(cached["escrow"])
+
+    # Writes --------------------------------------------------------------
+    def _append(self, build: Callable[[], List[Dict]]) -> List[Dict]:
+        """
+        Append the events build() returns, validated against the state with
+        every earlier event applied. Returns the entries they changed; errors
+        raised by build are raised here and nothing is appended for them.
+        """
+        return self._committer.submit(build)
+
+    def _commit_batch(self, batch) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, FileLock(self.path).exclusive():
+            with open(self.path, "ab+") as handle:
+                self._refresh(handle)
+                if os.fstat(handle.fileno()).st_size > self._offset:
+                    handle.truncate(self._offset)
+                data = []
+                for op in batch:
+                    try:
+                        events = op.fn()
+                    except Exception as e:
+                        op.error = e
+                        continue
+                    # Applied right away so later builds in the batch see them
+                    changed = []
+                    start = len(data)
+                    try:
+                        for event in events:
+                            event["seq"] = self._seq + 1
+                            data.append(encode_record(event))
+                            changed.append(self._apply(event))
+                    except Exception as e:
+                        # Part of op is in memory only: drop its events, write the
+                        # batch so far and rebuild the state from the log
+                        op.error = e
+                        del data[start:]
+                        self._write(handle, data)
+                        data = []
+                        self._loaded = False
+                        self._sync(handle)
+                        continue
+                    op.result = [copy_entry(entry) for entry in changed if entry is not None]
+                self._write(handle, data)
+            if self._seq - self._snapshot_seq >= SNAPSHOT_EVERY:
+                self.write_snapshot()
+
+    def _write(self, handle, data: List[bytes]) -> None:
+        if not data:
+            return
+        try:
+            handle.write(b"".join(data))
+            handle.flush()
+            if FSYNC:
+                os.fsync(handle.fileno())
+        except BaseException:
+            self._loaded = False        # state is ahead of the log; rebuild on next read
+            raise
+        self._offset = handle.tell()
+
+    def create(self, entry: Dict, actor: str = "system",
+               idempotency: Optional[Tuple[str, str]] = None) -> Tuple[Dict, bool]:
+        """
+        Record a new escrow (without timeline). Returns it with its
+        ESCROW_CREATED event, and whether it is the replayed result of an
+        earlier request with the same idempotency (key, request fingerprint).
+        """
+        entry = {key: value for key, value in entry.items() if key != "timeline"}
+        replayed = None
+
+        def build():
+            nonlocal replayed
+            replayed = self._replayed(idempotency)
+            if replayed is not None:
+                return []
+            return [new_event(entry["id"], CREATED, actor, entry["status"], entry, idempotency)]
+
+        changed = self._append(build)
+        return (replayed, True) if replayed is not None else (changed[0], False)
+
+    def transition(self, escrow_id: str, status: str, action: str, actor: str,
+                   check: Optional[Callable[[Dict], None]] = None,
+                   expected_version: Optional[int] = None,
+                   idempotency: Optional[Tuple[str, str]] = None) -> Tuple[Optional[Dict], bool]:
+        """
+        Append a status change event. check(entry) may raise LedgerError to
+        reject it; with expected_version it is only applied if the escrow is
+        still at that version (VersionConflict otherwise). Returns (escrow
+        after the event or None if it does not exist, replayed) like create.
+        """
+        replayed = None
+
+        def build():
+            nonlocal replayed
+            replayed = self._replayed(idempotency)
+            if replayed is not None:
+                return []
+            entry = self._state.get(escrow_id)
+            if entry is None:
+                return []
+            if expected_version is not None and entry.get("version") != expected_version:
+                raise VersionConflict("Escrow was modified by another request",
+                                      version=entry.get("version"), status=entry["status"])
+            if check is not None:
+                check(entry)
+            return [new_event(escrow_id, action, actor, status, idempotency=idempotency)]
+
+        changed = self._append(build)
+        if replayed is not None:
+            return replayed, True
+        return (changed[0] if changed else None), False
+
+    def import_entries(self, entries: List[Dict]) -> int:
+        """Copy escrows from the old store into an empty ledger. Returns how many were imported."""
+        def build():
+            if self._seq:
+                return []
+            events = []
+            for entry in entries:
+                if entry.get("id"):
+                    event = new_event(entry["id"], IMPORTED, "system", entry.get("status"), entry)
+                    event["deadline_at"] = deadline_for(entry.get("status"), entry.get("updated_at"))
+                    events.append(event)
+            return events
+
+        return len(self._append(build))
+
+    def write_snapshot(self) -> None:
+        with self._lock:
+            self._refresh()
+            snapshot = {
+                "seq": self._seq,
+                "offset": self._offset,
+                "escrows": list(self._state.values()),
+                "idempotency": list(self._idempotent.items()),
+            }
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write(self.snapshot_path, lambda f: json.dump(snapshot, f, separators=(",", ":")))
+            self._snapshot_seq = self._seq
+
+    # Reads ---------------------------------------------------------------
+    def refresh(self) -> None:
+        """Pick up events other processes have appended."""
+        self._refresh()
+
+    def get(self, escrow_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            entry = self._state.get(escrow_id)
+            return copy_entry(entry) if entry is not None else None
+
+    def ids_for(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None) -> Set[str]:
+        """Ids of the escrows of a buyer or a seller (both: escrows between them)."""
+        with self._lock:
+            self._refresh()
+            return self._indexes.ids_for(buyer_id, seller_id)
+
+    def query(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None,
+              statuses: Optional[Set[str]] = None, created_from: Optional[str] = None,
+              created_to: Optional[str] = None, descending: bool = True,
+              cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], int, Optional[str]]:
+        """
+        One page of escrows filtered by participant, status and creation
+        time (see EscrowIndex.page). Returns (entries, total, next_cursor).
+        """
+        with self._lock:
+            self._refresh()
+            ids, total, next_cursor = self._indexes.page(
+                buyer_id, seller_id, statuses, created_from, created_to, descending, cursor, limit)
+            return [copy_entry(self._state[escrow_id]) for escrow_id in ids], total, next_cursor
+
+    def status_counts(self, buyer_id: Optional[str] = None, seller_id: Optional[str] = None) -> Dict[str, int]:
+        with self._lock:
+            self._refresh()
+            return self._indexes.status_counts(buyer_id, seller_id)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            self._refresh()
+            return self._seq == 0
+
+    def events(self) -> Iterator[Dict]:
+        """Every intact event in the log, oldest first."""
+        try:
+            with open(self.path, "rb") as handle:
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    event = decode_record(line)
+                    if event is not None:
+                        yield event
+        except FileNotFoundError:
+            return
+
+    def replay(self, until_seq: Optional[int] = None, escrow_id: Optional[str] = None) -> Dict[str, Dict]:
+        """State rebuilt from the log alone, up to and including event until_seq."""
+        state: Dict[str, Dict] = {}
+        for event in self.events():
+            if until_seq is not None and event["seq"] > until_seq:
+                break
+            if escrow_id is None or event["escrow_id"] == escrow_id:
+                apply_event(state, event)
+        return state
+
+    def state(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._refresh()
+            return {escrow_id: copy_entry(entry) for escrow_id, entry in self._state.items()}
+
+
+_ledgers: Dict[str, EscrowLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger() -> EscrowLedger:
+    """
+    Shared ledger for the configured data directory. The first time it is
+    empty, escrows from the old escrow store are imported into it.
+    """
+    root = data_path(LEDGER_DIR)
+    with _ledgers_lock:
+        ledger = _ledgers.get(root)
+        if ledger is None:
+            ledger = _ledgers[root] = EscrowLedger(root)
+            if ledger.is_empty():
+                from storage import get_collection
+
+                ledger.import_entries(get_collection("escrows").all())
+        return ledger
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Escrow ledger tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="print escrow state rebuilt from the event log")
+    replay.add_argument("--escrow")
+    replay.add_argument("--until-seq", type=int)
+    commands.add_parser("snapshot", help="write a snapshot of the current state")
+    commands.add_parser("verify", help="check that snapshot plus log tail matches a full replay")
+    args = parser.parse_args()
+
+    ledger = get_ledger()
+    if args.command == "replay":
+        state = ledger.replay(args.until_seq, args.escrow)
+        json.dump(list(state.values()) if args.escrow is None else state.get(args.escrow), sys.stdout, indent=2)
+        print()
+    elif args.command == "snapshot":
+        ledger.write_snapshot()
+        print(f"Snapshot of {len(ledger.state())} escrows written to {ledger.snapshot_path}")
+    else:
+        replayed, current = ledger.replay(), ledger.state()
+        mismatched = sorted(i for i in set(replayed) | set(current) if replayed.get(i) != current.get(i))
+        print(f"{len(current)} escrows, {len(mismatched)} differ from a full replay"
+              + (f", {ledger.damaged} damaged log lines skipped" if ledger.damaged else ""))
+        for escrow_id in mismatched[:20]:
+            print(f"  {escrow_id}")
+        sys.exit(1 if mismatched else 0)
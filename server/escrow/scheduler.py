@@ -0,0 +1,232 @@
+# server/escrow/scheduler.py
+"""
+In-process scheduler for escrow deadlines.
+
+DeadlineHeap is a binary heap of (due time, key, token) with lazy
+cancellation: rescheduling a key pushes a new item and leaves the old one
+to be skipped when it surfaces, so schedule, reschedule and cancel are
+O(log n) and the heap is rebuilt once stale items outnumber live ones.
+
+EscrowScheduler keeps one deadline per escrow, following every event the
+ledger applies (including events appended by other processes, which the
+ledger picks up on its next read). Deadlines are stored on the ledger
+events, so the schedule survives restarts by being rebuilt from the ledger
+state. When a deadline passes, the policy's transition is appended only if
+the escrow is still at the version the deadline was computed for, so a
+scheduler in another process, or a transition that raced it, wins
+cleanly. Buyer and seller are notified on the messaging event bus.
+
+Set ESCROW_SCHEDULER=0 to run a process without it.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .deadlines import POLICY, entry_deadline
+from .ledger import EscrowLedger, VersionConflict, get_ledger
+
+ENABLED = os.environ.get("ESCROW_SCHEDULER", "1") != "0"
+
+# Longest sleep between checks, so deadlines of escrows changed by other processes are seen
+POLL_SECONDS = 30.0
+
+
+def to_epoch(iso: str) -> float:
+    """Seconds since the epoch of a naive UTC ISO timestamp (as stored by the ledger)."""
+    return datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+
+
+class DeadlineHeap:
+    """Earliest-deadline-first queue with one live deadline per key."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str, object]] = []
+        self._current: Dict[str, Tuple[float, object]] = {}
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def schedule(self, key: str, due: float, token=None) -> None:
+        """Set key's deadline, replacing any earlier one."""
+        self._current[key] = (due, token)
+        heapq.heappush(self._heap, (due, key, token))
+        if len(self._heap) > 2 * len(self._current) + 1024:
+            self.rebuild()
+
+    def cancel(self, key: str) -> None:
+        self._current.pop(key, None)
+
+    def rebuild(self, items=None) -> None:
+        """Drop stale items; with items [(key, due, token)] replace every deadline."""
+        if items is not None:
+            self._current = {key: (due, token) for key, due, token in items}
+        self._heap = [(due, key, token) for key, (due, token) in self._current.items()]
+        heapq.heapify(self._heap)
+
+    def _live(self, item) -> bool:
+        due, key, token = item
+        return self._current.get(key) == (due, token)
+
+    def next_due(self) -> Optional[float]:
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Tuple[str, object]]:
+        """Remove and return (key, token) of deadlines at or before now, earliest first."""
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            item = heapq.heappop(self._heap)
+            if self._live(item):
+                del self._current[item[1]]
+                due.append((item[1], item[2]))
+        return due
+
+
+class EscrowScheduler:
+    """Runs escrow deadline actions on a background thread."""
+
+    def __init__(self, ledger: EscrowLedger):
+        self.ledger = ledger
+        self._heap = DeadlineHeap()
+        self._cond = threading.Condition(threading.Lock())
+        self._stale = True
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.fired = 0
+        self.superseded = 0
+        ledger.subscribe(self._on_event)
+
+    # Schedule ------------------------------------------------------------
+    def _on_event(self, entry: Optional[Dict]) -> None:
+        """Ledger listener: entry changed, or None when the ledger reloaded its state."""
+        with self._cond:
+            if entry is None:
+                self._stale = True
+                self._cond.notify()
+                return
+            deadline = entry_deadline(entry)
+            if deadline is None:
+                self._heap.cancel(entry["id"])
+                return
+            due = to_epoch(deadline)
+            earliest = self._heap.next_due()
+            self._heap.schedule(entry["id"], due, entry["version"])
+            if earliest is None or due < earliest:
+                self._cond.notify()
+
+    def _rebuild(self) -> None:
+        state = self.ledger.state()
+        items = []
+        for entry in state.values():
+            deadline = entry_deadline(entry)
+            if deadline is not None:
+                items.append((entry["id"], to_epoch(deadline), entry["version"]))
+        with self._cond:
+            self._heap.rebuild(items)
+            self._stale = False
+
+    # Firing --------------------------------------------------------------
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Apply every deadline that has passed. Returns how many escrows changed."""
+        self.ledger.refresh()
+        if self._stale:
+            self._rebuild()
+        with self._cond:
+            due = self._heap.pop_due(time.time() if now is None else now)
+        changed = 0
+        for escrow_id, version in due:
+            changed += self._fire(escrow_id, version)
+        return changed
+
+    def _fire(self, escrow_id: str, version) -> int:
+        entry = self.ledger.get(escrow_id)
+        if entry is None or entry["version"] != version or entry["status"] not in POLICY:
+            self.superseded += 1
+            return 0
+        _, status, action = POLICY[entry["status"]]
+        try:
+            entry, _ = self.ledger.transition(escrow_id, status, action, "system", expected_version=version)
+        except VersionConflict:
+            self.superseded += 1
+            return 0
+        self.fired += 1
+        notify(entry, action)
+        return 1
+
+    def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"⚠️ Escrow scheduler: {e}")
+            with self._cond:
+                if self._stopping or self._stale:
+                    continue
+                next_due = self._heap.next_due()
+                wait = POLL_SECONDS if next_due is None else min(POLL_SECONDS, next_due - time.time())
+                if wait > 0:
+                    self._cond.wait(wait)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="escrow-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            next_due = self._heap.next_due()
+            return {
+                "pending": len(self._heap),
+                "next_due": datetime.fromtimestamp(next_due, timezone.utc).isoformat() if next_due else None,
+                "fired": self.fired,
+                "superseded": self.superseded,
+            }
+
+
+def notify(entry: Dict, action: str) -> None:
+    """Tell buyer and seller about an automatic transition over the messaging event bus."""
+    from messaging.events import bus, user_topic
+
+    bus.publish(
+        [user_topic(entry["buyer_id"]), user_topic(entry["seller_id"])],
+        "escrow_deadline",
+        {"escrow_id": entry["id"], "product_id": entry.get("product_id"),
+         "action": action, "status": entry["status"]},
+    )
+
+
+_schedulers: Dict[str, EscrowScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler() -> EscrowScheduler:
+    """Scheduler bound to the shared ledger."""
+    ledger = get_ledger()
+    with _schedulers_lock:
+        if ledger.root not in _schedulers:
+            _schedulers[ledger.root] = EscrowScheduler(ledger)
+        return _schedulers[ledger.root]
+
+
+def start_scheduler() -> Optional[EscrowScheduler]:
+    """Start the deadline thread unless ESCROW_SCHEDULER=0."""
+    if not ENABLED:
+        return None
+    scheduler = get_scheduler()
+    scheduler.start()
+    return scheduler
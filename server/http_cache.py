@@ -0,0 +1,149 @@
+# server/http_cache.py
+"""
+Response cache and conditional GET for read-heavy JSON endpoints.
+
+A view decorated with @cached("products") has its 200 responses stored
+under (endpoint, path, sorted query arguments) together with the version
+tokens of the stores it reads. A later request is served from the cache
+while every token is unchanged; any write to one of those stores bumps its
+token (in this or another process), so stale entries are never served and
+need no explicit purge.
+
+Every cached response carries a strong ETag (a hash of the body) and
+Cache-Control: no-cache, so browsers and proxies revalidate and receive a
+304 with no body when the data has not changed.
+
+Names that are not storage collections are versioned with an in-process
+counter that can be advanced with invalidate(name).
+"""
+
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+from storage import COLLECTIONS, get_collection
+
+MAX_ENTRIES = int(os.environ.get("HTTP_CACHE_ENTRIES", "1024"))
+
+CACHE_CONTROL = "no-cache"
+
+_lock = threading.Lock()
+_entries = OrderedDict()    # key -> _Entry, least recently used first
+_counters = {}              # non-storage name -> version
+_stats = {}                 # endpoint -> {"hits", "misses", "not_modified"}
+
+
+class _Entry:
+    __slots__ = ("versions", "body", "etag", "mimetype")
+
+    def __init__(self, versions, body, etag, mimetype):
+        self.versions = versions
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+
+
+def invalidate(name):
+    """Advance the version of a non-storage source so entries that depend on it are refreshed."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + 1
+
+
+def _versions(stores):
+    versions = []
+    for name in stores:
+        if name in COLLECTIONS:
+            versions.append(get_collection(name).version_token())
+        else:
+            with _lock:
+                versions.append(_counters.get(name, 0))
+    return tuple(versions)
+
+
+def _count(endpoint, field):
+    with _lock:
+        counters = _stats.setdefault(endpoint, {"hits": 0, "misses": 0, "not_modified": 0})
+        counters[field] += 1
+
+
+def _respond(entry):
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, status=200, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+def cached(*stores):
+    """Cache a GET view's successful responses until one of stores changes."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            endpoint = request.endpoint
+            key = (endpoint, request.path, tuple(sorted(request.args.items(multi=True))))
+            # Read versions before building the response, so a write racing with
+            # the view leaves an entry that is already stale rather than one that
+            # looks current
+            versions = _versions(stores)
+
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None and entry.versions == versions:
+                    _entries.move_to_end(key)
+                else:
+                    entry = None
+            if entry is not None:
+                _count(endpoint, "hits")
+                if request.if_none_match.contains(entry.etag):
+                    _count(endpoint, "not_modified")
+                return _respond(entry)
+
+            _count(endpoint, "misses")
+            result = view(*args, **kwargs)
+            if isinstance(result, tuple):
+                response, status = result[0], result[1]
+            else:
+                response, status = result, getattr(result, "status_code", 200)
+            if not isinstance(response, Response) or status != 200:
+                return result
+
+            body = response.get_data()
+            entry = _Entry(versions, body, hashlib.sha1(body).hexdigest(), response.mimetype)
+            with _lock:
+                _entries[key] = entry
+                _entries.move_to_end(key)
+                while len(_entries) > MAX_ENTRIES:
+                    _entries.popitem(last=False)
+            if request.if_none_match.contains(entry.etag):
+                _count(endpoint, "not_modified")
+            return _respond(entry)
+
+        return wrapper
+
+    return decorator
+
+
+def stats():
+    """Per-endpoint hit, miss and 304 counts, with hit rates."""
+    with _lock:
+        endpoints = {}
+        for endpoint, counters in _stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            endpoints[endpoint] = {
+                **counters,
+                "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+        return {"entries": len(_entries), "max_entries": MAX_ENTRIES, "endpoints": endpoints}
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats.clear()
@@ -0,0 +1,16 @@
+"""
+Message storage and indexes: per-thread append-only message logs and the
+inbox index, so routes never load every thread and its message history,
+the message search index, and the event bus that pushes new messages to
+subscribed clients.
+"""
+
+from .events import EventBus, bus
+from .inbox import InboxIndex, get_inbox
+from .message_log import MessageLog, get_message_log
+from .search import MessageSearchIndex, get_search_index
+
+__all__ = [
+    "EventBus", "InboxIndex", "MessageLog", "MessageSearchIndex",
+    "bus", "get_inbox", "get_message_log", "get_search_index",
+]
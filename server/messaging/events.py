@@ -0,0 +1,169 @@
+# server/messaging/events.py
+"""
+In-process publish/subscribe for real-time messaging events.
+
+Routes publish to topics after a write succeeds:
+  thread:<thread_id>  every event of one thread
+  user:<user_id>      events of every thread the user takes part in
+
+A Subscription listens on a set of topics and buffers events until its
+reader takes them; publishing only touches the subscribers of the event's
+topics. The last REPLAY_EVENTS events are kept so a reconnecting client
+(SSE Last-Event-ID, or the long-poll since parameter) receives what it
+missed. Event ids start with a per-process epoch: an id from another
+process or a previous run, or one older than the replay buffer, makes the
+reader re-fetch state instead of silently missing events.
+
+Subscribers only see events published by this process, so a deployment
+with several worker processes needs sticky routing per user.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+REPLAY_EVENTS = 1000
+
+# Events buffered for one subscriber before it is told to resync instead
+MAX_QUEUED = 500
+
+
+def thread_topic(thread_id: str) -> str:
+    return f"thread:{thread_id}"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """Buffered events for one reader (an SSE stream or a long-poll request)."""
+
+    __slots__ = ("topics", "_events", "_cond", "lagged")
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = frozenset(topics)
+        self._events: deque = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self.lagged = False
+
+    def push(self, event: Dict) -> None:
+        with self._cond:
+            if len(self._events) >= MAX_QUEUED:
+                self.lagged = True
+                self._events.clear()
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> Tuple[List[Dict], bool]:
+        """(events, lagged) once any are queued or timeout passes. lagged means events were dropped."""
+        with self._cond:
+            if not self._events and not self.lagged:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            lagged, self.lagged = self.lagged, False
+            return events, lagged
+
+
+class EventBus:
+    def __init__(self, replay: int = REPLAY_EVENTS):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._recent: deque = deque(maxlen=replay)
+        self._next = 1
+        self.published = 0
+        self.delivered = 0
+
+    def _parse_id(self, event_id) -> Optional[int]:
+        epoch, _, number = str(event_id or "").partition("-")
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Dict) -> Dict:
+        topics = frozenset(topics)
+        with self._lock:
+            number = self._next
+            self._next += 1
+            event = {"id": f"{self.epoch}-{number}", "type": event_type, "data": data,
+                     "time": time.time(), "_n": number, "_topics": topics}
+            self._recent.append(event)
+            targets = set()
+            for topic in topics:
+                targets.update(self._topics.get(topic, ()))
+            self.published += 1
+            self.delivered += len(targets)
+        for subscription in targets:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def since(self, topics: Iterable[str], last_event_id) -> Tuple[List[Dict], bool]:
+        """
+        Events on topics published after last_event_id, and whether that is
+        all of them (False when the id is unknown or older than the replay
+        buffer, so the caller should resync).
+        """
+        topics = frozenset(topics)
+        number = self._parse_id(last_event_id)
+        with self._lock:
+            if number is None or number >= self._next:
+                return [], False
+            oldest = self._recent[0]["_n"] if self._recent else self._next
+            complete = number >= oldest - 1
+            events = [e for e in self._recent if e["_n"] > number and e["_topics"] & topics]
+        return events, complete
+
+    def last_event_id(self) -> str:
+        with self._lock:
+            return f"{self.epoch}-{self._next - 1}"
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscriptions = set()
+            for subscribers in self._topics.values():
+                subscriptions.update(subscribers)
+            return {
+                "subscribers": len(subscriptions),
+                "topics": len(self._topics),
+                "published": self.published,
+                "delivered": self.delivered,
+            }
+
+
+def public(event: Dict) -> Dict:
+    """Event as sent to clients."""
+    return {"id": event["id"], "type": event["type"], "data": event["data"]}
+
+
+bus = EventBus()
+
+
+def publish_thread_event(thread: Dict, event_type: str, data: Dict) -> Dict:
+    """Publish to the thread's topic and to each participant's user topic."""
+    from .inbox import participants
+
+    topics = [thread_topic(thread["thread_id"])] + [user_topic(user) for user in participants(thread)]
+    return bus.publish(topics, event_type, {"thread_id": thread["thread_id"], **data})
@@ -0,0 +1,261 @@
+# server/messaging/inbox.py
+"""
+Per-user inbox index over message threads.
+
+Each thread record carries a summary that send_message, mark_read and
+mark_sold update right after appending to the thread's message log:
+last_message, message_count, and per participant a read high-water mark,
+read_upto, the number of messages they have read. Sending a message
+counts as reading everything before it, so a participant's unread count is
+message_count - read_upto and marking a thread read is a single assignment.
+The index keeps, for every user, their threads' summaries sorted by last
+activity and their total unread count, so an inbox page is a slice of a
+sorted list and the unread badge is one lookup; neither reads message
+bodies.
+
+Like the product catalog, the index follows the thread collection's change
+notifications and reloads when another process has written to it.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from catalog.ordering import decode_text_cursor, encode_cursor
+from storage import get_collection
+from storage.base import DELETE, INSERT, RESET, UPDATE
+
+# Characters of the last message kept in a thread summary
+PREVIEW_CHARS = 200
+
+_ACTIVITY = "activity"
+
+
+def participants(thread) -> List[str]:
+    return [user for user in (thread.get("buyer_id"), thread.get("seller_id")) if user]
+
+
+def _preview(message) -> Dict:
+    preview = {key: message.get(key) for key in ("id", "sender_id", "timestamp")}
+    preview["content"] = str(message.get("content") or "")[:PREVIEW_CHARS]
+    if message.get("is_system"):
+        preview["is_system"] = True
+    return preview
+
+
+def _read_position(messages, user) -> int:
+    """Messages user has read: up to their last sent message or last one flagged read."""
+    position = 0
+    for i, message in enumerate(messages):
+        if message.get("sender_id") == user or message.get("read"):
+            position = i + 1
+    return position
+
+
+def summarize(messages, thread, read_upto=None) -> Dict:
+    """
+    Summary fields of thread computed from its full message history, taking
+    read positions from read flags and the read_upto mapping if given.
+    """
+    read_upto = read_upto or {}
+    return {
+        "last_message": _preview(messages[-1]) if messages else None,
+        "message_count": len(messages),
+        "read_upto": {
+            user: min(len(messages), max(_read_position(messages, user), read_upto.get(user, 0)))
+            for user in participants(thread)
+        },
+    }
+
+
+def _upgrade(thread) -> None:
+    """Replace a per-user unread map (older summaries) by read positions, in place."""
+    if "read_upto" in thread:
+        return
+    count = thread.get("message_count", 0)
+    unread = thread.pop("unread", None) or {}
+    thread["read_upto"] = {user: max(0, count - unread.get(user, 0)) for user in participants(thread)}
+
+
+def record_message(thread, message) -> None:
+    """
+    Update thread's summary for a newly sent message. message["seq"] is its
+    position in the log, so summaries stay right when concurrent sends are
+    applied out of order.
+    """
+    _upgrade(thread)
+    count = thread.get("message_count", 0)
+    seq = message.get("seq", count)
+    if seq + 1 >= count:
+        thread["last_message"] = _preview(message)
+    thread["message_count"] = max(count, seq + 1) if "seq" in message else count + 1
+    if message.get("sender_id") in participants(thread):
+        record_read(thread, message["sender_id"], seq + 1)
+
+
+def record_read(thread, user_id, upto) -> None:
+    """Raise user_id's read position on thread to upto messages."""
+    _upgrade(thread)
+    read_upto = thread["read_upto"]
+    read_upto[user_id] = max(read_upto.get(user_id, 0), upto)
+
+
+def unread_count(thread, user_id) -> int:
+    read = (thread.get("read_upto") or {}).get(user_id, 0)
+    return max(0, thread.get("message_count", 0) - read)
+
+
+def ensure_summary(thread) -> Dict:
+    """thread with summary fields, derived from its messages or unread map if they predate them."""
+    if "read_upto" in thread:
+        return thread
+    if "message_count" in thread:
+        upgraded = dict(thread)
+        _upgrade(upgraded)
+        return upgraded
+    return {**thread, **summarize(thread.get("messages") or [], thread)}
+
+
+def activity_key(thread) -> str:
+    last = thread.get("last_message")
+    return (last or {}).get("timestamp") or thread.get("created_at") or ""
+
+
+def summary_for(thread, user_id) -> Dict:
+    """Thread fields without message bodies or read positions, plus user_id's unread count."""
+    summary = {key: value for key, value in thread.items() if key not in ("messages", "read_upto")}
+    summary["unread_count"] = unread_count(thread, user_id)
+    return summary
+
+
+class InboxIndex:
+    """In-memory thread summaries sorted by last activity, and unread totals, for each participant."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.RLock()
+        self._threads: Dict[str, Dict] = {}
+        # user_id -> sorted [(activity, thread_id)]
+        self._by_user: Dict[str, List[Tuple[str, str]]] = {}
+        self._unread: Dict[str, int] = {}
+        self._token = None
+        self._loaded = False
+        self.reloads = 0
+        collection.subscribe(self._on_change)
+
+    # Loading -------------------------------------------------------------
+    def _reload(self) -> None:
+        records, token = self.collection.snapshot()
+        self._threads, self._by_user, self._unread = {}, {}, {}
+        for record in records:
+            self._add(record)
+        for entries in self._by_user.values():
+            entries.sort()
+        self._token = token
+        self._loaded = True
+        self.reloads += 1
+
+    def _ensure_fresh(self) -> None:
+        token = self.collection.version_token()
+        if not self._loaded or token != self._token:
+            self._reload()
+
+    # Index maintenance ---------------------------------------------------
+    def _add(self, record, keep_sorted=False) -> None:
+        thread_id = record.get("thread_id")
+        if thread_id is None:
+            return
+        summary = ensure_summary(record)
+        summary = {key: value for key, value in summary.items() if key != "messages"}
+        self._threads[thread_id] = summary
+        entry = (activity_key(summary), thread_id)
+        for user in set(participants(summary)):
+            entries = self._by_user.setdefault(user, [])
+            if keep_sorted:
+                insort(entries, entry)
+            else:
+                entries.append(entry)
+            self._unread[user] = self._unread.get(user, 0) + unread_count(summary, user)
+
+    def _remove(self, thread_id) -> None:
+        summary = self._threads.pop(thread_id, None)
+        if summary is None:
+            return
+        entry = (activity_key(summary), thread_id)
+        for user in set(participants(summary)):
+            entries = self._by_user.get(user, [])
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+            if not entries:
+                self._by_user.pop(user, None)
+            self._unread[user] = self._unread.get(user, 0) - unread_count(summary, user)
+            if not self._unread[user]:
+                del self._unread[user]
+
+    def _on_change(self, changes, before, after) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            if before != self._token:
+                self._loaded = False
+                return
+            for change in changes:
+                if change.op in (UPDATE, DELETE):
+                    self._remove(change.key)
+                if change.op in (INSERT, UPDATE):
+                    self._add(change.record, keep_sorted=True)
+                elif change.op == RESET:
+                    self._loaded = False
+                    return
+            self._token = after
+
+    # Reads ---------------------------------------------------------------
+    def page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None):
+        """
+        user_id's thread summaries, most recent activity first. Returns
+        (summaries, total, unread_total, next_cursor); raises ValueError for
+        a bad cursor.
+        """
+        after = decode_text_cursor(cursor, _ACTIVITY, True) if cursor else None
+        with self._lock:
+            self._ensure_fresh()
+            entries = self._by_user.get(user_id, [])
+            end = bisect_left(entries, after) if after is not None else len(entries)
+            start = max(0, end - limit)
+            window = entries[start:end][::-1]
+            summaries = [summary_for(self._threads[thread_id], user_id) for _, thread_id in window]
+            unread_total = self._unread.get(user_id, 0)
+            next_cursor = encode_cursor(_ACTIVITY, True, *window[-1]) if start > 0 and window else None
+            return summaries, len(entries), unread_total, next_cursor
+
+    def threads_of(self, user_id: str) -> List[Dict]:
+        """Summaries of all of user_id's threads (shared; do not modify)."""
+        with self._lock:
+            self._ensure_fresh()
+            return [self._threads[thread_id] for _, thread_id in self._by_user.get(user_id, [])]
+
+    def unread_total(self, user_id: str) -> int:
+        """Unread messages across all of user_id's threads."""
+        with self._lock:
+            self._ensure_fresh()
+            return self._unread.get(user_id, 0)
+
+
+_inbox: Optional[InboxIndex] = None
+_inbox_lock = threading.Lock()
+
+
+def get_inbox() -> InboxIndex:
+    """Shared inbox index bound to the current thread collection."""
+    global _inbox
+    collection = get_collection("message_threads")
+    inbox = _inbox
+    if inbox is None or inbox.collection is not collection:
+        with _inbox_lock:
+            if _inbox is None or _inbox.collection is not collection:
+                _inbox = InboxIndex(collection)
+            inbox = _inbox
+    return inbox
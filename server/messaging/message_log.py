@@ -0,0 +1,335 @@
+# server/messaging/message_log.py
+"""
+Append-only message log, one file per thread.
+
+Each line of a log is one record, "<crc32 hex> <json>\n":
+  {"t": "h", "thread_id": ...}        header, the first record of every log
+  {"t": "m", ...message}              a message; its sequence number is its position
+  {"t": "r", "user": ..., "upto": n}  user has read messages 0..n-1
+
+Sending a message or a read receipt is a single append, instead of a
+rewrite of the thread store. Readers keep an in-memory offset index per
+thread (byte offset of every message), so a history page is one seek and
+one read, and they extend it from the last indexed offset when the file
+has grown.
+
+Recovery: a record is only trusted when its line is complete and its
+checksum matches. A torn final line left by a crash is cut off before the
+next append; a damaged line elsewhere is skipped and dropped at the next
+compaction.
+
+Compaction rewrites a log with its messages and only the latest read
+receipt per user once superseded receipts and damaged lines make up a
+large share of it. It runs after the append that crosses the threshold,
+or for every log with `python -m messaging.message_log compact`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from storage import data_path
+from storage.locking import FileLock, atomic_write
+from storage.logfile import decode_record, encode_record
+
+LOG_DIR = "message_logs"
+
+# fsync every append; set MESSAGE_LOG_FSYNC=0 to trade durability for latency
+FSYNC = os.environ.get("MESSAGE_LOG_FSYNC", "1") != "0"
+
+# Compact once dead records are at least this many and this share of the live ones
+COMPACT_MIN_DEAD = 64
+COMPACT_DEAD_RATIO = 0.5
+
+# Thread indexes kept in memory
+MAX_CACHED_LOGS = 1024
+
+_LOCK_STRIPES = 64
+
+
+class _LogIndex:
+    __slots__ = ("offsets", "read_upto", "end", "inode", "dead")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, inode=None):
+        self.offsets: List[int] = []            # message seq -> byte offset
+        self.read_upto: Dict[str, int] = {}
+        self.end = 0                            # bytes covered by complete records
+        self.inode = inode
+        self.dead = 0                           # superseded receipts and damaged lines
+
+
+class MessageLog:
+    """Per-thread append-only logs under root with cached offset indexes."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or data_path(LOG_DIR)
+        self._indexes: "OrderedDict[str, _LogIndex]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stripes = [threading.RLock() for _ in range(_LOCK_STRIPES)]
+        self.compactions = 0
+
+    def path(self, thread_id: str) -> str:
+        digest = hashlib.sha1(thread_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.log")
+
+    def _stripe(self, thread_id):
+        return self._stripes[zlib.crc32(thread_id.encode("utf-8")) % _LOCK_STRIPES]
+
+    # Offset index --------------------------------------------------------
+    def _cached(self, thread_id) -> _LogIndex:
+        with self._cache_lock:
+            index = self._indexes.get(thread_id)
+            if index is None:
+                index = self._indexes[thread_id] = _LogIndex()
+                while len(self._indexes) > MAX_CACHED_LOGS:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(thread_id)
+            return index
+
+    def _refresh(self, thread_id, handle=None) -> _LogIndex:
+        """Index of thread_id's log, rescanned or extended to match the file on disk."""
+        with self._stripe(thread_id):
+            index = self._cached(thread_id)
+            if handle is not None:
+                self._sync(index, handle)
+                return index
+            try:
+                with open(self.path(thread_id), "rb") as handle:
+                    self._sync(index, handle)
+            except FileNotFoundError:
+                index.reset()
+            return index
+
+    def _sync(self, index: _LogIndex, handle) -> None:
+        st = os.fstat(handle.fileno())
+        if st.st_ino != index.inode or st.st_size < index.end:
+            # New file, or replaced by a compaction
+            index.reset(st.st_ino)
+        if st.st_size > index.end:
+            self._scan(handle, index)
+
+    @staticmethod
+    def _scan(handle, index: _LogIndex) -> None:
+        handle.seek(index.end)
+        offset = index.end
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break                       # torn final line, cut off on the next append
+            record = decode_record(line)
+            if record is None:
+                index.dead += 1
+            elif record.get("t") == "m":
+                index.offsets.append(offset)
+            elif record.get("t") == "r":
+                user, upto = record.get("user"), record.get("upto", 0)
+                if user in index.read_upto:
+                    index.dead += 1
+                index.read_upto[user] = max(index.read_upto.get(user, 0), upto)
+            offset += len(line)
+            index.end = offset
+
+    # Writes --------------------------------------------------------------
+    def _append(self, thread_id, build) -> _LogIndex:
+        """Append the records build(index) returns for the current index, if any."""
+        path = self.path(thread_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._stripe(thread_id), FileLock(path).exclusive():
+            with open(path, "ab+") as handle:
+                index = self._refresh(thread_id, handle)
+                records = build(index)
+                if not records:
+                    return index
+                if os.fstat(handle.fileno()).st_size > index.end:
+                    handle.truncate(index.end)
+                if index.end == 0:
+                    records = [{"t": "h", "thread_id": thread_id}] + records
+                data = b"".join(encode_record(record) for record in records)
+                handle.write(data)
+                handle.flush()
+                if FSYNC:
+                    os.fsync(handle.fileno())
+                self._scan(handle, index)
+            live = len(index.offsets) + len(index.read_upto)
+            if index.dead >= COMPACT_MIN_DEAD and index.dead >= COMPACT_DEAD_RATIO * live:
+                self._compact_locked(thread_id)
+                index = self._refresh(thread_id)
+        return index
+
+    def append(self, thread_id: str, message: Dict) -> int:
+        """
+        Append message to thread_id's log; returns its sequence number. The
+        sender has read everything before their own message, so a read
+        receipt goes with it when they had not.
+        """
+        seq = None
+
+        def build(index):
+            nonlocal seq
+            seq = len(index.offsets)
+            records = [{"t": "m", **message}]
+            sender = message.get("sender_id")
+            if sender and not message.get("is_system") and index.read_upto.get(sender, 0) < seq:
+                records.append({"t": "r", "user": sender, "upto": seq + 1})
+            return records
+
+        self._append(thread_id, build)
+        return seq
+
+    def mark_read(self, thread_id: str, user_id: str, upto: Optional[int] = None) -> int:
+        """
+        Record that user_id has read the first upto messages (default: all
+        appended so far). Returns their read position afterwards.
+        """
+        index = self._refresh(thread_id)
+        if not index.offsets or (upto is None and index.read_upto.get(user_id, 0) >= len(index.offsets)):
+            return index.read_upto.get(user_id, 0)
+        position = None
+
+        def build(index):
+            nonlocal position
+            target = len(index.offsets) if upto is None else min(upto, len(index.offsets))
+            position = max(index.read_upto.get(user_id, 0), target)
+            if index.read_upto.get(user_id, 0) >= target:
+                return []
+            return [{"t": "r", "user": user_id, "upto": target}]
+
+        self._append(thread_id, build)
+        return position
+
+    def import_messages(self, thread_id: str, messages: List[Dict], read_upto: Dict[str, int]) -> bool:
+        """Write a thread's existing history to an empty log. Returns False if it already had one."""
+        path = self.path(thread_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._stripe(thread_id), FileLock(path).exclusive():
+            if self._refresh(thread_id).end:
+                return False
+            records = [{"t": "h", "thread_id": thread_id}]
+            records += [{"t": "m", **message} for message in messages]
+            records += [{"t": "r", "user": user, "upto": upto} for user, upto in read_upto.items() if upto]
+            atomic_write(path, lambda f: f.write(b"".join(encode_record(r) for r in records)), mode="wb")
+        return True
+
+    # Compaction ----------------------------------------------------------
+    def _compact_locked(self, thread_id) -> None:
+        path = self.path(thread_id)
+        index = self._refresh(thread_id)
+        messages = self._read_range(thread_id, 0, len(index.offsets))
+        records = [{"t": "h", "thread_id": thread_id}]
+        records += [{"t": "m", **{k: v for k, v in message.items() if k != "seq"}} for message in messages]
+        records += [{"t": "r", "user": user, "upto": upto} for user, upto in index.read_upto.items()]
+        atomic_write(path, lambda f: f.write(b"".join(encode_record(r) for r in records)), mode="wb")
+        self.compactions += 1
+
+    def compact(self, thread_id: str) -> None:
+        path = self.path(thread_id)
+        if not os.path.exists(path):
+            return
+        with self._stripe(thread_id), FileLock(path).exclusive():
+            self._compact_locked(thread_id)
+        self._refresh(thread_id)
+
+    def compact_all(self) -> int:
+        """Compact every log with dead records. Returns how many were rewritten."""
+        rewritten = 0
+        for thread_id in self._thread_ids():
+            index = self._refresh(thread_id)
+            if index.dead or (os.path.getsize(self.path(thread_id)) > index.end):
+                self.compact(thread_id)
+                rewritten += 1
+        return rewritten
+
+    def _thread_ids(self):
+        """Thread ids found in the logs themselves (file names are hashes)."""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".log"):
+                    continue
+                with open(os.path.join(directory, name), "rb") as handle:
+                    for line in handle:
+                        record = decode_record(line)
+                        if record and record.get("t") == "h":
+                            yield record["thread_id"]
+                        break
+
+    # Reads ---------------------------------------------------------------
+    def _read_range(self, thread_id, start: int, stop: int) -> List[Dict]:
+        """Messages start..stop-1, each with its seq."""
+        if start >= stop:
+            return []
+        path = self.path(thread_id)
+        with open(path, "rb") as handle:
+            index = self._refresh(thread_id, handle)
+            stop = min(stop, len(index.offsets))
+            if start >= stop:
+                return []
+            first = index.offsets[start]
+            last = index.offsets[stop] if stop < len(index.offsets) else index.end
+            handle.seek(first)
+            chunk = handle.read(last - first)
+        messages = []
+        seq = start
+        for line in chunk.splitlines(keepends=True):
+            record = decode_record(line)
+            if record is None or record.get("t") != "m":
+                continue
+            record.pop("t")
+            record["seq"] = seq
+            messages.append(record)
+            seq += 1
+        return messages
+
+    def count(self, thread_id: str) -> int:
+        return len(self._refresh(thread_id).offsets)
+
+    def read_upto(self, thread_id: str) -> Dict[str, int]:
+        return dict(self._refresh(thread_id).read_upto)
+
+    def history(self, thread_id: str, participants: List[str], before: Optional[int] = None,
+                limit: int = 50) -> Tuple[List[Dict], int, Optional[int]]:
+        """
+        Up to limit messages older than sequence number before (default: the
+        newest), oldest first. Each message gets seq and a read flag, true
+        once every other participant has read it. Returns (messages, total,
+        before value for the next older page or None).
+        """
+        index = self._refresh(thread_id)
+        total = len(index.offsets)
+        stop = total if before is None else max(0, min(before, total))
+        start = max(0, stop - limit)
+        messages = self._read_range(thread_id, start, stop)
+        read_upto = index.read_upto
+        for message in messages:
+            readers = [user for user in participants if user != message.get("sender_id")]
+            message["read"] = bool(readers) and all(read_upto.get(user, 0) > message["seq"] for user in readers)
+        return messages, total, (start if start > 0 else None)
+
+
+_logs: Dict[str, MessageLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_message_log() -> MessageLog:
+    """Shared message log for the configured data directory."""
+    root = data_path(LOG_DIR)
+    with _logs_lock:
+        if root not in _logs:
+            _logs[root] = MessageLog(root)
+        return _logs[root]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["compact"]:
+        sys.exit("usage: python -m messaging.message_log compact")
+    log = get_message_log()
+    print(f"Compacted {log.compact_all()} message logs in {log.root}")
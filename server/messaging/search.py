@@ -0,0 +1,218 @@
+# server/messaging/search.py
+"""
+Full-text search over the messages of a user's conversations.
+
+A positional inverted index maps each term to the messages containing it
+and the term's positions in each, with separate postings per participant,
+so a search only touches the postings of its own terms for that user and
+its cost follows the number of matches, not the message volume. Each
+user's vocabulary is kept sorted for prefix queries.
+
+Queries are words that must all appear, "quoted phrases" whose words must
+appear consecutively, and prefixes written with a trailing * (also as the
+last word of a phrase):  bike "pick up" tomorr*
+
+Threads are indexed from their message logs the first time one of their
+participants searches, and new messages are added as they are sent. A
+search first catches up any of the user's threads whose message count in
+the inbox index is ahead of the search index, which also picks up
+messages written by other processes.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from catalog.ordering import decode_text_cursor, encode_cursor
+
+from .inbox import get_inbox, participants
+from .message_log import MessageLog, get_message_log
+
+_TOKEN = re.compile(r"\w+")
+_CLAUSE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Shortest prefix accepted, and most vocabulary terms one prefix may expand to
+MIN_PREFIX_CHARS = 2
+MAX_PREFIX_TERMS = 200
+
+MAX_QUERY_CLAUSES = 10
+
+_ORDER = "timestamp"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text or "").lower())
+
+
+def parse_query(query: str) -> List[Tuple[List[str], bool]]:
+    """
+    Clauses of query as (terms, last term is a prefix). Raises ValueError
+    for a query without terms.
+    """
+    clauses = []
+    for phrase, word in _CLAUSE.findall(query or ""):
+        text = phrase or word
+        prefix = text.rstrip().endswith("*")
+        terms = tokenize(text)
+        if not terms:
+            continue
+        if prefix and len(terms[-1]) < MIN_PREFIX_CHARS:
+            raise ValueError(f"Prefixes need at least {MIN_PREFIX_CHARS} characters")
+        clauses.append((terms, prefix))
+    if not clauses:
+        raise ValueError("Search query has no words")
+    if len(clauses) > MAX_QUERY_CLAUSES:
+        raise ValueError(f"At most {MAX_QUERY_CLAUSES} words or phrases per query")
+    return clauses
+
+
+class MessageSearchIndex:
+    """Positional inverted index of message content with postings per participant."""
+
+    def __init__(self, log: MessageLog):
+        self.log = log
+        self._lock = threading.RLock()
+        # doc -> (timestamp, thread_id, seq)
+        self._docs: List[Tuple[str, str, int]] = []
+        # thread_id -> messages indexed so far
+        self._indexed: Dict[str, int] = {}
+        # user -> term -> {doc: positions}
+        self._postings: Dict[str, Dict[str, Dict[int, Tuple[int, ...]]]] = {}
+        # user -> sorted terms
+        self._vocab: Dict[str, List[str]] = {}
+
+    # Indexing ------------------------------------------------------------
+    def _add(self, thread_id, users, message) -> None:
+        doc = len(self._docs)
+        self._docs.append((message.get("timestamp") or "", thread_id, message["seq"]))
+        positions: Dict[str, List[int]] = {}
+        for position, term in enumerate(tokenize(message.get("content"))):
+            positions.setdefault(term, []).append(position)
+        for term, found in positions.items():
+            found = tuple(found)
+            for user in users:
+                postings = self._postings.setdefault(user, {})
+                if term not in postings:
+                    postings[term] = {}
+                    vocab = self._vocab.setdefault(user, [])
+                    vocab.insert(bisect_left(vocab, term), term)
+                postings[term][doc] = found
+        self._indexed[thread_id] = message["seq"] + 1
+
+    def _catch_up(self, thread_id, users, count) -> None:
+        """Index thread_id's messages from the last indexed one up to count."""
+        start = self._indexed.get(thread_id, 0)
+        if count <= start:
+            return
+        messages, _, _ = self.log.history(thread_id, users, before=count, limit=count - start)
+        for message in messages:
+            if message["seq"] >= self._indexed.get(thread_id, 0):
+                self._add(thread_id, users, message)
+
+    def index_message(self, thread, message) -> None:
+        """Add a newly sent message (with its seq) if thread is already indexed."""
+        thread_id = thread["thread_id"]
+        with self._lock:
+            if thread_id not in self._indexed:
+                return                      # indexed from its log on the next search
+            users = participants(thread)
+            self._catch_up(thread_id, users, message["seq"])
+            if self._indexed[thread_id] == message["seq"]:
+                self._add(thread_id, users, message)
+
+    # Queries -------------------------------------------------------------
+    def _term_postings(self, user_id, term, prefix) -> Dict[int, Tuple[int, ...]]:
+        postings = self._postings.get(user_id, {})
+        if not prefix:
+            return postings.get(term, {})
+        vocab = self._vocab.get(user_id, [])
+        merged: Dict[int, Tuple[int, ...]] = {}
+        start = bisect_left(vocab, term)
+        for expanded in vocab[start:start + MAX_PREFIX_TERMS]:
+            if not expanded.startswith(term):
+                break
+            for doc, positions in postings[expanded].items():
+                merged[doc] = tuple(sorted(merged.get(doc, ()) + positions))
+        return merged
+
+    def _clause_docs(self, user_id, terms, prefix, candidates=None) -> set:
+        lists = [self._term_postings(user_id, term, prefix and i == len(terms) - 1)
+                 for i, term in enumerate(terms)]
+        docs = set(min(lists, key=len)) if candidates is None else set(candidates)
+        for postings in lists:
+            docs.intersection_update(postings)
+        if len(terms) == 1:
+            return docs
+        phrase_docs = set()
+        for doc in docs:
+            following = [set(postings[doc]) for postings in lists[1:]]
+            if any(all(start + i + 1 in positions for i, positions in enumerate(following))
+                   for start in lists[0][doc]):
+                phrase_docs.add(doc)
+        return phrase_docs
+
+    def search(self, user_id: str, query: str, thread_id: Optional[str] = None,
+               limit: int = 20, cursor: Optional[str] = None):
+        """
+        user_id's messages matching query, newest first, optionally within
+        one thread. Returns (hits, total, next_cursor) where each hit has
+        thread_id and seq; raises ValueError for a bad query or cursor.
+        """
+        clauses = parse_query(query)
+        after = decode_text_cursor(cursor, _ORDER, True) if cursor else None
+        threads = get_inbox().threads_of(user_id)
+        if thread_id is not None:
+            threads = [thread for thread in threads if thread["thread_id"] == thread_id]
+
+        with self._lock:
+            for thread in threads:
+                self._catch_up(thread["thread_id"], participants(thread), thread.get("message_count", 0))
+
+            # Most selective clause first, so later ones only check its matches
+            sized = sorted(clauses, key=lambda clause: min(
+                len(self._term_postings(user_id, term, clause[1] and i == len(clause[0]) - 1))
+                for i, term in enumerate(clause[0])))
+            docs = None
+            for terms, prefix in sized:
+                docs = self._clause_docs(user_id, terms, prefix, docs)
+                if not docs:
+                    break
+            entries = sorted(
+                ((self._docs[doc][0], f"{self._docs[doc][1]}#{self._docs[doc][2]:010d}"), doc)
+                for doc in docs or ()
+                if thread_id is None or self._docs[doc][1] == thread_id
+            )
+
+        entries.reverse()
+        total = len(entries)
+        if after is not None:
+            entries = [entry for entry in entries if entry[0] < tuple(after)]
+        window = entries[:limit]
+        hits = [{"thread_id": self._docs[doc][1], "seq": self._docs[doc][2]} for _, doc in window]
+        next_cursor = encode_cursor(_ORDER, True, *window[-1][0]) if len(entries) > limit else None
+        return hits, total, next_cursor
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "messages": len(self._docs),
+                "threads": len(self._indexed),
+                "users": len(self._postings),
+                "terms": sum(len(vocab) for vocab in self._vocab.values()),
+            }
+
+
+_indexes: Dict[str, MessageSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index() -> MessageSearchIndex:
+    """Shared search index over the configured message logs."""
+    log = get_message_log()
+    with _indexes_lock:
+        if _indexes.get(log.root) is None:
+            _indexes[log.root] = MessageSearchIndex(log)
+        return _indexes[log.root]
@@ -0,0 +1,147 @@
+# server/ml_services/image_search/embedding_store.py
+"""
+Persistent store of listing image embeddings.
+
+EnhancedImageSearch computes a normalized ResNet50 vector for every live
+listing image it looks at; this store keeps those vectors (keyed by
+product id and tagged with the image URL they came from) so they can be
+reused for search and recommendations without another CNN pass.
+
+Only numpy is needed here, so request handlers can read embeddings
+without importing TensorFlow.
+"""
+
+import atexit
+import os
+import threading
+
+import numpy as np
+
+from storage import data_path
+from storage.locking import atomic_write
+
+EMBEDDINGS_FILE = "listing_embeddings.npz"
+
+
+class EmbeddingStore:
+    """product_id -> unit-length float32 vector, grouped by category for batched scoring."""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(EMBEDDINGS_FILE)
+        self._lock = threading.Lock()
+        self._vectors = {}        # product_id -> np.ndarray
+        self._meta = {}           # product_id -> (category, image_url)
+        self._by_category = {}    # lowercased category -> (ids, matrix), built on demand
+        self._dirty = False
+        self._load()
+        atexit.register(self.save_if_dirty)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                ids, categories, urls = data['ids'], data['categories'], data['image_urls']
+                vectors = data['vectors'].astype(np.float32)
+            for i, product_id in enumerate(ids):
+                self._vectors[str(product_id)] = vectors[i]
+                self._meta[str(product_id)] = (str(categories[i]), str(urls[i]))
+        except (OSError, ValueError, KeyError):
+            self._vectors, self._meta = {}, {}
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def ids(self):
+        with self._lock:
+            return list(self._vectors)
+
+    def get(self, product_id, image_url=None):
+        """Stored vector, or None if missing or computed from a different image."""
+        with self._lock:
+            vector = self._vectors.get(product_id)
+            if vector is None:
+                return None
+            if image_url is not None and self._meta[product_id][1] != image_url:
+                return None
+            return vector
+
+    def put(self, product_id, vector, category='', image_url=''):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        with self._lock:
+            previous = self._meta.get(product_id)
+            self._vectors[product_id] = vector
+            self._meta[product_id] = ((category or '').lower(), image_url or '')
+            self._by_category.pop((category or '').lower(), None)
+            if previous is not None:
+                self._by_category.pop(previous[0], None)
+            self._dirty = True
+
+    def remove(self, product_id):
+        with self._lock:
+            meta = self._meta.pop(product_id, None)
+            if meta is None:
+                return
+            del self._vectors[product_id]
+            self._by_category.pop(meta[0], None)
+            self._dirty = True
+
+    def category_matrix(self, category):
+        """(ids, matrix) of every vector stored under category; rows are unit length."""
+        key = (category or '').lower()
+        with self._lock:
+            cached = self._by_category.get(key)
+            if cached is None:
+                ids = [pid for pid, meta in self._meta.items() if meta[0] == key]
+                matrix = np.vstack([self._vectors[pid] for pid in ids]) if ids else np.empty((0, 0), np.float32)
+                cached = self._by_category[key] = (ids, matrix)
+            return cached
+
+    def save(self):
+        with self._lock:
+            ids = list(self._vectors)
+            if not ids:
+                # np.vstack needs at least one row; an empty store is no file
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                self._dirty = False
+                return
+            payload = {
+                'ids': np.array(ids),
+                'categories': np.array([self._meta[pid][0] for pid in ids]),
+                'image_urls': np.array([self._meta[pid][1] for pid in ids]),
+                'vectors': np.vstack([self._vectors[pid] for pid in ids]),
+            }
+            atomic_write(self.path, lambda f: np.savez(f, **payload), mode='wb')
+            self._dirty = False
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """Shared store for the configured data directory."""
+    path = data_path(EMBEDDINGS_FILE)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EmbeddingStore(path)
+        return _stores[path]
+
+
+def cosine_top_k(query, matrix, k):
+    """Indices and similarities of the k rows of matrix closest to query, best first."""
+    if matrix.size == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    similarities = matrix @ np.asarray(query, dtype=np.float32)
+    k = min(k, similarities.shape[0])
+    top = np.argpartition(-similarities, k - 1)[:k]
+    top = top[np.argsort(-similarities[top], kind='stable')]
+    return top, similarities[top]
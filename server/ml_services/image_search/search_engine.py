@@ -7,7 +7,6 @@ Extracts features from images and finds best visual matches.
 import os
 import numpy as np
 import pickle
-import json
 import pandas as pd
 import joblib
 from pathlib import Path
@@ -16,6 +15,8 @@ from tensorflow.keras.applications.resnet50 import preprocess_input
 from tensorflow.keras.preprocessing import image
 from sklearn.metrics.pairwise import cosine_similarity
 
+from ml_services.image_search.embedding_store import get_embedding_store
+
 
 BASE_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = BASE_DIR.parents[2]
@@ -264,6 +265,7 @@ class EnhancedImageSearch:
         """Searches inside the actual uploaded product listings."""
         try:
             products = self.load_products()
+            embeddings = get_embedding_store()
             if query_features is None:
                 query_features = self.extract_features(query_img_path)
             if query_features is None:
@@ -287,9 +289,13 @@ class EnhancedImageSearch:
                 if not os.path.exists(img_path):
                     continue
 
-                product_features = self.extract_features(img_path)
+                # Reuse the stored embedding unless the listing image changed
+                product_features = embeddings.get(product['id'], url)
                 if product_features is None:
-                    continue
+                    product_features = self.extract_features(img_path)
+                    if product_features is None:
+                        continue
+                    embeddings.put(product['id'], product_features, product.get('category', ''), url)
 
                 sim = cosine_similarity(
                     query_features.reshape(1, -1),
@@ -310,6 +316,8 @@ class EnhancedImageSearch:
                         'match_quality': self.get_quality_label(sim)
                     })
 
+            embeddings.save_if_dirty()
+
             results.sort(key=lambda x: x['similarity_score'], reverse=True)
             if return_raw:
                 return results[:top_k]
@@ -361,12 +369,9 @@ class EnhancedImageSearch:
         }
 
     def load_products(self):
-        """Loads product data."""
-        path = os.path.join(os.path.dirname(__file__), '../../products.json')
-        if os.path.exists(path):
-            with open(path, 'r') as f:
-                return json.load(f)
-        return []
+        """Loads product data from the shared in-memory catalog."""
+        from catalog import get_catalog
+        return get_catalog().all()
 
 
 # Engine initializer used by Flask route
@@ -4,17 +4,48 @@ Price prediction module using trained ML model.
 Encodes product attributes, processes features and returns estimated resale value.
 """
 
+import hashlib
 import joblib
 import numpy as np
 import os
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+MODEL_FILES = ('model.pkl', 'scaler.pkl', 'label_encoders.pkl')
+
 # Load trained model, scaler and encoders
 model = joblib.load(os.path.join(CURRENT_DIR, 'model.pkl'))
 scaler = joblib.load(os.path.join(CURRENT_DIR, 'scaler.pkl'))
 label_encoders = joblib.load(os.path.join(CURRENT_DIR, 'label_encoders.pkl'))
 
+# Label -> code lookups so batches avoid one LabelEncoder call per row
+encoder_lookups = {
+    name: {label: code for code, label in enumerate(encoder.classes_)}
+    for name, encoder in label_encoders.items()
+}
+
+CONDITION_ADJUSTMENTS = {
+    'excellent': 0.12,
+    'good': 0.05,
+    'fair': -0.12,
+    'poor': -0.28,
+}
+
+_model_version = None
+
+
+def model_version():
+    """Short content hash of the model artifacts, used to detect model bumps."""
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.sha1()
+        for name in MODEL_FILES:
+            with open(os.path.join(CURRENT_DIR, name), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        _model_version = digest.hexdigest()[:12]
+    return _model_version
+
 
 def predict_price(product_data):
     """
@@ -72,12 +103,7 @@ def predict_price(product_data):
         base_price = max(0, base_price)
 
         # Business-rule adjustments for more realistic behaviour
-        condition_adjustments = {
-            'excellent': 0.12,
-            'good': 0.05,
-            'fair': -0.12,
-            'poor': -0.28,
-        }
+        condition_adjustments = CONDITION_ADJUSTMENTS
         condition_key = condition_raw.strip().lower()
         total_delta = 0.0
         explanations = []
@@ -128,3 +154,103 @@ def predict_price(product_data):
 
     except Exception as e:
         return {'error': str(e)}
+
+
+def predict_prices(rows):
+    """
+    Vectorized variant of predict_price for many products at once.
+    Returns one result per row; rows that cannot be encoded get an 'error' entry.
+    """
+
+    n = len(rows)
+    if n == 0:
+        return []
+
+    results = [None] * n
+    codes = {}
+    valid = np.ones(n, dtype=bool)
+    for field in ('category', 'brand', 'condition', 'location'):
+        lookup = encoder_lookups[field]
+        column = np.empty(n, dtype=np.float64)
+        for i, row in enumerate(rows):
+            code = lookup.get(row.get(field))
+            if code is None:
+                valid[i] = False
+                if results[i] is None:
+                    results[i] = {'error': f"Unknown {field}: {row.get(field)!r}"}
+                code = 0
+            column[i] = code
+        codes[field] = column
+
+    numeric = np.zeros((n, 5), dtype=np.float64)
+    for i, row in enumerate(rows):
+        try:
+            numeric[i] = (
+                float(row['original_price']),
+                float(row['age_years']),
+                int(row.get('has_warranty', False)),
+                int(row.get('has_box', False)),
+                float(row.get('usage_hours', 0)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            valid[i] = False
+            if results[i] is None:
+                results[i] = {'error': str(e)}
+
+    original_price, age_years, has_warranty, has_box, usage_hours = numeric.T
+    valid &= original_price > 0
+
+    # Derived features (same formulas as predict_price)
+    estimated_resale = original_price * (1 - age_years * 0.15)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        depreciation_rate = np.where(
+            original_price > 0, (original_price - estimated_resale) / original_price, 0.0
+        )
+    age_category = np.select([age_years <= 1, age_years <= 2, age_years <= 3], [0, 1, 2], 3)
+    usage_intensity = usage_hours / (age_years * 365 + 1)
+
+    features = np.column_stack([
+        codes['category'],
+        codes['brand'],
+        original_price,
+        age_years,
+        codes['condition'],
+        codes['location'],
+        has_warranty,
+        has_box,
+        depreciation_rate,
+        age_category,
+        usage_intensity,
+    ])
+
+    idx = np.flatnonzero(valid)
+    if len(idx) == 0:
+        return [r or {'error': 'Invalid original_price'} for r in results]
+
+    base_price = np.maximum(0, model.predict(scaler.transform(features[idx])))
+
+    condition_delta = np.array([
+        CONDITION_ADJUSTMENTS.get(str(rows[i]['condition']).strip().lower(), 0.0) for i in idx
+    ])
+    age = age_years[idx]
+    total_delta = (
+        condition_delta
+        + 0.07 * (has_warranty[idx] > 0)
+        + 0.03 * (has_box[idx] > 0)
+        + np.select([age <= 1, age > 3], [0.05, -0.08], 0.0)
+        - 0.06 * (usage_hours[idx] > (age + 0.2) * 400)
+    )
+    adjusted = np.maximum(0, base_price * (1 + total_delta))
+    margin = adjusted * 0.10
+
+    for j, i in enumerate(idx):
+        results[i] = {
+            'predicted_price': round(float(adjusted[j]), 2),
+            'price_range': {
+                'min': round(float(max(0, adjusted[j] - margin[j])), 2),
+                'max': round(float(adjusted[j] + margin[j]), 2)
+            },
+            'base_prediction': round(float(base_price[j]), 2)
+        }
+
+    return [r or {'error': 'Invalid original_price'} for r in results]
@@ -0,0 +1,280 @@
+# server/ml_services/price_predictor/repricing.py
+"""
+Catalog-wide re-pricing job.
+Sweeps the product store in batches through the vectorized predictor and stores a
+suggested price and deviation on each listing. Progress is checkpointed so an
+interrupted run resumes where it stopped.
+
+Run from the server directory:
+    python -m ml_services.price_predictor.repricing [--force] [--batch-size N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from ml_services.price_predictor import predictor
+
+STATE_FILE = "repricing_state.json"
+DEFAULT_BATCH_SIZE = 1000
+
+# Listing categories/keywords -> categories known to the price model
+CATEGORY_KEYWORDS = {
+    "Laptop": ("laptop", "computer", "notebook", "macbook", "desktop"),
+    "Mobile": ("mobile", "phone", "smartphone", "galaxy", "iphone", "tablet"),
+    "Furniture": ("furniture", "sofa", "chair", "table", "bed", "decor"),
+    "Bike": ("bike", "motorcycle", "scooter", "cycle", "sports", "automotive"),
+    "Camera": ("camera", "dslr", "drone", "lens"),
+}
+
+# Fallback brand per model category when the listing brand is unknown to the encoder
+DEFAULT_BRANDS = {
+    "Laptop": "Dell",
+    "Mobile": "Samsung",
+    "Furniture": "Generic",
+    "Bike": "Hero",
+    "Camera": "Canon",
+}
+
+DEFAULT_LOCATION = "Delhi"
+
+# Fields that influence the suggested price; a change to any of them re-prices the listing
+PRICING_FIELDS = (
+    "title", "category", "brand", "condition", "year", "price",
+    "original_price", "location", "has_warranty", "has_box", "usage_hours",
+)
+
+_job_lock = threading.Lock()
+_job_thread = None
+
+
+# ------------------------ FEATURE MAPPING ------------------------
+
+def pricing_fingerprint(listing):
+    """Hash of the listing fields the price suggestion depends on."""
+    payload = json.dumps({f: listing.get(f) for f in PRICING_FIELDS}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_model_category(listing):
+    """Map a free-form listing category/title onto a category the model was trained on."""
+    text = f"{listing.get('category', '')} {listing.get('title', '')}".lower()
+    for model_category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return model_category
+    return None
+
+
+def listing_to_features(listing):
+    """
+    Build a predictor input row from a stored listing, or None if it cannot be
+    priced. Raises ValueError or TypeError for malformed numeric fields.
+    """
+    category = resolve_model_category(listing)
+    if category is None:
+        return None
+
+    brand = str(listing.get("brand") or "").strip()
+    known_brands = predictor.encoder_lookups["brand"]
+    match = next((b for b in known_brands if b.lower() == brand.lower()), None)
+
+    year = int(listing.get("year") or datetime.now().year)
+    age_years = max(0, datetime.now().year - year)
+
+    return {
+        "category": category,
+        "brand": match or DEFAULT_BRANDS[category],
+        "condition": str(listing.get("condition") or "good").strip().capitalize(),
+        "location": listing.get("location") or DEFAULT_LOCATION,
+        "original_price": float(listing.get("original_price") or listing.get("price") or 0),
+        "age_years": age_years,
+        "has_warranty": bool(listing.get("has_warranty", False)),
+        "has_box": bool(listing.get("has_box", False)),
+        "usage_hours": float(listing.get("usage_hours", 0) or 0),
+    }
+
+
+def needs_repricing(listing, version, force=False):
+    """True if the listing has no suggestion for this model version or its inputs changed."""
+    if force:
+        return True
+    return (
+        listing.get("pricing_model_version") != version
+        or listing.get("pricing_fingerprint") != pricing_fingerprint(listing)
+    )
+
+
+def price_batch(listings, version):
+    """Return {listing_id: pricing fields} for a batch of listings."""
+    rows, owners, updates = [], [], {}
+    for listing in listings:
+        fields = {
+            "pricing_model_version": version,
+            "pricing_fingerprint": pricing_fingerprint(listing),
+            "priced_at": datetime.now().isoformat(),
+        }
+        # One malformed listing must not fail its batch, or a resumed job would retry it forever
+        try:
+            features = listing_to_features(listing)
+            price = float(listing.get("price", 0) or 0)
+        except (TypeError, ValueError) as e:
+            updates[listing["id"]] = {**fields, "suggested_price": None, "price_deviation": None,
+                                      "pricing_error": f"Invalid listing data: {e}"}
+            continue
+        if features is None:
+            updates[listing["id"]] = {**fields, "suggested_price": None, "price_deviation": None,
+                                      "pricing_error": "Unsupported category"}
+            continue
+        updates[listing["id"]] = fields
+        rows.append(features)
+        owners.append((listing, price))
+
+    for (listing, price), result in zip(owners, predictor.predict_prices(rows)):
+        fields = updates[listing["id"]]
+        if "error" in result:
+            fields.update({"suggested_price": None, "price_deviation": None,
+                           "pricing_error": result["error"]})
+            continue
+        suggested = result["predicted_price"]
+        fields.update({
+            "suggested_price": suggested,
+            "suggested_price_range": result["price_range"],
+            "price_deviation": round((price - suggested) / suggested, 4) if suggested > 0 else None,
+            "pricing_error": None,
+        })
+    return updates
+
+
+# ------------------------ JOB STATE ------------------------
+
+def load_state():
+    """Load the persisted job progress."""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    """Persist job progress atomically."""
+    tmp = f"{STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def is_running():
+    """True while a background re-pricing thread is alive."""
+    return _job_thread is not None and _job_thread.is_alive()
+
+
+# ------------------------ JOB ------------------------
+
+def run_repricing(force=False, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Re-price the catalog. Resumes an interrupted run for the same model version
+    unless force is set. Returns the final state dict.
+    """
+    from routes.product_routes import products_store
+
+    version = predictor.model_version()
+    previous = load_state()
+    resume = (
+        not force
+        and previous.get("status") in {"running", "interrupted"}
+        and previous.get("model_version") == version
+    )
+
+    products = products_store().all()
+    ordered_ids = sorted(p["id"] for p in products)
+    start_after = previous.get("last_id") if resume else None
+
+    state = previous if resume else {
+        "model_version": version,
+        "force": force,
+        "started_at": datetime.now().isoformat(),
+        "processed": 0,
+        "repriced": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+    state.update({"status": "running", "total": len(ordered_ids), "last_id": start_after})
+    save_state(state)
+
+    by_id = {p["id"]: p for p in products}
+    pending_ids = [pid for pid in ordered_ids if start_after is None or pid > start_after]
+
+    try:
+        for offset in range(0, len(pending_ids), batch_size):
+            batch_ids = pending_ids[offset:offset + batch_size]
+            stale = [by_id[pid] for pid in batch_ids if needs_repricing(by_id[pid], version, state["force"])]
+            updates = price_batch(stale, version) if stale else {}
+
+            if updates:
+                def apply(product):
+                    fields = updates[product["id"]]
+                    # Skip listings edited since the batch was read; the next run picks them up
+                    if pricing_fingerprint(product) == fields["pricing_fingerprint"]:
+                        product.update(fields)
+
+                products_store().modify_many(updates.keys(), apply)
+
+            state["processed"] += len(batch_ids)
+            state["skipped"] += len(batch_ids) - len(stale)
+            state["failed"] += sum(1 for f in updates.values() if f.get("suggested_price") is None)
+            state["repriced"] += sum(1 for f in updates.values() if f.get("suggested_price") is not None)
+            state["last_id"] = batch_ids[-1]
+            state["updated_at"] = datetime.now().isoformat()
+            save_state(state)
+            if progress:
+                progress(state)
+    except BaseException:
+        state["status"] = "interrupted"
+        save_state(state)
+        raise
+
+    state["status"] = "completed"
+    state["finished_at"] = datetime.now().isoformat()
+    save_state(state)
+    return state
+
+
+def start_background_repricing(force=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Start the job on a daemon thread. Returns False if one is already running."""
+    global _job_thread
+    with _job_lock:
+        if is_running():
+            return False
+
+        def _run():
+            try:
+                run_repricing(force=force, batch_size=batch_size)
+            except Exception as e:
+                state = load_state()
+                state.update({"status": "interrupted", "error": str(e)})
+                save_state(state)
+
+        _job_thread = threading.Thread(target=_run, name="repricing-job", daemon=True)
+        _job_thread.start()
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-price every listing in the catalog.")
+    parser.add_argument("--force", action="store_true", help="re-price all listings, ignoring fingerprints")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    def report(state):
+        print(f"[{state['processed']}/{state['total']}] repriced={state['repriced']} "
+              f"skipped={state['skipped']} failed={state['failed']}")
+
+    state = run_repricing(force=args.force, batch_size=args.batch_size, progress=report)
+    print(f"✅ Re-pricing {state['status']} with model {state['model_version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 # server/routes/ai_routes.py
 """
 AI-related API routes.
-Currently handles product price prediction.
+Handles product price prediction and catalog re-pricing.
 """
 
 from flask import Blueprint, request, jsonify
 from ml_services.price_predictor.predictor import predict_price
 from ml_services.price_predictor import predictor as price_predictor
+from ml_services.price_predictor import repricing
 
 # Blueprint for AI routes
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
@@ -77,3 +78,33 @@ def price_range_route():
         return jsonify({'success': True, 'data': {'lower': lower, 'upper': upper, 'mean': mean, 'std': std}}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@ai_bp.route('/reprice', methods=['POST'])
+def start_repricing_route():
+    """Starts the background catalog re-pricing job."""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            batch_size = max(1, int(data.get('batch_size', repricing.DEFAULT_BATCH_SIZE)))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'batch_size must be an integer'}), 400
+        started = repricing.start_background_repricing(
+            force=bool(data.get('force', False)),
+            batch_size=batch_size
+        )
+        if not started:
+            return jsonify({'success': False, 'error': 'Re-pricing job is already running'}), 409
+        return jsonify({'success': True, 'message': 'Re-pricing job started'}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@ai_bp.route('/reprice/status', methods=['GET'])
+def repricing_status_route():
+    """Returns progress of the current or last re-pricing job."""
+    try:
+        state = repricing.load_state()
+        return jsonify({'success': True, 'running': repricing.is_running(), 'data': state}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,46 +1,66 @@
 """Escrow payment simulation routes providing safer transactions."""
 
+import hashlib
 import json
-import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from flask import Blueprint, jsonify, request
 
-from routes.product_routes import load_products
+from catalog import get_catalog
+from escrow import LedgerError, get_ledger, get_scheduler
+
+MAX_IDEMPOTENCY_KEY = 255
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 escrow_bp = Blueprint("escrow", __name__, url_prefix="/api/escrow")
 
-ESCROW_STORE = "escrow_store.json"
 
+def mask_entry(entry):
+    masked = entry.copy()
+    masked["buyer_token"] = "provided_to_buyer"
+    masked["seller_token"] = "provided_to_seller"
+    return masked
 
-def load_escrows():
-    if os.path.exists(ESCROW_STORE):
-        with open(ESCROW_STORE, "r") as f:
-            return json.load(f)
-    return []
 
+def request_idempotency():
+    """(Idempotency-Key header, fingerprint of the request) or None without the header."""
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return None
+    if len(key) > MAX_IDEMPOTENCY_KEY:
+        raise LedgerError(f"Idempotency-Key longer than {MAX_IDEMPOTENCY_KEY} characters")
+    body = request.get_json(silent=True) or {}
+    fingerprint = hashlib.sha256(json.dumps([request.path, body], sort_keys=True).encode()).hexdigest()
+    return key, fingerprint
 
-def save_escrows(items):
-    with open(ESCROW_STORE, "w") as f:
-        json.dump(items, f, indent=2)
 
+def request_version(data):
+    """
+    Version the client expects the escrow to be at (If-Match or "version"),
+    or None; If-Match: * accepts any version.
+    """
+    value = request.headers.get("If-Match") or data.get("version")
+    if value is None or str(value).strip() == "*":
+        return None
+    try:
+        return int(str(value).strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise LedgerError("version must be an integer")
 
-def add_event(entry, action, actor):
-    entry.setdefault("timeline", []).append(
-        {
-            "id": str(uuid.uuid4()),
-            "action": action,
-            "actor": actor,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-    )
 
+def escrow_response(entry, replayed, status_code=200, **extra):
+    response = jsonify({"success": True, "escrow": {**mask_entry(entry), **extra}})
+    response.status_code = status_code
+    response.headers["ETag"] = f'"{entry["version"]}"'
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return response
 
-def mask_entry(entry):
-    masked = entry.copy()
-    masked["buyer_token"] = "provided_to_buyer"
-    masked["seller_token"] = "provided_to_seller"
-    return masked
+
+def error_response(error):
+    return jsonify({"success": False, "error": str(error), **error.details}), error.status_code
 
 
 @escrow_bp.route("/session", methods=["POST"])
@@ -51,52 +71,76 @@ def create_session():
     for field in required:
         if not data.get(field):
             return jsonify({"success": False, "error": f"Missing {field}"}), 400
-
-    product = next(
-        (p for p in load_products() if p["id"] == data["product_id"]), None
-    )
+    for field in ("product_id", "buyer_id", "seller_id"):
+        if not isinstance(data[field], str):
+            return jsonify({"success": False, "error": f"{field} must be a string"}), 400
+    try:
+        amount = float(data["amount"])
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "amount must be a number"}), 400
+
+    product = get_catalog().get(data["product_id"])
     if not product:
         return jsonify({"success": False, "error": "Product not found"}), 404
 
-    escrows = load_escrows()
     escrow_entry = {
         "id": str(uuid.uuid4()),
         "product_id": product["id"],
         "product_title": product["title"],
         "buyer_id": data["buyer_id"],
         "seller_id": data["seller_id"],
-        "amount": float(data["amount"]),
+        "amount": amount,
         "currency": data.get("currency", "INR"),
         "status": "AWAITING_SELLER",
         "buyer_token": uuid.uuid4().hex,
         "seller_token": uuid.uuid4().hex,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat(),
-        "timeline": [],
     }
-    add_event(escrow_entry, "ESCROW_CREATED", "system")
-    escrows.append(escrow_entry)
-    save_escrows(escrows)
-
-    return (
-        jsonify(
-            {
-                "success": True,
-                "escrow": {
-                    **mask_entry(escrow_entry),
-                    "buyer_token": escrow_entry["buyer_token"],
-                    "seller_token": escrow_entry["seller_token"],
-                },
-            }
-        ),
+    # Appends ESCROW_CREATED to the ledger; the entry comes back with its timeline
+    try:
+        escrow_entry, replayed = get_ledger().create(escrow_entry, idempotency=request_idempotency())
+    except LedgerError as e:
+        return error_response(e)
+
+    return escrow_response(
+        escrow_entry,
+        replayed,
         201,
+        buyer_token=escrow_entry["buyer_token"],
+        seller_token=escrow_entry["seller_token"],
     )
 
 
 def lookup_escrow(escrow_id):
-    escrows = load_escrows()
-    entry = next((e for e in escrows if e["id"] == escrow_id), None)
-    return escrows, entry
+    return get_ledger().get(escrow_id)
+
+
+def apply_transition(escrow_id, data, status, action, actor, check=None):
+    """
+    Append a status change event for one escrow to the ledger. check(entry)
+    runs against the latest state, atomically with the append. Honours
+    Idempotency-Key and an expected version (If-Match or "version").
+    """
+    try:
+        entry, replayed = get_ledger().transition(
+            escrow_id, status, action, actor,
+            check=check,
+            expected_version=request_version(data),
+            idempotency=request_idempotency(),
+        )
+    except LedgerError as e:
+        return error_response(e)
+    if entry is None:
+        return jsonify({"success": False, "error": "Escrow not found"}), 404
+    return escrow_response(entry, replayed)
+
+
+def require_status(allowed, message):
+    def check(entry):
+        if entry["status"] not in allowed:
+            raise LedgerError(message, status=entry["status"], version=entry["version"])
+    return check
 
 
 @escrow_bp.route("/session/<escrow_id>/ship", methods=["POST"])
@@ -106,19 +150,16 @@ def confirm_shipment(escrow_id):
     if not token:
         return jsonify({"success": False, "error": "Seller token required"}), 400
 
-    escrows, entry = lookup_escrow(escrow_id)
+    entry = lookup_escrow(escrow_id)
     if not entry:
         return jsonify({"success": False, "error": "Escrow not found"}), 404
     if entry["seller_token"] != token:
         return jsonify({"success": False, "error": "Invalid seller token"}), 403
-    if entry["status"] not in {"AWAITING_SELLER", "AWAITING_SHIPMENT"}:
-        return jsonify({"success": False, "error": "Invalid status transition"}), 400
 
-    entry["status"] = "AWAITING_BUYER_CONFIRMATION"
-    entry["updated_at"] = datetime.utcnow().isoformat()
-    add_event(entry, "SELLER_CONFIRMED_SHIPMENT", entry["seller_id"])
-    save_escrows(escrows)
-    return jsonify({"success": True, "escrow": mask_entry(entry)})
+    return apply_transition(
+        escrow_id, data, "AWAITING_BUYER_CONFIRMATION", "SELLER_CONFIRMED_SHIPMENT", entry["seller_id"],
+        check=require_status({"AWAITING_SELLER", "AWAITING_SHIPMENT"}, "Invalid status transition"),
+    )
 
 
 @escrow_bp.route("/session/<escrow_id>/release", methods=["POST"])
@@ -128,19 +169,16 @@ def release_funds(escrow_id):
     if not token:
         return jsonify({"success": False, "error": "Buyer token required"}), 400
 
-    escrows, entry = lookup_escrow(escrow_id)
+    entry = lookup_escrow(escrow_id)
     if not entry:
         return jsonify({"success": False, "error": "Escrow not found"}), 404
     if entry["buyer_token"] != token:
         return jsonify({"success": False, "error": "Invalid buyer token"}), 403
-    if entry["status"] != "AWAITING_BUYER_CONFIRMATION":
-        return jsonify({"success": False, "error": "Shipment not confirmed yet"}), 400
 
-    entry["status"] = "COMPLETED"
-    entry["updated_at"] = datetime.utcnow().isoformat()
-    add_event(entry, "BUYER_RELEASED_FUNDS", entry["buyer_id"])
-    save_escrows(escrows)
-    return jsonify({"success": True, "escrow": mask_entry(entry)})
+    return apply_transition(
+        escrow_id, data, "COMPLETED", "BUYER_RELEASED_FUNDS", entry["buyer_id"],
+        check=require_status({"AWAITING_BUYER_CONFIRMATION"}, "Shipment not confirmed yet"),
+    )
 
 
 @escrow_bp.route("/session/<escrow_id>/dispute", methods=["POST"])
@@ -152,7 +190,7 @@ def dispute_session(escrow_id):
     if actor not in {"buyer", "seller"}:
         return jsonify({"success": False, "error": "Invalid actor"}), 400
 
-    escrows, entry = lookup_escrow(escrow_id)
+    entry = lookup_escrow(escrow_id)
     if not entry:
         return jsonify({"success": False, "error": "Escrow not found"}), 404
 
@@ -160,17 +198,88 @@ def dispute_session(escrow_id):
     if expected_token != token:
         return jsonify({"success": False, "error": "Invalid token"}), 403
 
-    entry["status"] = "UNDER_REVIEW"
-    entry["updated_at"] = datetime.utcnow().isoformat()
-    add_event(entry, f"{actor.upper()}_RAISED_DISPUTE::{reason}", actor)
-    save_escrows(escrows)
-    return jsonify({"success": True, "escrow": mask_entry(entry)})
+    return apply_transition(escrow_id, data, "UNDER_REVIEW", f"{actor.upper()}_RAISED_DISPUTE::{reason}", actor)
 
 
 @escrow_bp.route("/session/<escrow_id>", methods=["GET"])
 def get_session(escrow_id):
-    _, entry = lookup_escrow(escrow_id)
+    entry = lookup_escrow(escrow_id)
     if not entry:
         return jsonify({"success": False, "error": "Escrow not found"}), 404
-    return jsonify({"success": True, "escrow": mask_entry(entry)})
+    return escrow_response(entry, False)
+
+
+def request_date(name):
+    """Query parameter name as a normalized ISO timestamp, or None. Raises ValueError."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)    # stored as naive UTC
+    return parsed.isoformat()
+
+
+@escrow_bp.route("/sessions", methods=["GET"])
+def list_sessions():
+    """
+    One page of escrows, newest first. Query params: buyer_id, seller_id,
+    status (comma separated), created_from (inclusive), created_to
+    (exclusive), order (asc | desc), limit (max MAX_PAGE_SIZE) and cursor,
+    the next_cursor value of the previous page.
+    """
+    try:
+        order = request.args.get("order", "desc").lower()
+        if order not in ("asc", "desc"):
+            return jsonify({"success": False, "error": "order must be asc or desc"}), 400
+        try:
+            limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        status = request.args.get("status")
+        statuses = {value.strip().upper() for value in status.split(",") if value.strip()} if status else None
+
+        try:
+            entries, total, next_cursor = get_ledger().query(
+                buyer_id=request.args.get("buyer_id") or None,
+                seller_id=request.args.get("seller_id") or None,
+                statuses=statuses,
+                created_from=request_date("created_from"),
+                created_to=request_date("created_to"),
+                descending=order == "desc",
+                cursor=request.args.get("cursor"),
+                limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        return jsonify({
+            "success": True,
+            "escrows": [mask_entry(entry) for entry in entries],
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@escrow_bp.route("/sessions/counts", methods=["GET"])
+def session_counts():
+    """Escrows per status for buyer_id and/or seller_id, or across all escrows."""
+    counts = get_ledger().status_counts(
+        buyer_id=request.args.get("buyer_id") or None,
+        seller_id=request.args.get("seller_id") or None,
+    )
+    return jsonify({"success": True, "counts": counts, "total": sum(counts.values())})
+
 
+@escrow_bp.route("/scheduler/stats", methods=["GET"])
+def scheduler_stats():
+    """Pending escrow deadlines and actions taken by the scheduler."""
+    return jsonify({"success": True, "scheduler": get_scheduler().stats()})
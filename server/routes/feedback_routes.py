@@ -1,24 +1,29 @@
 from flask import Blueprint, request, jsonify
-import json
-import os
 from datetime import datetime
 import uuid
 
+from catalog.ratings import MAX_RATING, MIN_RATING, get_ratings, rating_of
+from http_cache import cached
+from storage import get_collection
+
 feedback_bp = Blueprint("feedback", __name__, url_prefix="/api/feedback")
 
-FEEDBACK_FILE = "feedback_store.json"
+FEEDBACK_SECTIONS = ("product_feedback", "general_feedback")
+
+DEFAULT_REVIEWS_PAGE = 20
+MAX_REVIEWS_PAGE = 100
+
+# Most product ids accepted by one bulk ratings request
+MAX_RATING_IDS = 200
 
 def load_feedback():
     """Load all feedback from storage."""
-    if os.path.exists(FEEDBACK_FILE):
-        with open(FEEDBACK_FILE, 'r') as f:
-            return json.load(f)
-    return {"product_feedback": [], "general_feedback": []}
+    return {section: get_collection(section).all() for section in FEEDBACK_SECTIONS}
 
 def save_feedback(data):
     """Save feedback to storage."""
-    with open(FEEDBACK_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    for section in FEEDBACK_SECTIONS:
+        get_collection(section).replace_all(data.get(section, []))
 
 # Product-specific feedback
 @feedback_bp.route('/product', methods=['POST'])
@@ -26,6 +31,13 @@ def submit_product_feedback():
     """Submit feedback for a specific product."""
     try:
         data = request.json
+        if not data.get('product_id'):
+            return jsonify({'success': False, 'error': 'Missing product_id'}), 400
+        if not isinstance(data['product_id'], str):
+            return jsonify({'success': False, 'error': 'product_id must be a string'}), 400
+        if rating_of(data) is None:
+            return jsonify({'success': False,
+                            'error': f'rating must be a whole number from {MIN_RATING} to {MAX_RATING}'}), 400
         feedback = {
             "id": str(uuid.uuid4()),
             "product_id": data.get('product_id'),
@@ -35,28 +47,67 @@ def submit_product_feedback():
             "timestamp": datetime.now().isoformat()
         }
         
-        all_feedback = load_feedback()
-        all_feedback["product_feedback"].append(feedback)
-        save_feedback(all_feedback)
+        get_collection("product_feedback").insert(feedback)
         
-        return jsonify({'success': True, 'feedback_id': feedback['id']}), 201
+        return jsonify({
+            'success': True,
+            'feedback_id': feedback['id'],
+            'rating': get_ratings().aggregate(feedback['product_id'])
+        }), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
 @feedback_bp.route('/product/<product_id>', methods=['GET'])
+@cached("product_feedback")
 def get_product_feedback(product_id):
-    """Get all feedback for a specific product."""
+    """
+    A product's feedback, newest first, with its rating aggregate. Paged
+    when limit (max MAX_REVIEWS_PAGE) or cursor, the next_cursor value of
+    the previous page, is given; all of it otherwise.
+    """
     try:
-        all_feedback = load_feedback()
-        product_feedback = [f for f in all_feedback["product_feedback"] 
-                          if f["product_id"] == product_id]
-        avg_rating = sum(f["rating"] for f in product_feedback) / len(product_feedback) if product_feedback else 0
+        limit = None
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = int(request.args.get('limit', DEFAULT_REVIEWS_PAGE))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+            limit = max(1, min(limit, MAX_REVIEWS_PAGE))
+
+        ratings = get_ratings()
+        try:
+            product_feedback, total, next_cursor = ratings.reviews(
+                product_id, limit=limit, cursor=request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        rating = ratings.aggregate(product_id)
         
         return jsonify({
             'success': True,
             'feedback': product_feedback,
-            'average_rating': round(avg_rating, 1),
-            'total_reviews': len(product_feedback)
+            'average_rating': rating['average'],
+            'total_reviews': total,
+            'rating': rating,
+            'limit': limit,
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@feedback_bp.route('/ratings', methods=['GET'])
+@cached("product_feedback")
+def get_product_ratings():
+    """Rating aggregates for the comma separated product_ids, e.g. for a page of listing cards."""
+    try:
+        product_ids = [p.strip() for p in request.args.get('product_ids', '').split(',') if p.strip()]
+        if not product_ids:
+            return jsonify({'success': False, 'error': 'product_ids is required'}), 400
+        if len(product_ids) > MAX_RATING_IDS:
+            return jsonify({'success': False, 'error': f'At most {MAX_RATING_IDS} product_ids per request'}), 400
+        
+        return jsonify({
+            'success': True,
+            'ratings': get_ratings().aggregates(product_ids)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -75,9 +126,7 @@ def submit_general_feedback():
             "timestamp": datetime.now().isoformat()
         }
         
-        all_feedback = load_feedback()
-        all_feedback["general_feedback"].append(feedback)
-        save_feedback(all_feedback)
+        get_collection("general_feedback").insert(feedback)
         
         return jsonify({'success': True, 'feedback_id': feedback['id']}), 201
     except Exception as e:
@@ -87,10 +136,9 @@ def submit_general_feedback():
 def get_general_feedback():
     """Get all general feedback."""
     try:
-        all_feedback = load_feedback()
         return jsonify({
             'success': True,
-            'feedback': all_feedback["general_feedback"]
+            'feedback': get_collection("general_feedback").all()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
\ No newline at end of file
@@ -4,14 +4,64 @@ Image-based search routes.
 Handles uploading an image and finding visually similar products.
 """
 
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, make_response, send_file
 import os
 import uuid
 from ml_services.image_search.search_engine import search_similar_images
+from storage import media
 
 # Blueprint for image search routes
 image_bp = Blueprint('image', __name__, url_prefix='/api/image')
 
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'public, max-age=86400'
+
+
+def _cached_file(path, etag, cache_control, mimetype=None, vary_accept=False):
+    """Send path with a strong ETag, answering a matching If-None-Match with 304."""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = send_file(os.path.abspath(path), mimetype=mimetype, conditional=False, etag=False)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if vary_accept:
+        response.vary.add('Accept')
+    return response
+
+
+def send_image(path, immutable):
+    """
+    Serve an image or, with ?size=thumb|card|full, its resized derivative as
+    WebP or JPEG (?format=, otherwise chosen from the Accept header).
+    immutable marks URLs whose content can never change (content-addressed
+    uploads); other sources get a one-day max-age and revalidate by ETag.
+    """
+    cache_control = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+    size = request.args.get('size')
+    if not size:
+        return _cached_file(path, media.source_key(path), cache_control)
+    if size not in media.VARIANTS:
+        return jsonify({'success': False, 'error': f"size must be one of {', '.join(media.VARIANTS)}"}), 400
+
+    formats = media.available_formats()
+    fmt = request.args.get('format')
+    if fmt and fmt not in formats:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(formats)}"}), 400
+    negotiated = not fmt
+    if negotiated:
+        accepts_webp = 'image/webp' in request.headers.get('Accept', '') and 'webp' in formats
+        fmt = 'webp' if accepts_webp else 'jpeg'
+
+    key, derived = media.find_derivative(path, size, fmt)
+    if derived is None:
+        # Still rendering: send the original without letting caches keep it under this URL
+        response = send_file(os.path.abspath(path), conditional=False, etag=False)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return _cached_file(derived, f"{key}-{size}-{fmt}", cache_control,
+                        mimetype=media.FORMATS[fmt][1], vary_accept=negotiated)
+
 
 @image_bp.route('/search', methods=['POST'])
 def image_search():
@@ -86,6 +136,6 @@ def serve_dataset_image(category, filename):
     )
     base_dir = os.path.abspath(base_dir)
     file_path = os.path.join(base_dir, filename)
-    if not os.path.exists(file_path):
+    if os.path.dirname(os.path.abspath(file_path)) != base_dir or not os.path.isfile(file_path):
         return jsonify({'success': False, 'error': 'Dataset image not found'}), 404
-    return send_from_directory(base_dir, filename)
+    return send_image(file_path, immutable=False)
@@ -4,12 +4,14 @@ import os
 import uuid
 from flask import Blueprint, jsonify, request, send_from_directory
 
+from http_cache import cached
 from ml_services.logo_verifier import get_available_brands, verify_logo
 
 logo_bp = Blueprint("logo", __name__, url_prefix="/api/logo")
 
 
 @logo_bp.route("/brands", methods=["GET"])
+@cached("logo_references")
 def list_brands():
     return jsonify({"success": True, "brands": get_available_brands()})
 
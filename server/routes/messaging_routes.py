@@ -1,41 +1,55 @@
 """In-app messaging routes with escrow integration."""
 
 import json
-import os
 import uuid
 from datetime import datetime
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+
+from messaging import get_inbox, get_message_log, get_search_index
+from messaging.events import bus, public, publish_thread_event, thread_topic, user_topic
+from messaging.inbox import participants, record_message, record_read, summarize
+from storage import DuplicateKeyError, get_collection
 
 messaging_bp = Blueprint("messaging", __name__, url_prefix="/api/messaging")
 
-MESSAGES_STORE = "messages_store.json"
+DEFAULT_INBOX_PAGE = 20
+MAX_INBOX_PAGE = 100
+DEFAULT_HISTORY_PAGE = 50
+MAX_HISTORY_PAGE = 200
+DEFAULT_SEARCH_PAGE = 20
+MAX_SEARCH_PAGE = 100
+
+# Comment line sent on an idle event stream so proxies keep it open
+HEARTBEAT_SECONDS = 15
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+DEFAULT_POLL_SECONDS = 25
+MAX_POLL_SECONDS = 60
+
+
+def threads_store():
+    """Message thread collection for the configured storage backend."""
+    return get_collection("message_threads")
 
 
 def load_messages():
     """Load all message threads from storage."""
-    if os.path.exists(MESSAGES_STORE):
-        with open(MESSAGES_STORE, "r") as f:
-            return json.load(f)
-    return []
+    return threads_store().all()
 
 
 def save_messages(threads):
     """Save message threads to storage."""
-    with open(MESSAGES_STORE, "w") as f:
-        json.dump(threads, f, indent=2)
+    threads_store().replace_all(threads)
 
 
 def get_or_create_thread(product_id, buyer_id, seller_id):
     """Get existing thread or create new one for buyer-seller conversation."""
-    threads = load_messages()
     thread_id = f"{product_id}_{buyer_id}_{seller_id}"
     
-    existing = next(
-        (t for t in threads if t["thread_id"] == thread_id), None
-    )
+    existing = threads_store().get(thread_id)
     
     if existing:
-        return threads, existing
+        return existing
     
     new_thread = {
         "thread_id": thread_id,
@@ -44,55 +58,320 @@ def get_or_create_thread(product_id, buyer_id, seller_id):
         "seller_id": seller_id,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat(),
-        "messages": [],
         "status": "active",  # active, sold, closed
         "escrow_id": None,
+        "last_message": None,
+        "message_count": 0,
+        "read_upto": {buyer_id: 0, seller_id: 0},
     }
-    threads.append(new_thread)
-    save_messages(threads)
-    return threads, new_thread
+    try:
+        threads_store().insert(new_thread)
+    except DuplicateKeyError:
+        # Another request created it first
+        return threads_store().get(thread_id)
+    return new_thread
+
+
+def move_history_to_log(thread):
+    """
+    Threads created before the message log keep their messages inline;
+    copy them into the log and drop them from the thread record.
+    """
+    if "messages" not in thread:
+        return thread
+    messages = thread["messages"]
+    read_upto = {}
+    for user in participants(thread):
+        read = [i + 1 for i, m in enumerate(messages) if m.get("sender_id") != user and m.get("read")]
+        read_upto[user] = read[-1] if read else 0
+    get_message_log().import_messages(
+        thread["thread_id"],
+        [{k: v for k, v in m.items() if k != "read"} for m in messages],
+        read_upto,
+    )
+
+    def drop_messages(stored):
+        if "messages" in stored:
+            if "message_count" not in stored:
+                stored.update(summarize(stored["messages"], stored))
+            del stored["messages"]
+
+    return threads_store().modify(thread["thread_id"], drop_messages) or thread
+
+
+def reconcile_summary(thread):
+    """Rebuild the thread summary from the log if a crash left it behind the log."""
+    log = get_message_log()
+    count = log.count(thread["thread_id"])
+    if thread.get("message_count", 0) >= count:
+        return thread
+    messages, _, _ = log.history(thread["thread_id"], participants(thread), limit=count)
+    read_upto = log.read_upto(thread["thread_id"])
+
+    def resummarize(stored):
+        stored.pop("unread", None)
+        stored.update(summarize(messages, stored, read_upto))
+
+    return threads_store().modify(thread["thread_id"], resummarize) or thread
+
+
+def load_thread(thread_id):
+    """Thread record with its history in the message log, or None."""
+    thread = threads_store().get(thread_id)
+    if thread is None:
+        return None
+    return reconcile_summary(move_history_to_log(thread))
 
 
 @messaging_bp.route("/threads", methods=["GET"])
 def list_threads():
-    """Get all message threads for a user (buyer or seller)."""
+    """
+    Inbox of a user (buyer or seller): thread summaries with the last
+    message and the user's unread count, most recent first. Paginated with
+    limit and cursor (next_cursor of the previous page).
+    """
     user_id = request.args.get("user_id")
     if not user_id:
         return jsonify({"success": False, "error": "user_id required"}), 400
-    
-    threads = load_messages()
-    user_threads = [
-        t for t in threads
-        if t["buyer_id"] == user_id or t["seller_id"] == user_id
-    ]
-    
-    # Sort by most recent message
-    for thread in user_threads:
-        if thread["messages"]:
-            thread["last_message"] = thread["messages"][-1]
-        else:
-            thread["last_message"] = None
-    
-    user_threads.sort(
-        key=lambda x: x["last_message"]["timestamp"] if x["last_message"] else x["created_at"],
-        reverse=True
-    )
-    
-    return jsonify({"success": True, "threads": user_threads}), 200
+
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_INBOX_PAGE)), MAX_INBOX_PAGE))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+
+    try:
+        threads, total, unread_total, next_cursor = get_inbox().page(
+            user_id, limit=limit, cursor=request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({
+        "success": True,
+        "threads": threads,
+        "total": total,
+        "unread_total": unread_total,
+        "next_cursor": next_cursor
+    }), 200
+
+
+@messaging_bp.route("/unread", methods=["GET"])
+def unread_total():
+    """Unread message count across all of a user's threads, for the badge."""
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id required"}), 400
+
+    return jsonify({"success": True, "unread_total": get_inbox().unread_total(user_id)}), 200
 
 
 @messaging_bp.route("/thread/<thread_id>", methods=["GET"])
 def get_thread(thread_id):
-    """Get a specific message thread with all messages."""
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
-    
+    """Get a message thread with its most recent messages (older ones via /messages)."""
+    thread = load_thread(thread_id)
+
     if not thread:
         return jsonify({"success": False, "error": "Thread not found"}), 404
-    
+
+    messages, _, before = get_message_log().history(thread_id, participants(thread), limit=DEFAULT_HISTORY_PAGE)
+    thread = {**thread, "messages": messages, "next_cursor": None if before is None else str(before)}
     return jsonify({"success": True, "thread": thread}), 200
 
 
+@messaging_bp.route("/thread/<thread_id>/messages", methods=["GET"])
+def get_thread_messages(thread_id):
+    """
+    One page of a thread's history, oldest first within the page. Pages go
+    backwards from the newest message; pass next_cursor as cursor to get
+    the page before.
+    """
+    thread = load_thread(thread_id)
+    if not thread:
+        return jsonify({"success": False, "error": "Thread not found"}), 404
+
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_HISTORY_PAGE)), MAX_HISTORY_PAGE))
+        cursor = request.args.get("cursor")
+        before = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"success": False, "error": "limit and cursor must be integers"}), 400
+
+    messages, total, before = get_message_log().history(thread_id, participants(thread), before, limit)
+    return jsonify({
+        "success": True,
+        "messages": messages,
+        "total": total,
+        "next_cursor": None if before is None else str(before)
+    }), 200
+
+
+@messaging_bp.route("/search", methods=["GET"])
+def search_messages():
+    """
+    Search the messages of a user's threads (or only thread_id), newest
+    first. q takes words, "quoted phrases" and prefixes ending in *.
+    Paginated with limit and cursor.
+    """
+    user_id = request.args.get("user_id")
+    query = request.args.get("q", "")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id required"}), 400
+
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_SEARCH_PAGE)), MAX_SEARCH_PAGE))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+
+    try:
+        hits, total, next_cursor = get_search_index().search(
+            user_id, query, thread_id=request.args.get("thread_id"),
+            limit=limit, cursor=request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    threads = {thread["thread_id"]: thread for thread in get_inbox().threads_of(user_id)}
+    results = []
+    for hit in hits:
+        thread = threads.get(hit["thread_id"])
+        if thread is None:
+            continue
+        messages, _, _ = get_message_log().history(
+            hit["thread_id"], participants(thread), before=hit["seq"] + 1, limit=1
+        )
+        if messages:
+            results.append({
+                "thread_id": hit["thread_id"],
+                "product_id": thread.get("product_id"),
+                "message": messages[0]
+            })
+
+    return jsonify({
+        "success": True,
+        "results": results,
+        "total": total,
+        "next_cursor": next_cursor
+    }), 200
+
+
+def subscription_topics(user_id, thread_id):
+    """Event topics for user_id: one thread they take part in, or all of their threads."""
+    if not thread_id:
+        return [user_topic(user_id)], None
+    thread = threads_store().get(thread_id)
+    if thread is None:
+        return None, (jsonify({"success": False, "error": "Thread not found"}), 404)
+    if user_id not in participants(thread):
+        return None, (jsonify({"success": False, "error": "Unauthorized"}), 403)
+    return [thread_topic(thread_id)], None
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def resync_event():
+    """Tells the client events were missed and it should re-fetch threads."""
+    return {"id": bus.last_event_id(), "type": "resync", "data": {}}
+
+
+def event_stream(subscription, last_event_id):
+    """SSE body: missed events after last_event_id, then live ones, with heartbeats."""
+    delivered = 0
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if last_event_id:
+            missed, complete = bus.since(subscription.topics, last_event_id)
+            if not complete:
+                yield format_sse(resync_event())
+            for event in missed:
+                delivered = event["_n"]
+                yield format_sse(event)
+        while True:
+            events, lagged = subscription.get(HEARTBEAT_SECONDS)
+            if lagged:
+                yield format_sse(resync_event())
+            elif not events:
+                yield ": keep-alive\n\n"
+            for event in events:
+                # Already sent from the replay buffer
+                if event["_n"] > delivered:
+                    yield format_sse(event)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+@messaging_bp.route("/events", methods=["GET"])
+def stream_events():
+    """
+    Server-Sent Events stream of new messages, read receipts and thread
+    status changes for user_id's threads (or only thread_id). Reconnecting
+    clients send Last-Event-ID (or last_event_id) to receive what they
+    missed; a "resync" event means they should re-fetch instead.
+    """
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id required"}), 400
+
+    topics, error = subscription_topics(user_id, request.args.get("thread_id"))
+    if error:
+        return error
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    subscription = bus.subscribe(topics)
+    return Response(
+        event_stream(subscription, last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@messaging_bp.route("/events/poll", methods=["GET"])
+def poll_events():
+    """
+    Long-poll fallback for clients without EventSource. Returns the events
+    after since, waiting up to timeout seconds for one; pass last_event_id
+    back as since. Without since it returns at once with the current
+    last_event_id, and resync is true when events were missed.
+    """
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id required"}), 400
+
+    try:
+        timeout = max(0.0, min(float(request.args.get("timeout", DEFAULT_POLL_SECONDS)), MAX_POLL_SECONDS))
+    except ValueError:
+        return jsonify({"success": False, "error": "timeout must be a number"}), 400
+
+    topics, error = subscription_topics(user_id, request.args.get("thread_id"))
+    if error:
+        return error
+
+    since = request.args.get("since")
+    if not since:
+        return jsonify({"success": True, "events": [], "last_event_id": bus.last_event_id(), "resync": False}), 200
+
+    # Subscribe before reading the replay buffer so nothing published in between is lost
+    subscription = bus.subscribe(topics)
+    try:
+        events, complete = bus.since(topics, since)
+        if complete and not events:
+            events, lagged = subscription.get(timeout)
+            complete = not lagged
+    finally:
+        bus.unsubscribe(subscription)
+
+    if not complete:
+        return jsonify({"success": True, "events": [], "last_event_id": bus.last_event_id(), "resync": True}), 200
+
+    return jsonify({
+        "success": True,
+        "events": [public(event) for event in events],
+        "last_event_id": events[-1]["id"] if events else since,
+        "resync": False
+    }), 200
+
+
 @messaging_bp.route("/thread", methods=["POST"])
 def create_or_get_thread():
     """Create or retrieve a message thread for a product conversation."""
@@ -102,7 +381,7 @@ def create_or_get_thread():
         if not data.get(field):
             return jsonify({"success": False, "error": f"Missing {field}"}), 400
     
-    threads, thread = get_or_create_thread(
+    thread = get_or_create_thread(
         data["product_id"], data["buyer_id"], data["seller_id"]
     )
     
@@ -117,9 +396,10 @@ def send_message(thread_id):
     for field in required:
         if not data.get(field):
             return jsonify({"success": False, "error": f"Missing {field}"}), 400
+    if not isinstance(data["content"], str):
+        return jsonify({"success": False, "error": "content must be a string"}), 400
     
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
+    thread = load_thread(thread_id)
     
     if not thread:
         return jsonify({"success": False, "error": "Thread not found"}), 404
@@ -132,14 +412,19 @@ def send_message(thread_id):
         "sender_id": data["sender_id"],
         "content": data["content"],
         "timestamp": datetime.utcnow().isoformat(),
-        "read": False,
     }
+    # One append to the thread's log; the thread record only holds the summary
+    message["seq"] = get_message_log().append(thread_id, message)
+    
+    def update_summary(stored):
+        stored["updated_at"] = datetime.utcnow().isoformat()
+        record_message(stored, message)
     
-    thread["messages"].append(message)
-    thread["updated_at"] = datetime.utcnow().isoformat()
-    save_messages(threads)
+    threads_store().modify(thread_id, update_summary)
+    get_search_index().index_message(thread, message)
+    publish_thread_event(thread, "message", {"message": {**message, "read": False}})
     
-    return jsonify({"success": True, "message": message}), 201
+    return jsonify({"success": True, "message": {**message, "read": False}}), 201
 
 
 @messaging_bp.route("/thread/<thread_id>/mark-read", methods=["POST"])
@@ -150,17 +435,15 @@ def mark_read(thread_id):
     if not user_id:
         return jsonify({"success": False, "error": "user_id required"}), 400
     
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
-    
-    if not thread:
+    thread = load_thread(thread_id)
+    if thread is None:
         return jsonify({"success": False, "error": "Thread not found"}), 404
     
-    for msg in thread["messages"]:
-        if msg["sender_id"] != user_id:
-            msg["read"] = True
+    # Moves user_id's read position to the end of the log; later messages stay unread
+    upto = get_message_log().mark_read(thread_id, user_id)
+    threads_store().modify(thread_id, lambda stored: record_read(stored, user_id, upto))
+    publish_thread_event(thread, "read", {"user_id": user_id, "upto": upto})
     
-    save_messages(threads)
     return jsonify({"success": True}), 200
 
 
@@ -172,16 +455,16 @@ def link_escrow(thread_id):
     if not escrow_id:
         return jsonify({"success": False, "error": "escrow_id required"}), 400
     
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
+    def attach_escrow(stored):
+        stored["escrow_id"] = escrow_id
+        stored["updated_at"] = datetime.utcnow().isoformat()
+    
+    thread = threads_store().modify(thread_id, attach_escrow)
     
     if not thread:
         return jsonify({"success": False, "error": "Thread not found"}), 404
     
-    thread["escrow_id"] = escrow_id
-    thread["updated_at"] = datetime.utcnow().isoformat()
-    save_messages(threads)
-    
+    publish_thread_event(thread, "escrow_linked", {"escrow_id": escrow_id})
     return jsonify({"success": True, "thread": thread}), 200
 
 
@@ -193,8 +476,7 @@ def mark_sold(thread_id):
     if not user_id:
         return jsonify({"success": False, "error": "user_id required"}), 400
     
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
+    thread = load_thread(thread_id)
     
     if not thread:
         return jsonify({"success": False, "error": "Thread not found"}), 404
@@ -202,30 +484,38 @@ def mark_sold(thread_id):
     if thread["seller_id"] != user_id:
         return jsonify({"success": False, "error": "Only seller can mark as sold"}), 403
     
-    thread["status"] = "sold"
-    thread["updated_at"] = datetime.utcnow().isoformat()
-    
     # Add system message
     system_msg = {
         "id": str(uuid.uuid4()),
         "sender_id": "system",
         "content": "✅ Product marked as sold. Transaction completed.",
         "timestamp": datetime.utcnow().isoformat(),
-        "read": False,
         "is_system": True,
     }
-    thread["messages"].append(system_msg)
+    system_msg["seq"] = get_message_log().append(thread_id, system_msg)
+    
+    def close_as_sold(stored):
+        stored["status"] = "sold"
+        stored["updated_at"] = datetime.utcnow().isoformat()
+        record_message(stored, system_msg)
     
-    save_messages(threads)
+    thread = threads_store().modify(thread_id, close_as_sold)
     
-    # Update product status in products.json
-    from routes.product_routes import load_products, save_products
-    products = load_products()
-    product = next((p for p in products if p["id"] == thread["product_id"]), None)
-    if product:
+    if not thread:
+        return jsonify({"success": False, "error": "Thread not found"}), 404
+    
+    get_search_index().index_message(thread, system_msg)
+    publish_thread_event(thread, "message", {"message": {**system_msg, "read": False}})
+    publish_thread_event(thread, "status", {"status": "sold"})
+    
+    # Update product status in the product store
+    from routes.product_routes import products_store
+    
+    def sell_product(product):
         product["status"] = "sold"
         product["sold_at"] = datetime.utcnow().isoformat()
-        save_products(products)
+    
+    products_store().modify(thread["product_id"], sell_product)
     
     return jsonify({"success": True, "thread": thread}), 200
 
@@ -238,8 +528,7 @@ def close_thread(thread_id):
     if not user_id:
         return jsonify({"success": False, "error": "user_id required"}), 400
     
-    threads = load_messages()
-    thread = next((t for t in threads if t["thread_id"] == thread_id), None)
+    thread = threads_store().get(thread_id)
     
     if not thread:
         return jsonify({"success": False, "error": "Thread not found"}), 404
@@ -247,9 +536,16 @@ def close_thread(thread_id):
     if user_id not in [thread["buyer_id"], thread["seller_id"]]:
         return jsonify({"success": False, "error": "Unauthorized"}), 403
     
-    thread["status"] = "closed"
-    thread["updated_at"] = datetime.utcnow().isoformat()
-    save_messages(threads)
+    def close(stored):
+        stored["status"] = "closed"
+        stored["updated_at"] = datetime.utcnow().isoformat()
+    
+    thread = threads_store().modify(thread_id, close)
+    
+    if not thread:
+        return jsonify({"success": False, "error": "Thread not found"}), 404
+    
+    publish_thread_event(thread, "status", {"status": "closed"})
     
     return jsonify({"success": True, "thread": thread}), 200
 
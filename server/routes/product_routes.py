@@ -4,18 +4,19 @@ Product listing routes.
 Handles uploading product images and managing product listings.
 """
 
-from flask import Blueprint, request, jsonify
-import json
+from flask import Blueprint, Response, request, jsonify
 import os
-import uuid
-from datetime import datetime
-from werkzeug.utils import secure_filename
+
+from catalog import bulk, get_catalog, ingestion
+from http_cache import cached
+from storage import get_collection, media
 
 product_bp = Blueprint("product", __name__, url_prefix="/api/products")
 
-PRODUCTS_FILE = "products.json"
-UPLOAD_FOLDER = "uploads"
+UPLOAD_FOLDER = media.MEDIA_ROOT
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 
 # ------------------------ UTIL FUNCTIONS ------------------------
@@ -25,45 +26,19 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def products_store():
+    """Product collection for the configured storage backend."""
+    return get_collection("products")
+
+
 def load_products():
     """Load all product listings from storage."""
-    if os.path.exists(PRODUCTS_FILE):
-        with open(PRODUCTS_FILE, "r") as f:
-            return json.load(f)
-    return []
+    return products_store().all()
 
 
 def save_products(products):
     """Save updated product list back to storage."""
-    with open(PRODUCTS_FILE, "w") as f:
-        json.dump(products, f, indent=2)
-
-
-def compute_similarity_score(base, candidate):
-    """Heuristic similarity score for recommendations."""
-    score = 0.0
-
-    if base["id"] == candidate["id"]:
-        return -1
-
-    if base.get("category", "").lower() == candidate.get("category", "").lower():
-        score += 5
-
-    if base.get("brand") and candidate.get("brand") and base["brand"].lower() == candidate["brand"].lower():
-        score += 3
-
-    price_a = float(base.get("price", 0) or 0)
-    price_b = float(candidate.get("price", 0) or 0)
-    if price_a > 0 and price_b > 0:
-        diff_ratio = abs(price_a - price_b) / max(price_a, price_b)
-        score += max(0, 2 - diff_ratio * 10)
-
-    condition_map = {"excellent": 3, "good": 2, "fair": 1, "poor": 0}
-    cond_a = condition_map.get(base.get("condition", "").lower(), 1)
-    cond_b = condition_map.get(candidate.get("condition", "").lower(), 1)
-    score -= abs(cond_a - cond_b) * 0.5
-
-    return score
+    products_store().replace_all(products)
 
 
 # ------------------------ IMAGE UPLOAD ------------------------
@@ -83,18 +58,17 @@ def upload_image():
         if not allowed_file(file.filename):
             return jsonify({"success": False, "error": "Invalid image type"}), 400
 
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-
-        file.save(filepath)
+        extension = file.filename.rsplit(".", 1)[1].lower()
+        # Stored under the content hash, so re-uploading the same image reuses the file
+        filename, created = media.store_upload(file.stream, extension, UPLOAD_FOLDER)
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        media.derivatives.enqueue(filepath, media.source_key(filepath))
 
         return jsonify({
             "success": True,
-            "filename": unique_filename,
-            "filepath": f"/uploads/{unique_filename}"
+            "filename": filename,
+            "filepath": f"/uploads/{filename}",
+            "deduplicated": not created
         }), 200
 
     except Exception as e:
@@ -107,31 +81,14 @@ def upload_image():
 def create_listing():
     """Create a new product listing."""
     try:
-        data = request.json
-
-        required = ["title", "price", "category", "description"]
-        for field in required:
-            if not data.get(field):
-                return jsonify({"success": False, "error": f"Missing field: {field}"}), 400
-
-        products = load_products()
-
-        new_product = {
-            "id": str(uuid.uuid4()),                     # FIXED: Unique ID
-            "title": data["title"],
-            "price": float(data["price"]),
-            "category": data["category"],
-            "description": data["description"],
-            "brand": data.get("brand", ""),
-            "condition": data.get("condition", "good"),
-            "year": data.get("year", 2024),
-            "image_url": data.get("image_url", ""),
-            "created_at": datetime.now().isoformat(),
-            "user_id": data.get("user_id", "demo_user")
-        }
-
-        products.append(new_product)
-        save_products(products)
+        try:
+            new_product = bulk.build_listing(request.json)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        products_store().insert(new_product)
+        # Embedding, price suggestion and logo check run in the background
+        ingestion.enqueue(new_product["id"])
 
         return jsonify({"success": True, "product": new_product}), 200
 
@@ -142,30 +99,216 @@ def create_listing():
 # ------------------------ GET ALL LISTINGS ------------------------
 
 @product_bp.route("/listings", methods=["GET"])
+@cached("products")
 def get_listings():
-    """Return all products with optional filtering."""
-    try:
-        products = load_products()
+    """
+    Return one page of products with optional filtering.
 
+    Query params: category, min_price, max_price, sort (created_at | price),
+    order (asc | desc), limit (max MAX_PAGE_SIZE) and cursor, the
+    next_cursor value of the previous page.
+    """
+    try:
         category = request.args.get("category")
         min_price = request.args.get("min_price")
         max_price = request.args.get("max_price")
+        sort = request.args.get("sort", "created_at")
+        order = request.args.get("order", "asc").lower()
+        cursor = request.args.get("cursor")
+
+        try:
+            limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        if order not in ("asc", "desc"):
+            return jsonify({"success": False, "error": "order must be asc or desc"}), 400
+
+        try:
+            products, total, next_cursor = get_catalog().page(
+                category=category,
+                min_price=float(min_price) if min_price else None,
+                max_price=float(max_price) if max_price else None,
+                sort=sort,
+                descending=order == "desc",
+                cursor=cursor,
+                limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        return jsonify({
+            "success": True,
+            "products": products,
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# ------------------------ FACETS ------------------------
+
+@product_bp.route("/facets", methods=["GET"])
+@cached("products")
+def get_facets():
+    """
+    Counts of available listings per category, brand and condition, and a
+    price histogram, for the filters in the query (category, brand,
+    condition, min_price, max_price).
+    """
+    try:
+        min_price = request.args.get("min_price")
+        max_price = request.args.get("max_price")
+        try:
+            min_price = float(min_price) if min_price else None
+            max_price = float(max_price) if max_price else None
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid numeric parameter"}), 400
+
+        facets = get_catalog().facets(
+            category=request.args.get("category"),
+            brand=request.args.get("brand"),
+            condition=request.args.get("condition"),
+            min_price=min_price,
+            max_price=max_price,
+        )
+        return jsonify({"success": True, **facets}), 200
 
-        filtered = products
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        if category:
-            filtered = [p for p in filtered if p["category"].lower() == category.lower()]
 
-        if min_price:
-            filtered = [p for p in filtered if p["price"] >= float(min_price)]
+# ------------------------ BULK EXPORT / IMPORT ------------------------
 
-        if max_price:
-            filtered = [p for p in filtered if p["price"] <= float(max_price)]
+@product_bp.route("/export", methods=["GET"])
+def export_listings():
+    """
+    Stream every listing as NDJSON (one JSON object per line), oldest
+    first. Accepts the category/min_price/max_price filters of /listings.
+    """
+    try:
+        min_price = request.args.get("min_price")
+        max_price = request.args.get("max_price")
+        try:
+            min_price = float(min_price) if min_price else None
+            max_price = float(max_price) if max_price else None
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid numeric parameter"}), 400
+
+        lines = bulk.export_ndjson(request.args.get("category"), min_price, max_price)
+        return Response(lines, mimetype="application/x-ndjson",
+                        headers={"Content-Disposition": "attachment; filename=listings.ndjson"})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@product_bp.route("/import", methods=["POST"])
+def import_listings():
+    """
+    Create listings from an NDJSON or CSV upload, sent either as the "file"
+    form field or as the raw request body. The format comes from ?format,
+    the file extension or the content type. Valid rows are inserted in
+    batches of batch_size; invalid rows are reported by line number.
+    Pass ingest=false to skip background enrichment of the new listings.
+    """
+    try:
+        if request.mimetype.startswith("multipart/"):
+            if "file" not in request.files:
+                return jsonify({"success": False, "error": "No file provided"}), 400
+            upload = request.files["file"]
+            stream, filename = upload.stream, upload.filename or ""
+        else:
+            stream, filename = request.stream, ""
+
+        fmt = request.args.get("format")
+        if not fmt and "." in filename:
+            fmt = filename.rsplit(".", 1)[1].lower()
+        if not fmt:
+            fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+        if fmt == "jsonl":
+            fmt = "ndjson"
+        if fmt not in bulk.FORMATS:
+            return jsonify({"success": False, "error": f"Unsupported format: {fmt}"}), 400
+
+        try:
+            batch_size = max(1, min(int(request.args.get("batch_size", bulk.IMPORT_BATCH_SIZE)), 50000))
+        except ValueError:
+            return jsonify({"success": False, "error": "batch_size must be an integer"}), 400
+        ingest = request.args.get("ingest", "true").lower() not in ("0", "false", "no")
+
+        summary = bulk.import_listings(stream, fmt, batch_size=batch_size, ingest=ingest)
+        if summary["aborted"]:
+            return jsonify({"success": False, "error": summary["aborted"], **summary}), 400
+        return jsonify({"success": True, **summary}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# ------------------------ TEXT SEARCH ------------------------
+
+@product_bp.route("/search", methods=["GET"])
+def search_listings():
+    """
+    Rank listings by how well their title, description and brand match q.
+    Accepts the same category/min_price/max_price filters as /listings,
+    plus limit and offset.
+    """
+    try:
+        query = (request.args.get("q") or "").strip()
+        if not query:
+            return jsonify({"success": False, "error": "q is required"}), 400
+
+        min_price = request.args.get("min_price")
+        max_price = request.args.get("max_price")
+        try:
+            limit = max(1, min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+            offset = max(0, int(request.args.get("offset", 0)))
+            min_price = float(min_price) if min_price else None
+            max_price = float(max_price) if max_price else None
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid numeric parameter"}), 400
+
+        matches, total = get_catalog().search(
+            query,
+            category=request.args.get("category"),
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit,
+            offset=offset,
+        )
 
         return jsonify({
             "success": True,
-            "products": filtered,
-            "total": len(filtered)
+            "query": query,
+            "products": [{**product, "search_score": round(score, 4)} for product, score in matches],
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@product_bp.route("/search/suggest", methods=["GET"])
+def suggest_search_terms():
+    """Autocomplete the last word of q from indexed listing text."""
+    try:
+        query = request.args.get("q") or ""
+        try:
+            limit = max(1, min(int(request.args.get("limit", 8)), 20))
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+
+        return jsonify({
+            "success": True,
+            "suggestions": get_catalog().suggest(query, limit)
         }), 200
 
     except Exception as e:
@@ -175,11 +318,11 @@ def get_listings():
 # ------------------------ GET SINGLE PRODUCT ------------------------
 
 @product_bp.route("/listings/<product_id>", methods=["GET"])    # FIXED: int removed
+@cached("products")
 def get_product(product_id):
     """Return one product by ID."""
     try:
-        products = load_products()
-        product = next((p for p in products if p["id"] == product_id), None)
+        product = get_catalog().get(product_id)
 
         if not product:
             return jsonify({"success": False, "error": "Product not found"}), 404
@@ -196,16 +339,11 @@ def get_product(product_id):
 def delete_listing(product_id):
     """Delete a product by ID."""
     try:
-        products = load_products()
+        deleted = products_store().delete(product_id)
 
-        index = next((i for i, p in enumerate(products) if p["id"] == product_id), None)
-
-        if index is None:
+        if deleted is None:
             return jsonify({"success": False, "error": "Product not found"}), 404
 
-        deleted = products.pop(index)
-        save_products(products)
-
         return jsonify({"success": True, "product": deleted}), 200
 
     except Exception as e:
@@ -224,29 +362,41 @@ def health_check():
     }), 200
 
 
+@product_bp.route("/ingestion/status", methods=["GET"])
+def ingestion_status():
+    """Backlog and throughput counters of the listing ingestion pipeline."""
+    return jsonify({"success": True, "ingestion": ingestion.stats()}), 200
+
+
 @product_bp.route("/listings/<product_id>/recommendations", methods=["GET"])
 def recommend_products(product_id):
-    """Return similar products for the provided product id."""
+    """
+    Return similar products for the provided product id. mode=hybrid blends
+    in visual similarity from stored image embeddings (visual_weight, 0-1).
+    """
     try:
-        products = load_products()
-        base = next((p for p in products if p["id"] == product_id), None)
+        mode = request.args.get("mode", "attributes")
+        if mode not in ("attributes", "hybrid"):
+            return jsonify({"success": False, "error": "mode must be attributes or hybrid"}), 400
+
+        visual_weight = None
+        if mode == "hybrid":
+            try:
+                visual_weight = min(max(float(request.args.get("visual_weight", 0.5)), 0.0), 1.0)
+            except ValueError:
+                return jsonify({"success": False, "error": "visual_weight must be a number"}), 400
+
+        base, recommendations, used_visual = get_catalog().recommend(
+            product_id, limit=6, visual_weight=visual_weight
+        )
         if not base:
             return jsonify({"success": False, "error": "Product not found"}), 404
 
-        scored = []
-        for candidate in products:
-            score = compute_similarity_score(base, candidate)
-            if score <= 0:
-                continue
-            scored.append((score, candidate))
-
-        scored.sort(key=lambda item: item[0], reverse=True)
-        recommendations = [item[1] for item in scored[:6]]
-
         return jsonify({
             "success": True,
             "recommendations": recommendations,
-            "count": len(recommendations)
+            "count": len(recommendations),
+            "mode": "hybrid" if used_visual else "attributes"
         }), 200
 
     except Exception as e:
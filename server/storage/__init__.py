@@ -0,0 +1,144 @@
+"""
+Pluggable storage for the server's data stores.
+
+Routes get collections through get_collection(); the backend is chosen with
+the STORAGE_BACKEND environment variable:
+  - "json"   (default) the original products.json / *_store.json files
+  - "sqlite" an embedded SQLite database in WAL mode (STORAGE_SQLITE_PATH)
+
+Existing JSON data can be copied into SQLite with `python -m storage.migrate`.
+"""
+
+import os
+import threading
+
+from .base import NOCASE, REAL, TEXT, Collection, CollectionSpec, DuplicateKeyError
+from .json_backend import JSONCollection, JSONDocument
+from .sqlite_backend import SQLiteCollection, SQLiteDatabase
+
+COLLECTIONS = {
+    spec.name: spec
+    for spec in (
+        CollectionSpec(
+            name="products",
+            filename="products.json",
+            key="id",
+            indexes={"category": NOCASE, "brand": NOCASE, "user_id": TEXT, "price": REAL},
+            composite_indexes=(("category", "price"),),
+        ),
+        CollectionSpec(
+            name="message_threads",
+            filename="messages_store.json",
+            key="thread_id",
+            indexes={"buyer_id": TEXT, "seller_id": TEXT, "product_id": TEXT},
+        ),
+        CollectionSpec(
+            name="escrows",
+            filename="escrow_store.json",
+            key="id",
+            indexes={"buyer_id": TEXT, "seller_id": TEXT, "product_id": TEXT, "status": TEXT},
+        ),
+        CollectionSpec(
+            name="product_feedback",
+            filename="feedback_store.json",
+            key="id",
+            indexes={"product_id": TEXT},
+            section="product_feedback",
+        ),
+        CollectionSpec(
+            name="general_feedback",
+            filename="feedback_store.json",
+            key="id",
+            section="general_feedback",
+        ),
+    )
+}
+
+_settings = {
+    "backend": os.environ.get("STORAGE_BACKEND", "json").lower(),
+    "sqlite_path": os.environ.get("STORAGE_SQLITE_PATH", "marketplace.db"),
+    "data_dir": os.environ.get("STORAGE_DATA_DIR", ""),
+}
+_collections = {}
+_lock = threading.Lock()
+_handles_lock = threading.Lock()
+
+
+def backend_name():
+    """Name of the configured backend."""
+    return _settings["backend"]
+
+
+def data_path(filename):
+    """Path for an auxiliary data file (index caches, state) next to the stores."""
+    return os.path.join(_settings["data_dir"], filename)
+
+
+def configure(backend=None, sqlite_path=None, data_dir=None):
+    """Override storage settings (used by tools and benchmarks) and drop cached collections."""
+    with _lock:
+        if backend is not None:
+            _settings["backend"] = backend.lower()
+        if sqlite_path is not None:
+            _settings["sqlite_path"] = sqlite_path
+        if data_dir is not None:
+            _settings["data_dir"] = data_dir
+        _collections.clear()
+
+
+def open_collection(name, backend):
+    """Build a fresh collection for the given backend, bypassing the cache."""
+    spec = COLLECTIONS[name]
+    if backend == "json":
+        path = os.path.join(_settings["data_dir"], spec.filename)
+        return JSONCollection(spec, _json_document(path, spec.filename))
+    if backend == "sqlite":
+        path = os.path.join(_settings["data_dir"], _settings["sqlite_path"])
+        return SQLiteCollection(spec, _sqlite_database(path))
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+_databases = {}
+_documents = {}
+
+
+def _json_document(path, filename):
+    # Collections sharing a file must share its locks and group committer
+    with _handles_lock:
+        if path not in _documents:
+            sections = sorted({s.section for s in COLLECTIONS.values()
+                               if s.filename == filename and s.section}) or None
+            _documents[path] = JSONDocument(path, sections)
+        return _documents[path]
+
+
+def _sqlite_database(path):
+    with _handles_lock:
+        if path not in _databases:
+            _databases[path] = SQLiteDatabase(path)
+        return _databases[path]
+
+
+def get_collection(name):
+    """Shared collection instance for the configured backend."""
+    collection = _collections.get(name)
+    if collection is None:
+        with _lock:
+            collection = _collections.get(name)
+            if collection is None:
+                collection = open_collection(name, _settings["backend"])
+                _collections[name] = collection
+    return collection
+
+
+__all__ = [
+    "COLLECTIONS",
+    "Collection",
+    "CollectionSpec",
+    "DuplicateKeyError",
+    "backend_name",
+    "configure",
+    "data_path",
+    "get_collection",
+    "open_collection",
+]
@@ -0,0 +1,156 @@
+# server/storage/base.py
+"""
+Backend-neutral collection interface shared by the JSON and SQLite stores.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Index column types understood by every backend
+TEXT = "text"
+NOCASE = "nocase"   # text compared case-insensitively
+REAL = "real"
+
+
+# Change operations reported to subscribers
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+RESET = "reset"     # the whole collection was replaced
+
+
+class DuplicateKeyError(KeyError):
+    """Raised when inserting a record whose key already exists."""
+
+
+class Change(NamedTuple):
+    """One committed change. record is the new value, or the removed one for DELETE."""
+
+    op: str
+    key: Optional[str]
+    record: Optional[Dict]
+
+
+@dataclass(frozen=True)
+class CollectionSpec:
+    """Describes one logical collection and where its JSON data lives."""
+
+    name: str
+    filename: str
+    key: str = "id"
+    indexes: Dict[str, str] = field(default_factory=dict)
+    composite_indexes: Tuple[Tuple[str, ...], ...] = ()
+    # Top-level key inside the JSON file when several collections share it
+    section: Optional[str] = None
+
+
+def normalize(value, kind):
+    """Comparable form of a value for an index of the given kind."""
+    if value is None:
+        return None
+    if kind == REAL:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    value = str(value)
+    return value.lower() if kind == NOCASE else value
+
+
+def matches(record, spec: CollectionSpec, criteria: Dict, ranges: Dict) -> bool:
+    """Python-side equivalent of Collection.find() filtering."""
+    for name, expected in criteria.items():
+        kind = spec.indexes.get(name, TEXT)
+        if normalize(record.get(name), kind) != normalize(expected, kind):
+            return False
+    for name, (low, high) in ranges.items():
+        value = normalize(record.get(name), REAL)
+        if value is None:
+            return False
+        if low is not None and value < float(low):
+            return False
+        if high is not None and value > float(high):
+            return False
+    return True
+
+
+class Collection:
+    """
+    A keyed set of JSON-like records kept in insertion order.
+
+    Mutating helpers take callables so each backend can run the
+    read-modify-write under its own transaction.
+    """
+
+    def __init__(self, spec: CollectionSpec):
+        self.spec = spec
+        self._listeners: List[Callable] = []
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    def key_of(self, record: Dict) -> str:
+        return record[self.spec.key]
+
+    # Change notification ---------------------------------------------------
+    def subscribe(self, listener: Callable[[List[Change], Any, Any], None]) -> None:
+        """
+        Call listener(changes, before, after) after every committed write made
+        through this process. before/after are version tokens, so a listener
+        whose last seen token is not `before` knows it missed another writer.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, changes: List[Change], before, after) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(changes, before, after)
+            except Exception:
+                # The write is already durable; a failing listener must not undo the request
+                pass
+
+    def version_token(self):
+        """Opaque value that changes whenever the stored data changes, in any process."""
+        raise NotImplementedError
+
+    def snapshot(self) -> Tuple[List[Dict], Any]:
+        """All records plus the version token they correspond to."""
+        raise NotImplementedError
+
+    # Reads ---------------------------------------------------------------
+    def all(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def find(self, criteria: Optional[Dict] = None, ranges: Optional[Dict] = None) -> List[Dict]:
+        """Records equal to every criteria value and within every (low, high) range."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    # Writes --------------------------------------------------------------
+    def insert(self, record: Dict) -> Dict:
+        raise NotImplementedError
+
+    def insert_many(self, records: Iterable[Dict]) -> int:
+        raise NotImplementedError
+
+    def modify(self, key: str, fn: Callable[[Dict], None]) -> Optional[Dict]:
+        """Apply fn to the stored record in place and persist it. Returns None if missing."""
+        raise NotImplementedError
+
+    def modify_many(self, keys: Iterable[str], fn: Callable[[Dict], None]) -> int:
+        """Apply fn to each existing record in keys in one write. Returns records changed."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def replace_all(self, records: List[Dict]) -> None:
+        raise NotImplementedError
@@ -0,0 +1,195 @@
+# server/storage/json_backend.py
+"""
+JSON file backend. Keeps the original on-disk format (indented JSON, one
+file per store) so existing data and tools keep working.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .base import DELETE, INSERT, RESET, UPDATE, Change, Collection, CollectionSpec, DuplicateKeyError, matches
+from .locking import FileLock, GroupCommitter, RWLock, atomic_write
+
+
+class JSONDocument:
+    """
+    One JSON file, holding either a list or a dict of sectioned lists.
+
+    Reads take a shared lock and writers an exclusive one, both in-process
+    (RWLock) and across processes (FileLock). Writes go to a temp file that
+    is renamed over the original, and concurrent mutations are coalesced by
+    a GroupCommitter so N writers cost one load and one rewrite.
+    """
+
+    def __init__(self, path: str, sections: Optional[List[str]] = None):
+        self.path = path
+        self.sections = sections
+        self.rwlock = RWLock()
+        self.file_lock = FileLock(path)
+        self.committer = GroupCommitter(self._apply_batch)
+        self.collections: List["JSONCollection"] = []
+
+    def empty(self):
+        if self.sections:
+            return {section: [] for section in self.sections}
+        return []
+
+    def _read_unlocked(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return self.empty()
+
+    def version_token(self):
+        """(mtime, size, inode) of the file; atomic renames give every write a new inode."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def load(self):
+        with self.rwlock.read(), self.file_lock.shared():
+            return self._read_unlocked()
+
+    def snapshot(self):
+        with self.rwlock.read(), self.file_lock.shared():
+            return self._read_unlocked(), self.version_token()
+
+    def commit(self, mutation: Callable):
+        """
+        Run mutation(data) against the latest contents, modifying it in place,
+        and persist it. The mutation returns (result, [(collection, Change)]).
+        A mutation that raises should do so before touching data, since other
+        mutations in the same batch are still saved.
+        """
+        return self.committer.submit(mutation)
+
+    def _apply_batch(self, batch) -> None:
+        changes = {id(c): [] for c in self.collections}
+        with self.rwlock.write(), self.file_lock.exclusive():
+            before = self.version_token()
+            data = self._read_unlocked()
+            changed = False
+            for op in batch:
+                try:
+                    op.result, op_changes = op.fn(data)
+                    for collection, change in op_changes:
+                        changes[id(collection)].append(change)
+                    changed = True
+                except Exception as e:
+                    op.error = e
+            if not changed:
+                return
+            atomic_write(self.path, lambda f: json.dump(data, f, indent=2))
+            after = self.version_token()
+        # Every collection in the file sees the new token, even without changes of its own
+        for collection in self.collections:
+            collection._notify(changes[id(collection)], before, after)
+
+
+class JSONCollection(Collection):
+    """Collection stored as a list inside a JSONDocument."""
+
+    def __init__(self, spec: CollectionSpec, document: JSONDocument):
+        super().__init__(spec)
+        self.document = document
+        document.collections.append(self)
+
+    def _records(self, data) -> List[Dict]:
+        if self.spec.section:
+            return data.setdefault(self.spec.section, [])
+        return data
+
+    def _mutate(self, fn: Callable[[List[Dict]], tuple]):
+        """
+        Let fn change this collection's list under the document's group commit.
+        fn returns (result, [Change, ...]).
+        """
+        def run(data):
+            result, changes = fn(self._records(data))
+            return result, [(self, change) for change in changes]
+        return self.document.commit(run)
+
+    def _change(self, op, record):
+        return Change(op, None if record is None else self.key_of(record), record)
+
+    def _index_of(self, records: List[Dict], key: str) -> Optional[int]:
+        return next((i for i, r in enumerate(records) if r.get(self.spec.key) == key), None)
+
+    def version_token(self):
+        return self.document.version_token()
+
+    def snapshot(self):
+        data, token = self.document.snapshot()
+        return self._records(data), token
+
+    # Reads ---------------------------------------------------------------
+    def all(self) -> List[Dict]:
+        return self._records(self.document.load())
+
+    def get(self, key: str) -> Optional[Dict]:
+        return next((r for r in self.all() if r.get(self.spec.key) == key), None)
+
+    def find(self, criteria=None, ranges=None) -> List[Dict]:
+        criteria, ranges = criteria or {}, ranges or {}
+        return [r for r in self.all() if matches(r, self.spec, criteria, ranges)]
+
+    def count(self) -> int:
+        return len(self.all())
+
+    # Writes --------------------------------------------------------------
+    def insert(self, record: Dict) -> Dict:
+        def apply(records):
+            if self._index_of(records, self.key_of(record)) is not None:
+                raise DuplicateKeyError(self.key_of(record))
+            records.append(record)
+            return record, [self._change(INSERT, record)]
+        return self._mutate(apply)
+
+    def insert_many(self, records: Iterable[Dict]) -> int:
+        records = list(records)
+
+        def apply(existing):
+            existing.extend(records)
+            return len(records), [self._change(INSERT, r) for r in records]
+        return self._mutate(apply)
+
+    def modify(self, key: str, fn) -> Optional[Dict]:
+        def apply(records):
+            index = self._index_of(records, key)
+            if index is None:
+                return None, []
+            fn(records[index])
+            return records[index], [self._change(UPDATE, records[index])]
+        return self._mutate(apply)
+
+    def modify_many(self, keys: Iterable[str], fn) -> int:
+        wanted = set(keys)
+
+        def apply(records):
+            changes = []
+            for record in records:
+                if record.get(self.spec.key) in wanted:
+                    fn(record)
+                    changes.append(self._change(UPDATE, record))
+            return len(changes), changes
+        return self._mutate(apply)
+
+    def delete(self, key: str) -> Optional[Dict]:
+        def apply(records):
+            index = self._index_of(records, key)
+            if index is None:
+                return None, []
+            removed = records.pop(index)
+            return removed, [self._change(DELETE, removed)]
+        return self._mutate(apply)
+
+    def replace_all(self, records: List[Dict]) -> None:
+        def apply(existing):
+            existing[:] = records
+            return None, [Change(RESET, None, None)]
+        self._mutate(apply)
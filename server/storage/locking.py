@@ -0,0 +1,189 @@
+# server/storage/locking.py
+"""
+Concurrency primitives for the JSON file stores:
+  - RWLock: in-process shared/exclusive lock (writers preferred)
+  - FileLock: cross-process advisory lock on a sidecar ".lock" file
+  - GroupCommitter: coalesces concurrent mutations of one file into a single write
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+
+class RWLock:
+    """Many concurrent readers or one writer. Waiting writers block new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class FileLock:
+    """
+    Advisory lock shared between processes. Uses flock on POSIX; on Windows
+    msvcrt only offers exclusive locks, so shared() is exclusive there.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        handle = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif msvcrt is not None:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                handle.close()
+
+    def shared(self):
+        return self._locked(exclusive=False)
+
+    def exclusive(self):
+        return self._locked(exclusive=True)
+
+
+def atomic_write(path: str, write: Callable, mode: str = "w") -> None:
+    """Write to a temp file in the same directory, fsync it, then rename over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class _PendingMutation:
+    __slots__ = ("fn", "result", "error", "done", "promoted")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.promoted = False
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class GroupCommitter:
+    """
+    Runs mutations through a single leader thread at a time. Mutations that
+    arrive while the leader is writing are applied together in the leader's
+    next batch and persisted with one write.
+
+    apply_batch(mutations) must run every mutation against one loaded copy of
+    the data, record each result/error on it, and persist once.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[_PendingMutation]], None]):
+        self._apply_batch = apply_batch
+        self._mutex = threading.Lock()
+        self._pending: List[_PendingMutation] = []
+        self._leader_active = False
+        self.batches = 0
+        self.mutations = 0
+
+    def submit(self, fn):
+        op = _PendingMutation(fn)
+        with self._mutex:
+            self._pending.append(op)
+            lead = not self._leader_active
+            self._leader_active = True
+
+        if not lead:
+            op.done.wait()
+            if not op.promoted:
+                return op.outcome()
+            op.done.clear()
+
+        self._run_batch()
+        return op.outcome()
+
+    def _run_batch(self):
+        with self._mutex:
+            batch, self._pending = self._pending, []
+        try:
+            self._apply_batch(batch)
+        except BaseException as e:
+            # Nothing from this batch was persisted
+            for op in batch:
+                op.error = e
+        finally:
+            self.batches += 1
+            self.mutations += len(batch)
+            for op in batch:
+                op.promoted = False
+                op.done.set()
+            with self._mutex:
+                if self._pending:
+                    # Hand leadership to the oldest waiter instead of looping forever here
+                    successor = self._pending[0]
+                    successor.promoted = True
+                    successor.done.set()
+                else:
+                    self._leader_active = False
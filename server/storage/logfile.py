@@ -0,0 +1,30 @@
+# server/storage/logfile.py
+"""
+Checksummed records for append-only log files, one per line:
+"<crc32 hex> <json>\n". A reader only trusts a line that is complete and
+whose checksum matches, so a torn write at the end of a log or a damaged
+line can be told apart from data.
+"""
+
+import json
+import zlib
+from typing import Dict, Optional
+
+
+def encode_record(record: Dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line: bytes) -> Optional[Dict]:
+    """Record stored on a complete line, or None if the line is damaged."""
+    if len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:].rstrip(b"\n")
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        record = json.loads(payload)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
@@ -0,0 +1,194 @@
+# server/storage/media.py
+"""
+Content-addressed image storage and resized derivatives.
+
+Uploads are saved as uploads/<sha256>.<ext>, so identical images are
+stored once and the file name never changes meaning. Each image gets
+thumbnail, card and full-size derivatives in WebP and JPEG under
+uploads/derived/<key>/, generated once by a background worker.
+
+Sources that are not content-addressed (legacy uuid uploads, the curated
+dataset) are keyed by the hash of their bytes, memoized per file stat.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import queue
+import re
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps, features
+
+from .locking import atomic_write
+
+MEDIA_ROOT = "uploads"
+DERIVED_DIR = "derived"
+
+# Longest edge in pixels
+VARIANTS = {"thumb": 160, "card": 480, "full": 1600}
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+QUALITY = {"webp": 80, "jpeg": 85}
+
+_CONTENT_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+_HASH_CHUNK = 1 << 20
+
+_key_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_key_cache_lock = threading.Lock()
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != "webp" or features.check("webp")]
+
+
+def is_content_addressed(filename: str) -> bool:
+    return bool(_CONTENT_NAME.match(filename))
+
+
+def store_upload(stream, extension: str, root: str = MEDIA_ROOT) -> Tuple[str, bool]:
+    """
+    Save an uploaded file under its SHA-256. Returns (filename, created);
+    created is False when identical content was already stored.
+    """
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: stream.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        filename = f"{digest.hexdigest()}.{extension.lower()}"
+        target = os.path.join(root, filename)
+        if os.path.exists(target):
+            return filename, False
+        os.replace(tmp, target)
+        return filename, True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def source_key(path: str) -> str:
+    """Content hash identifying path's bytes, used to name derivatives and ETags."""
+    name = os.path.basename(path)
+    match = _CONTENT_NAME.match(name)
+    if match:
+        return match.group(1)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _key_cache_lock:
+        cached = _key_cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    key = digest.hexdigest()
+    with _key_cache_lock:
+        _key_cache[path] = (stamp, key)
+    return key
+
+
+def derivative_path(key: str, variant: str, fmt: str, root: str = MEDIA_ROOT) -> str:
+    return os.path.join(root, DERIVED_DIR, key[:2], key, f"{variant}.{fmt}")
+
+
+def _flatten(image):
+    """RGB copy of image with any transparency composited onto white (JPEG has no alpha)."""
+    if image.mode != "RGBA":
+        return image.convert("RGB")
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def render_derivatives(source: str, key: str, root: str = MEDIA_ROOT) -> int:
+    """Write every missing variant/format of source. Returns how many files were written."""
+    written = 0
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        for variant, edge in VARIANTS.items():
+            resized = None
+            for fmt in available_formats():
+                target = derivative_path(key, variant, fmt, root)
+                if os.path.exists(target):
+                    continue
+                if resized is None:
+                    resized = original.copy()
+                    resized.thumbnail((edge, edge), Image.LANCZOS)
+                    if resized.mode not in ("RGB", "RGBA"):
+                        resized = resized.convert("RGBA" if "transparency" in resized.info else "RGB")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                image = _flatten(resized) if fmt == "jpeg" else resized
+                pil_format = FORMATS[fmt][0]
+                atomic_write(
+                    target,
+                    lambda f: image.save(f, pil_format, quality=QUALITY[fmt], optimize=True),
+                    mode="wb",
+                )
+                written += 1
+    return written
+
+
+class DerivativeWorker:
+    """Single daemon thread rendering derivatives for queued sources."""
+
+    def __init__(self, root: str = MEDIA_ROOT):
+        self.root = root
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._pending = set()
+        self._unreadable = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.rendered = 0
+        self.failed = 0
+
+    def enqueue(self, source: str, key: str) -> None:
+        with self._lock:
+            if key in self._pending or key in self._unreadable:
+                return
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="media-derivatives", daemon=True)
+                self._thread.start()
+        self._queue.put((source, key))
+
+    def _run(self) -> None:
+        while True:
+            source, key = self._queue.get()
+            try:
+                render_derivatives(source, key, self.root)
+                self.rendered += 1
+            except Exception:
+                # Unreadable image: requests keep getting the original
+                with self._lock:
+                    self._unreadable.add(key)
+                self.failed += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def wait_idle(self) -> None:
+        self._queue.join()
+
+
+derivatives = DerivativeWorker()
+
+
+def find_derivative(source: str, variant: str, fmt: str) -> Tuple[str, Optional[str]]:
+    """
+    (key, path of the derivative) for source, queueing generation when it
+    does not exist yet, in which case path is None.
+    """
+    key = source_key(source)
+    path = derivative_path(key, variant, fmt, derivatives.root)
+    if os.path.exists(path):
+        return key, path
+    derivatives.enqueue(source, key)
+    return key, None
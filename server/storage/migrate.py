@@ -0,0 +1,59 @@
+# server/storage/migrate.py
+"""
+One-shot migration of the JSON stores into the SQLite backend.
+
+Run from the server directory:
+    python -m storage.migrate [--force] [--only products escrows ...]
+"""
+
+import argparse
+import time
+
+from . import COLLECTIONS, open_collection
+
+BATCH_SIZE = 10000
+
+
+def migrate_collection(name, force=False):
+    """Copy one collection from JSON into SQLite. Returns the number of records copied."""
+    source = open_collection(name, "json")
+    target = open_collection(name, "sqlite")
+
+    if target.count() and not force:
+        print(f"⏭  {name}: SQLite table already has {target.count()} records (use --force to replace)")
+        return 0
+
+    records = source.all()
+    seen = set()
+    unique = []
+    for record in records:
+        key = source.key_of(record)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(record)
+
+    target.replace_all([])
+    for offset in range(0, len(unique), BATCH_SIZE):
+        target.insert_many(unique[offset:offset + BATCH_SIZE])
+
+    skipped = len(records) - len(unique)
+    note = f" ({skipped} duplicate keys skipped)" if skipped else ""
+    print(f"✅ {name}: {len(unique)} records migrated{note}")
+    return len(unique)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate JSON stores into SQLite.")
+    parser.add_argument("--force", action="store_true", help="replace tables that already contain data")
+    parser.add_argument("--only", nargs="+", choices=sorted(COLLECTIONS), help="collections to migrate")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total = sum(migrate_collection(name, args.force) for name in (args.only or COLLECTIONS))
+    print(f"Done: {total} records in {time.perf_counter() - started:.1f}s. "
+          f"Start the server with STORAGE_BACKEND=sqlite to use them.")
+
+
+if __name__ == "__main__":
+    main()
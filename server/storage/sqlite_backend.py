@@ -0,0 +1,251 @@
+# server/storage/sqlite_backend.py
+"""
+Embedded SQLite backend (WAL mode). Each collection is a table holding the
+record as JSON plus real columns for its indexed fields, so lookups and
+filters use B-tree indexes and writes touch a single row.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from .base import (
+    DELETE,
+    INSERT,
+    NOCASE,
+    REAL,
+    RESET,
+    TEXT,
+    UPDATE,
+    Change,
+    Collection,
+    CollectionSpec,
+    DuplicateKeyError,
+    matches,
+    normalize,
+)
+
+COLUMN_TYPES = {
+    TEXT: "TEXT",
+    NOCASE: "TEXT COLLATE NOCASE",
+    REAL: "REAL",
+}
+
+
+class SQLiteDatabase:
+    """Owns one database file and hands out a connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate=True):
+        """BEGIN IMMEDIATE so read-modify-write cycles are serialized across processes."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SQLiteCollection(Collection):
+    """Collection stored as rows of one table."""
+
+    def __init__(self, spec: CollectionSpec, database: SQLiteDatabase):
+        super().__init__(spec)
+        self.db = database
+        self.table = spec.name
+        self.columns = list(spec.indexes)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = "".join(f", {name} {COLUMN_TYPES[kind]}" for name, kind in self.spec.indexes.items())
+        conn = self.db.connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS _versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO _versions (name, version) VALUES (?, 0)", (self.table,))
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            f"key TEXT NOT NULL UNIQUE, "
+            f"data TEXT NOT NULL{columns})"
+        )
+        for name in self.columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{name} ON {self.table}({name})")
+        for group in self.spec.composite_indexes:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{'_'.join(group)} "
+                f"ON {self.table}({', '.join(group)})"
+            )
+
+    def _row_values(self, record: Dict):
+        values = [self.key_of(record), json.dumps(record)]
+        for name, kind in self.spec.indexes.items():
+            raw = record.get(name)
+            # Text keeps its original case; NOCASE collation handles comparison
+            values.append(normalize(raw, REAL) if kind == REAL else (None if raw is None else str(raw)))
+        return values
+
+    def _insert_sql(self) -> str:
+        names = ", ".join(["key", "data"] + self.columns)
+        marks = ", ".join("?" * (2 + len(self.columns)))
+        return f"INSERT INTO {self.table} ({names}) VALUES ({marks})"
+
+    def _update_sql(self) -> str:
+        sets = ", ".join(f"{name} = ?" for name in ["data"] + self.columns)
+        return f"UPDATE {self.table} SET {sets} WHERE key = ?"
+
+    def _write_row(self, conn, record: Dict) -> None:
+        values = self._row_values(record)
+        conn.execute(self._update_sql(), values[1:] + [values[0]])
+
+    def _read_version(self, conn) -> int:
+        return conn.execute("SELECT version FROM _versions WHERE name = ?", (self.table,)).fetchone()[0]
+
+    def _bump_version(self, conn):
+        """Increment this table's version inside the current transaction; returns (before, after)."""
+        before = self._read_version(conn)
+        conn.execute("UPDATE _versions SET version = ? WHERE name = ?", (before + 1, self.table))
+        return before, before + 1
+
+    def version_token(self):
+        return self._read_version(self.db.connection())
+
+    def snapshot(self):
+        with self.db.transaction(immediate=False) as conn:
+            token = self._read_version(conn)
+            rows = conn.execute(f"SELECT data FROM {self.table} ORDER BY seq").fetchall()
+        return [json.loads(data) for (data,) in rows], token
+
+    # Reads ---------------------------------------------------------------
+    def all(self) -> List[Dict]:
+        rows = self.db.connection().execute(f"SELECT data FROM {self.table} ORDER BY seq")
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.connection().execute(
+            f"SELECT data FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, criteria=None, ranges=None) -> List[Dict]:
+        criteria, ranges = criteria or {}, ranges or {}
+        clauses, params = [], []
+        leftover_criteria, leftover_ranges = {}, {}
+        for name, value in criteria.items():
+            if name in self.spec.indexes:
+                clauses.append(f"{name} = ?")
+                params.append(normalize(value, self.spec.indexes[name]))
+            else:
+                leftover_criteria[name] = value
+        for name, (low, high) in ranges.items():
+            if name not in self.spec.indexes:
+                leftover_ranges[name] = (low, high)
+                continue
+            if low is not None:
+                clauses.append(f"{name} >= ?")
+                params.append(float(low))
+            if high is not None:
+                clauses.append(f"{name} <= ?")
+                params.append(float(high))
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.connection().execute(
+            f"SELECT data FROM {self.table}{where} ORDER BY seq", params
+        )
+        records = (json.loads(data) for (data,) in rows)
+        if leftover_criteria or leftover_ranges:
+            return [r for r in records if matches(r, self.spec, leftover_criteria, leftover_ranges)]
+        return list(records)
+
+    def count(self) -> int:
+        return self.db.connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    # Writes --------------------------------------------------------------
+    def insert(self, record: Dict) -> Dict:
+        try:
+            with self.db.transaction() as conn:
+                conn.execute(self._insert_sql(), self._row_values(record))
+                before, after = self._bump_version(conn)
+        except sqlite3.IntegrityError:
+            raise DuplicateKeyError(self.key_of(record))
+        self._notify([Change(INSERT, self.key_of(record), record)], before, after)
+        return record
+
+    def insert_many(self, records: Iterable[Dict]) -> int:
+        records = list(records)
+        rows = [self._row_values(r) for r in records]
+        with self.db.transaction() as conn:
+            conn.executemany(self._insert_sql(), rows)
+            before, after = self._bump_version(conn)
+        self._notify([Change(INSERT, self.key_of(r), r) for r in records], before, after)
+        return len(rows)
+
+    def modify(self, key: str, fn) -> Optional[Dict]:
+        with self.db.transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            fn(record)
+            self._write_row(conn, record)
+            before, after = self._bump_version(conn)
+        self._notify([Change(UPDATE, key, record)], before, after)
+        return record
+
+    def modify_many(self, keys: Iterable[str], fn) -> int:
+        changes = []
+        with self.db.transaction() as conn:
+            for key in keys:
+                row = conn.execute(f"SELECT data FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                record = json.loads(row[0])
+                fn(record)
+                self._write_row(conn, record)
+                changes.append(Change(UPDATE, key, record))
+            before, after = self._bump_version(conn)
+        self._notify(changes, before, after)
+        return len(changes)
+
+    def delete(self, key: str) -> Optional[Dict]:
+        with self.db.transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            before, after = self._bump_version(conn)
+        removed = json.loads(row[0])
+        self._notify([Change(DELETE, key, removed)], before, after)
+        return removed
+
+    def replace_all(self, records: List[Dict]) -> None:
+        rows = [self._row_values(r) for r in records]
+        with self.db.transaction() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.executemany(self._insert_sql(), rows)
+            before, after = self._bump_version(conn)
+        self._notify([Change(RESET, None, None)], before, after)